@@ -0,0 +1,78 @@
+"""
+Shared helpers for the rendering benchmarks: sample tables and timing.
+"""
+
+import contextlib
+import io
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+WORDS = (
+    "latency throughput cache render font glyph table column row width "
+    "image encode upload discord gateway event loop executor worker"
+).split()
+CJK_TEXT = "東京の天気は晴れのち曇り、最高気温は二十五度です。"
+
+
+def make_table(rows: int, cols: int, words_per_cell: int = 3, cjk: bool = False):
+    """Parsed table in the shape MarkdownTableExtractor produces."""
+    headers = [
+        f"**Column {c + 1}**" if c == 0 else f"Column {c + 1}" for c in range(cols)
+    ]
+    body = []
+    for r in range(rows):
+        row = []
+        for c in range(cols):
+            if cjk and c % 2:
+                row.append(CJK_TEXT[: 8 + (r + c) % len(CJK_TEXT)])
+            else:
+                words = [
+                    WORDS[(r * cols + c + i) % len(WORDS)]
+                    for i in range(words_per_cell)
+                ]
+                if (r + c) % 5 == 0:
+                    words[0] = f"**{words[0]}**"
+                row.append(" ".join(words))
+        body.append(row)
+    return {"headers": headers, "rows": body, "valid": True}
+
+
+SAMPLE_TABLES = {
+    "small 3x4": make_table(4, 3),
+    "medium 6x20": make_table(20, 6, words_per_cell=5),
+    "cjk 4x12": make_table(12, 4, cjk=True),
+    "large 8x60": make_table(60, 8, words_per_cell=4),
+}
+
+
+def timed(func: Callable[[], Any], repeat: int = 5) -> tuple[float, Any]:
+    """Median wall time in milliseconds over ``repeat`` runs, and the last result."""
+    samples, result = [], None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = func()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def print_table(columns: list[str], rows: list[list[Any]]) -> None:
+    """Plain-text result table."""
+    widths = [
+        max(len(str(value)) for value in [name, *(row[i] for row in rows)])
+        for i, name in enumerate(columns)
+    ]
+    print(
+        "  ".join(
+            name.ljust(width) for name, width in zip(columns, widths, strict=True)
+        )
+    )
+    for row in rows:
+        print(
+            "  ".join(
+                str(value).ljust(width)
+                for value, width in zip(row, widths, strict=True)
+            )
+        )
@@ -0,0 +1,61 @@
+"""
+Encode time and output size of table images for each output encoding.
+
+Run from the project root:
+
+    python -m benchmarks.encode [--repeat N]
+
+Every table of the corpus is drawn once; only encoding is timed. Sizes and
+times are totals over the corpus.
+"""
+
+import argparse
+
+from benchmarks.common import SAMPLE_TABLES, make_table, print_table, timed
+from nodes.table_renderer import TableImageRenderer, TableRenderSettings
+
+CORPUS = {
+    **SAMPLE_TABLES,
+    "tall 4x120": make_table(120, 4, words_per_cell=2),
+    "cjk 6x40": make_table(40, 6, cjk=True),
+}
+
+ENCODINGS = {
+    "png rgb z6 (previous)": TableRenderSettings(palette=False),
+    "png rgb z1": TableRenderSettings(palette=False, compress_level=1),
+    "png 8-bit z1": TableRenderSettings(compress_level=1),
+    "png 8-bit z6 (default)": TableRenderSettings(),
+    "png 8-bit z9": TableRenderSettings(compress_level=9),
+    "webp lossless m0": TableRenderSettings(image_format="webp", webp_method=0),
+    "webp lossless m4": TableRenderSettings(image_format="webp"),
+    "webp lossless m6": TableRenderSettings(image_format="webp", webp_method=6),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    _, images = timed(
+        lambda: [TableImageRenderer()._draw_table(t) for t in CORPUS.values()], 1
+    )
+    pixels = sum(image.width * image.height for image in images)
+    baseline = None
+    rows = []
+    for name, settings in ENCODINGS.items():
+        renderer = TableImageRenderer(settings=settings)
+        encode_ms, encoded = timed(
+            lambda renderer=renderer: [renderer._encode(image) for image in images],
+            args.repeat,
+        )
+        size = sum(len(data) for data in encoded)
+        baseline = baseline or size
+        rows.append([name, f"{encode_ms:.1f}", size, f"{size / baseline:.0%}"])
+
+    print(f"{len(images)} tables, {pixels / 1e6:.1f} Mpx, median of {args.repeat} runs")
+    print_table(["encoding", "encode ms", "bytes", "vs previous"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Render time of tall tables with ImageDraw.text versus the glyph atlas.
+
+Run from the project root:
+
+    python -m benchmarks.glyph_atlas [--repeat N]
+
+Both paths are timed with warm fonts and a warm atlas, and the resulting images
+are compared pixel by pixel.
+"""
+
+import argparse
+import io
+
+from PIL import Image, ImageChops
+
+from benchmarks.common import make_table, print_table, timed
+from nodes.table_renderer import TableImageRenderer, TableRenderSettings
+
+TALL_TABLES = {
+    "50 rows x 4": make_table(50, 4),
+    "100 rows x 6": make_table(100, 6, words_per_cell=4),
+    "200 rows x 3": make_table(200, 3, words_per_cell=2),
+    "cjk 80 rows x 4": make_table(80, 4, cjk=True),
+}
+
+
+def _max_pixel_diff(first: bytes, second: bytes) -> int:
+    diff = ImageChops.difference(
+        Image.open(io.BytesIO(first)).convert("RGB"),
+        Image.open(io.BytesIO(second)).convert("RGB"),
+    )
+    return max(high for _, high in diff.getextrema())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text_renderer = TableImageRenderer(settings=TableRenderSettings())
+    atlas_renderer = TableImageRenderer(settings=TableRenderSettings(glyph_atlas=True))
+    rows = []
+    for name, table in TALL_TABLES.items():
+        text_ms, text_png = timed(
+            lambda table=table: text_renderer._render_table_image(table).getvalue(),
+            args.repeat,
+        )
+        atlas_ms, atlas_png = timed(
+            lambda table=table: atlas_renderer._render_table_image(table).getvalue(),
+            args.repeat,
+        )
+        rows.append(
+            [
+                name,
+                f"{text_ms:.1f}",
+                f"{atlas_ms:.1f}",
+                f"{text_ms / atlas_ms:.2f}x",
+                _max_pixel_diff(text_png, atlas_png),
+            ]
+        )
+
+    print(f"Median of {args.repeat} runs")
+    print_table(["table", "text ms", "atlas ms", "speedup", "max diff"], rows)
+
+
+if __name__ == "__main__":
+    main()
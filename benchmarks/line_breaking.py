@@ -0,0 +1,53 @@
+"""
+Wrapping time of CJK cell text as it grows, to check it stays linear.
+
+Run from the project root:
+
+    python -m benchmarks.line_breaking [--repeat N]
+
+Each cell is wrapped to a 1128 px column (the widest cell at full size); the
+time per character should stay flat as the text gets longer.
+"""
+
+import argparse
+
+from benchmarks.common import CJK_TEXT, WORDS, print_table, timed
+from nodes.table_renderer import TableImageRenderer
+
+COLUMN_WIDTH = 1200 - 2 * 36
+LENGTHS = (100, 1000, 10000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    renderer = TableImageRenderer()
+    font = renderer._get_font(42)
+    fonts = {"cell": font, "cell_bold": renderer._get_font(42, bold=True)}
+    samples = {
+        "cjk": CJK_TEXT,
+        "latin": " ".join(WORDS) + " ",
+        "mixed": " ".join(WORDS[:4]) + " " + CJK_TEXT + " ",
+    }
+    rows = []
+    for name, sample in samples.items():
+        for length in LENGTHS:
+            text = (sample * (length // len(sample) + 1))[:length]
+            ms, lines = timed(
+                lambda text=text: renderer._wrap_text_with_formatting(
+                    text, COLUMN_WIDTH, fonts
+                ),
+                args.repeat,
+            )
+            rows.append(
+                [name, length, len(lines), f"{ms:.2f}", f"{ms * 1000 / length:.2f}"]
+            )
+
+    print(f"Median of {args.repeat} runs")
+    print_table(["text", "chars", "lines", "ms", "us/char"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Wall time to render all sample tables of one reply on each render backend.
+
+Run from the project root:
+
+    python -m benchmarks.render_pool [--repeat N] [--workers N]
+
+The first batch on a pool includes starting and warming its workers and is
+reported separately from the steady-state median.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import SAMPLE_TABLES, print_table, timed
+from nodes.table_renderer import render_table_images, warm_table_fonts
+from utils.render_pool import BACKENDS, RenderPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    tables = list(SAMPLE_TABLES.values())
+    rows = []
+    for kind in sorted(BACKENDS):
+        pool = RenderPool(
+            render_table_images,
+            kind=kind,
+            max_workers=args.workers,
+            initializer=warm_table_fonts,
+        )
+        started = time.perf_counter()
+        pool.warm()
+        warm_ms = (time.perf_counter() - started) * 1000
+        batch_ms, results = timed(
+            lambda pool=pool: asyncio.run(pool.render_many(tables)), args.repeat
+        )
+        pool.close()
+        rows.append(
+            [
+                kind,
+                pool.max_workers,
+                f"{warm_ms:.1f}",
+                f"{batch_ms:.1f}",
+                sum(len(image) for images in results for image in images),
+            ]
+        )
+
+    print(f"{len(tables)} tables per batch, median of {args.repeat} runs")
+    print_table(["backend", "workers", "warm ms", "batch ms", "bytes"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Per-table render time with a cold and a warm font registry.
+
+Run from the project root:
+
+    python -m benchmarks.table_render [--repeat N]
+
+Uses the Noto Sans CJK fonts under assets/fonts when downloaded
+(``python -c "from utils import download_noto_font; download_noto_font()"``),
+otherwise PIL's default font, which loads much faster than the 20 MB .ttc files.
+"""
+
+import argparse
+
+from benchmarks.common import SAMPLE_TABLES, print_table, timed
+from nodes.table_renderer import TableImageRenderer
+from utils.font_registry import font_registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    renderer = TableImageRenderer()
+    rows = []
+    for name, table in SAMPLE_TABLES.items():
+
+        def cold(table=table):
+            font_registry.clear()
+            return renderer._render_table_image(table)
+
+        cold_ms, _ = timed(cold, args.repeat)
+        warm_ms, buffer = timed(
+            lambda table=table: renderer._render_table_image(table), args.repeat
+        )
+        rows.append(
+            [
+                name,
+                f"{cold_ms:.1f}",
+                f"{warm_ms:.1f}",
+                f"{cold_ms / warm_ms:.2f}x",
+                len(buffer.getvalue()),
+            ]
+        )
+
+    fonts = "default" if font_registry.failures() else "Noto Sans CJK"
+    print(f"Fonts: {fonts}, median of {args.repeat} runs")
+    print_table(["table", "cold ms", "warm ms", "speedup", "png bytes"], rows)
+
+
+if __name__ == "__main__":
+    main()
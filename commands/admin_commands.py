@@ -1,10 +1,15 @@
 """Admin-related Discord slash commands"""
 
+import asyncio
 from zoneinfo import available_timezones
 
 import discord
 from discord.ext import commands
 
+from utils.generation_profiles import GENERATION_PROFILES
+from utils.metrics import metrics
+from utils.usage_tracker import get_usage_tracker
+
 # Cache timezones at module load for better performance
 TIMEZONES = sorted(available_timezones())
 TIMEZONES_LOWER = [(tz.lower(), tz) for tz in TIMEZONES]
@@ -416,6 +421,189 @@ def setup_admin_commands(bot: commands.Bot, runtime_config):
                 "Failed to set activity status.", ephemeral=True
             )
 
+    @bot.tree.command(
+        name="metrics",
+        description="Show runtime performance metrics",
+    )
+    @discord.app_commands.describe(prefix="Only show metrics starting with this prefix")
+    @discord.app_commands.checks.has_permissions(administrator=True)
+    async def show_metrics(interaction: discord.Interaction, prefix: str = ""):
+        """Slash command to show the in-process metrics snapshot"""
+        try:
+            lines = metrics.format_snapshot(prefix)
+            if not lines:
+                await interaction.response.send_message(
+                    "ℹ️ No metrics recorded yet.", ephemeral=True
+                )
+                return
+
+            # Keep the code block within Discord's message limit
+            body = ""
+            for line in lines:
+                if len(body) + len(line) + 1 > 1900:
+                    body += "…\n"
+                    break
+                body += line + "\n"
+            await interaction.response.send_message(f"```\n{body}```", ephemeral=True)
+            print(f"✅ [metrics] Listed {len(lines)} metrics")
+        except Exception as e:
+            print(f"❌ [metrics] Error listing metrics: {e}")
+            await interaction.response.send_message(
+                "Failed to list metrics.", ephemeral=True
+            )
+
+    @bot.tree.command(
+        name="usage",
+        description="Show LLM token usage and budget for this server",
+    )
+    @discord.app_commands.describe(hours="Time window in hours (default: 24)")
+    @discord.app_commands.checks.has_permissions(administrator=True)
+    async def show_usage(interaction: discord.Interaction, hours: float = 24.0):
+        """Slash command to show token usage of the current server"""
+        try:
+            if not interaction.guild:
+                await interaction.response.send_message(
+                    "❌ This command can only be used in a server, not in DMs.",
+                    ephemeral=True,
+                )
+                return
+
+            tracker = get_usage_tracker()
+            if tracker is None:
+                await interaction.response.send_message(
+                    "ℹ️ Usage tracking is disabled. Set `ENABLE_USAGE_TRACKING=on` to enable it.",
+                    ephemeral=True,
+                )
+                return
+
+            # The report reads the SQLite event log when one is configured
+            report = await asyncio.to_thread(
+                tracker.guild_report, interaction.guild.id, hours=hours
+            )
+            total = report["total"]
+            lines = [
+                f"Last {hours:g}h: {total.requests} requests, {total.total_tokens:,} tokens "
+                f"(prompt {total.prompt_tokens:,}, cached {total.cached_tokens:,}, "
+                f"output {total.output_tokens:,})",
+            ]
+            if report["cost"]:
+                lines.append(f"Estimated cost: ${report['cost']:.4f}")
+            if report["budget"]:
+                window_hours = tracker.budget.window_seconds / 3600
+                lines.append(
+                    f"Budget: {report['window_tokens']:,}/{report['budget']:,} tokens "
+                    f"in the last {window_hours:g}h"
+                )
+            for model, usage in sorted(report["by_model"].items()):
+                lines.append(f"• {model}: {usage.total_tokens:,} tokens")
+            if report["top_channels"]:
+                lines.append(
+                    "Top channels: "
+                    + ", ".join(
+                        f"<#{channel_id}> {tokens:,}"
+                        for channel_id, tokens in report["top_channels"]
+                    )
+                )
+            if report["top_users"]:
+                lines.append(
+                    "Top users: "
+                    + ", ".join(
+                        f"<@{user_id}> {tokens:,}"
+                        for user_id, tokens in report["top_users"]
+                    )
+                )
+
+            await interaction.response.send_message(
+                "📊 " + "\n".join(lines)[:1900], ephemeral=True
+            )
+            print(f"✅ [usage] Reported usage for guild {interaction.guild.id}")
+        except Exception as e:
+            print(f"❌ [usage] Error reporting usage: {e}")
+            await interaction.response.send_message(
+                "Failed to report usage.", ephemeral=True
+            )
+
+    @bot.tree.command(
+        name="setprofile",
+        description="Set the generation profile (latency vs. depth) for this channel",
+    )
+    @discord.app_commands.describe(
+        profile="fast, balanced or deep; default lets the router and bot settings decide"
+    )
+    @discord.app_commands.choices(
+        profile=[
+            discord.app_commands.Choice(name=name, value=name)
+            for name in [*GENERATION_PROFILES, "default"]
+        ]
+    )
+    @discord.app_commands.checks.has_permissions(administrator=True)
+    async def setprofile(interaction: discord.Interaction, profile: str):
+        """Slash command to set the channel's generation profile"""
+        try:
+            # Check if command is used in a server
+            if not interaction.guild:
+                await interaction.response.send_message(
+                    "❌ This command can only be used in a server, not in DMs.",
+                    ephemeral=True,
+                )
+                return
+
+            channel_id = interaction.channel_id
+            value = None if profile == "default" else profile
+            runtime_config.set_channel_setting(channel_id, "generation_profile", value)
+            await interaction.response.send_message(
+                f"✅ Generation profile for this channel set to: {profile}",
+                ephemeral=True,
+            )
+            print(
+                f"✅ [setprofile] Generation profile for channel {channel_id} set to: {profile}"
+            )
+        except Exception as e:
+            print(f"❌ [setprofile] Error setting generation profile: {e}")
+            await interaction.response.send_message(
+                "Failed to set generation profile.", ephemeral=True
+            )
+
+    @bot.tree.command(
+        name="settabletext",
+        description="Set how small a table must be to be sent as text in this channel",
+    )
+    @discord.app_commands.describe(
+        max_cells="Largest table (body cells) sent as text; 0 always renders images, omit for the bot default"
+    )
+    @discord.app_commands.checks.has_permissions(administrator=True)
+    async def settabletext(
+        interaction: discord.Interaction,
+        max_cells: discord.app_commands.Range[int, 0, 200] | None = None,
+    ):
+        """Slash command to set the channel's text table threshold"""
+        try:
+            # Check if command is used in a server
+            if not interaction.guild:
+                await interaction.response.send_message(
+                    "❌ This command can only be used in a server, not in DMs.",
+                    ephemeral=True,
+                )
+                return
+
+            channel_id = interaction.channel_id
+            runtime_config.set_channel_setting(
+                channel_id, "table_text_max_cells", max_cells
+            )
+            label = "default" if max_cells is None else f"{max_cells} cells"
+            await interaction.response.send_message(
+                f"✅ Text table size for this channel set to: {label}",
+                ephemeral=True,
+            )
+            print(
+                f"✅ [settabletext] Text table size for channel {channel_id} set to: {label}"
+            )
+        except Exception as e:
+            print(f"❌ [settabletext] Error setting text table size: {e}")
+            await interaction.response.send_message(
+                "Failed to set text table size.", ephemeral=True
+            )
+
     @bot.tree.command(
         name="settimezone",
         description="Set the bot's timezone for timestamps",
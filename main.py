@@ -1,9 +1,9 @@
+import asyncio
 import os
 
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 from pocketflow import AsyncFlow
 
@@ -11,18 +11,52 @@ from commands import setup_admin_commands, setup_chat_commands
 from nodes.contextual_system_prompt import ContextualSystemPrompt
 from nodes.fetch_history import FetchDiscordHistory
 from nodes.llm_chat import LLMChat
+from nodes.model_router import ModelRouter, RouteCache
 from nodes.process_history import ProcessMessageHistory
+from nodes.search_tool_gate import SearchToolGate
 from nodes.send_response import SendDiscordResponse
 from nodes.table_extractor import MarkdownTableExtractor
-from nodes.table_renderer import TableImageRenderer
+from nodes.table_renderer import (
+    TableImageRenderer,
+    TableRenderSettings,
+    render_table_images,
+    warm_table_fonts,
+)
+from services import (
+    get_chat_config,
+    get_router_config,
+    get_thinker_config,
+    init_llm_configs,
+)
 from utils import (
+    ConcurrencyLimiters,
+    GeminiContextCache,
+    HedgingPolicy,
+    LimiterSettings,
+    LLMConfig,
+    LLMResilience,
+    PageCache,
+    RenderedImageCache,
+    ResponseCache,
+    SearchToolClassifier,
+    UsageTracker,
     check_font_exists,
+    configure_llm_concurrency,
+    configure_llm_resilience,
+    configure_response_cache,
+    configure_usage_tracker,
     create_message_data,
     download_noto_font,
     env_onoff_to_bool,
+    get_usage_tracker,
     runtime_config,
+    usage_scope,
     validate_message_data_types,
 )
+from utils.openai_compatible import close_openai_sessions
+from utils.outbound_dispatcher import OutboundDispatcher
+from utils.render_pool import RenderPool
+from utils.search_classifier import report_classifier_quality
 
 # Load environment variables at module level
 load_dotenv()
@@ -39,12 +73,108 @@ ENABLE_CONTEXTUAL_SYSTEM_PROMPT = env_onoff_to_bool(
     os.getenv("ENABLE_CONTEXTUAL_SYSTEM_PROMPT")
 )
 CHAT_MODEL_PROVIDER = os.getenv("CHAT_MODEL_PROVIDER", "gemini")  # Default to gemini
+CONTEXT_TIME_GRANULARITY_MINUTES = int(os.getenv("CONTEXT_TIME_GRANULARITY_MINUTES", 1))
+ENABLE_MODEL_ROUTING = env_onoff_to_bool(os.getenv("ENABLE_MODEL_ROUTING"))
+ROUTER_TIMEOUT = float(os.getenv("ROUTER_TIMEOUT", 5))
+DEFAULT_GENERATION_PROFILE = os.getenv("DEFAULT_GENERATION_PROFILE") or None
+ENABLE_SEARCH_CLASSIFIER = env_onoff_to_bool(os.getenv("ENABLE_SEARCH_CLASSIFIER"))
+SEARCH_CLASSIFIER_MODEL_PATH = os.getenv("SEARCH_CLASSIFIER_MODEL_PATH")
+SEARCH_CLASSIFIER_SAMPLES_PATH = os.getenv("SEARCH_CLASSIFIER_SAMPLES_PATH")
+ENABLE_RESPONSE_CACHE = env_onoff_to_bool(os.getenv("ENABLE_RESPONSE_CACHE"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+RESPONSE_CACHE_DB_PATH = os.getenv("RESPONSE_CACHE_DB_PATH")
+TABLE_TEXT_MAX_CELLS = int(os.getenv("TABLE_TEXT_MAX_CELLS", 0))
+TABLE_TEXT_MAX_WIDTH = int(os.getenv("TABLE_TEXT_MAX_WIDTH", 60))
+ENABLE_TABLE_IMAGE_CACHE = env_onoff_to_bool(os.getenv("ENABLE_TABLE_IMAGE_CACHE"))
+TABLE_IMAGE_CACHE_MAX_BYTES = int(
+    os.getenv("TABLE_IMAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+)
+TABLE_IMAGE_CACHE_DB_PATH = os.getenv("TABLE_IMAGE_CACHE_DB_PATH")
+TABLE_IMAGE_CACHE_DB_MAX_BYTES = int(
+    os.getenv("TABLE_IMAGE_CACHE_DB_MAX_BYTES", 512 * 1024 * 1024)
+)
+ENABLE_GEMINI_CONTEXT_CACHE = env_onoff_to_bool(
+    os.getenv("ENABLE_GEMINI_CONTEXT_CACHE")
+)
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(
+    os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", 3600)
+)
+ENABLE_USAGE_TRACKING = env_onoff_to_bool(os.getenv("ENABLE_USAGE_TRACKING"))
+ENABLE_ADAPTIVE_CONCURRENCY = env_onoff_to_bool(
+    os.getenv("ENABLE_ADAPTIVE_CONCURRENCY")
+)
+ENABLE_LLM_HEDGING = env_onoff_to_bool(os.getenv("ENABLE_LLM_HEDGING"))
+LLM_HEDGE_FALLBACK_MODEL = os.getenv("LLM_HEDGE_FALLBACK_MODEL")
+ENABLE_PAGINATED_REPLIES = env_onoff_to_bool(os.getenv("ENABLE_PAGINATED_REPLIES"))
+REPLY_PAGE_CACHE_SIZE = int(os.getenv("REPLY_PAGE_CACHE_SIZE", 256))
+REPLY_PAGE_TTL_SECONDS = float(os.getenv("REPLY_PAGE_TTL_SECONDS", 900))
 
 
-genai_client = genai.Client(api_key=CHAT_MODEL_API_KEY)
 with open(CHAT_SYS_PROMPT_PATH, encoding="utf-8") as file:
     genai_chat_system_prompt = file.read()
 genai_tools = types.Tool(google_search=types.GoogleSearch())
+# Chat, router and thinker configs used for per-message model routing
+init_llm_configs(genai_chat_system_prompt, [genai_tools])
+# Chat client, a ClientPool when CHAT_MODEL_API_KEY lists several comma-separated keys
+genai_client = get_chat_config().client if get_chat_config() else None
+
+# Shared across flows so page buttons keep working after the flow that sent them ends
+reply_page_cache = (
+    PageCache(max_entries=REPLY_PAGE_CACHE_SIZE, ttl_seconds=REPLY_PAGE_TTL_SECONDS)
+    if ENABLE_PAGINATED_REPLIES
+    else None
+)
+# One outbound queue per process so replies in the same channel never interleave
+outbound_dispatcher = OutboundDispatcher.from_env()
+# Deadlines, retries and circuit breakers for LLM calls
+configure_llm_resilience(LLMResilience.from_env())
+# Queue LLM calls behind per provider/model limits that back off on 429s
+if ENABLE_ADAPTIVE_CONCURRENCY:
+    configure_llm_concurrency(ConcurrencyLimiters(LimiterSettings.from_env()))
+# Token accounting per guild, channel and user, with optional rolling budgets
+if ENABLE_USAGE_TRACKING:
+    configure_usage_tracker(UsageTracker.from_env())
+# Serve identical, non-grounded, non-time-sensitive requests from cache
+if ENABLE_RESPONSE_CACHE:
+    configure_response_cache(
+        ResponseCache(
+            max_entries=RESPONSE_CACHE_SIZE,
+            ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+            db_path=RESPONSE_CACHE_DB_PATH or None,
+        )
+    )
+# Hedge slow chat requests, optionally to a different model on the same client
+chat_hedging = None
+if ENABLE_LLM_HEDGING:
+    chat_hedging = HedgingPolicy.from_env(
+        fallback=LLMConfig(
+            client=genai_client,
+            model=LLM_HEDGE_FALLBACK_MODEL,
+            provider=CHAT_MODEL_PROVIDER,
+        )
+        if LLM_HEDGE_FALLBACK_MODEL
+        else None
+    )
+# Ordered fallback targets tried when the chat model fails (CHAT_FALLBACK_<n>_*),
+# already loaded by init_llm_configs
+chat_fallbacks = get_chat_config().fallbacks if get_chat_config() else []
+# Cached-content entries for the static system prompt and tools, shared across flows
+chat_context_cache = (
+    GeminiContextCache(ttl_seconds=GEMINI_CONTEXT_CACHE_TTL_SECONDS)
+    if ENABLE_GEMINI_CONTEXT_CACHE
+    else None
+)
+# Local classifier deciding per message whether to attach the Google Search tool
+search_classifier = None
+if ENABLE_SEARCH_CLASSIFIER:
+    search_classifier = SearchToolClassifier.from_model_path(
+        SEARCH_CLASSIFIER_MODEL_PATH
+    )
+    if SEARCH_CLASSIFIER_SAMPLES_PATH:
+        report_classifier_quality(search_classifier, SEARCH_CLASSIFIER_SAMPLES_PATH)
+# Route cache shared across flows so repeated questions skip the router call
+route_cache = RouteCache() if ENABLE_MODEL_ROUTING else None
 
 # Discord intents
 intents = discord.Intents.default()
@@ -58,7 +188,19 @@ custom_activity = discord.CustomActivity(
     name=DISCORD_BOT_ACTIVITY
 )  # Or any status message you want to display
 
-bot = commands.Bot(
+
+class DaiaBot(commands.Bot):
+    async def close(self):
+        # Release pooled HTTP connections before the event loop shuts down
+        await close_openai_sessions()
+        # Write usage events recorded since the last background flush
+        tracker = get_usage_tracker()
+        if tracker is not None:
+            await asyncio.to_thread(tracker.close)
+        await super().close()
+
+
+bot = DaiaBot(
     command_prefix="!",
     intents=intents,
     activity=custom_activity,
@@ -77,6 +219,22 @@ if not check_font_exists():
         print("⚠️  Bot will continue but table rendering may not work properly")
         print("💡 You can try running 'uv run download_fonts.py' later")
 
+# Table rendering workers (TABLE_RENDER_BACKEND), warmed with fonts before the bot starts
+table_render_pool = RenderPool.from_env(
+    render_table_images, initializer=warm_table_fonts
+)
+table_render_settings = TableRenderSettings.from_env()
+# Rendered table PNGs keyed by table content and renderer settings
+table_image_cache = (
+    RenderedImageCache(
+        max_bytes=TABLE_IMAGE_CACHE_MAX_BYTES,
+        db_path=TABLE_IMAGE_CACHE_DB_PATH or None,
+        max_disk_bytes=TABLE_IMAGE_CACHE_DB_MAX_BYTES,
+    )
+    if ENABLE_TABLE_IMAGE_CACHE
+    else None
+)
+
 
 async def create_message_flow():
     print("🏗️ [create_message_flow] Creating flow nodes...")
@@ -87,6 +245,7 @@ async def create_message_flow():
         ENABLE_CONTEXTUAL_SYSTEM_PROMPT,
         genai_chat_system_prompt,
         runtime_config.history_limit,
+        time_granularity_minutes=CONTEXT_TIME_GRANULARITY_MINUTES,
     )
     llm_chat = LLMChat(
         genai_client,
@@ -94,16 +253,44 @@ async def create_message_flow():
         CHAT_TEMPERATURE,
         genai_tools,
         provider=CHAT_MODEL_PROVIDER,
+        hedging=chat_hedging,
+        fallbacks=chat_fallbacks,
+        context_cache=chat_context_cache,
+        generation_profile=DEFAULT_GENERATION_PROFILE,
+    )
+    search_gate = SearchToolGate(search_classifier) if search_classifier else None
+    model_router = None
+    if ENABLE_MODEL_ROUTING and get_router_config():
+        model_router = ModelRouter(
+            get_router_config(),
+            get_chat_config(),
+            get_thinker_config(),
+            cache=route_cache,
+            timeout=ROUTER_TIMEOUT,
+        )
+    table_extractor = MarkdownTableExtractor(
+        text_max_cells=TABLE_TEXT_MAX_CELLS, text_max_width=TABLE_TEXT_MAX_WIDTH
+    )
+    table_renderer = TableImageRenderer(
+        table_render_pool, table_render_settings, image_cache=table_image_cache
+    )
+    send_response = SendDiscordResponse(
+        bot, page_cache=reply_page_cache, dispatcher=outbound_dispatcher
     )
-    table_extractor = MarkdownTableExtractor()
-    table_renderer = TableImageRenderer()
-    send_response = SendDiscordResponse(bot)
 
     print("🔗 [create_message_flow] Setting up transitions...")
     # Define transitions
     fetch_history - "success" >> process_history
-    process_history - "processed" >> contextual_system_prompt
-    contextual_system_prompt - "success" >> llm_chat
+    if search_gate:
+        process_history - "processed" >> search_gate
+        search_gate - "classified" >> contextual_system_prompt
+    else:
+        process_history - "processed" >> contextual_system_prompt
+    if model_router:
+        contextual_system_prompt - "success" >> model_router
+        model_router - "routed" >> llm_chat
+    else:
+        contextual_system_prompt - "success" >> llm_chat
     llm_chat - "success" >> table_extractor
     table_extractor - "tables_found" >> table_renderer
     table_extractor - "no_tables" >> send_response
@@ -190,7 +377,13 @@ async def on_message(message: discord.Message):
             print("🏗️ [on_message] Creating message flow...")
             flow = await create_message_flow()
             print("▶️ [on_message] Running flow...")
-            await flow.run_async(message_data)
+            # Attribute token usage of this flow to the guild, channel and author
+            with usage_scope(
+                message.guild.id if message.guild else None,
+                message_data["channel_id"],
+                message_data["author_id"],
+            ):
+                await flow.run_async(message_data)
             print("✅ [on_message] Flow completed successfully")
 
         except Exception as e:
@@ -216,6 +409,30 @@ def main():
     print(f"📄 Chat system prompt path: {CHAT_SYS_PROMPT_PATH}")
     print(f"🔌 LLM Provider: {CHAT_MODEL_PROVIDER}")
     print(f"🔌 Contextual system prompt: {ENABLE_CONTEXTUAL_SYSTEM_PROMPT}")
+    print(f"🔌 Paginated replies: {ENABLE_PAGINATED_REPLIES}")
+    print(f"🔌 LLM hedging: {ENABLE_LLM_HEDGING}")
+    print(f"🔌 Response cache: {ENABLE_RESPONSE_CACHE}")
+    print(f"🔌 Table image cache: {ENABLE_TABLE_IMAGE_CACHE}")
+    print(
+        f"🔌 Text tables: up to {TABLE_TEXT_MAX_CELLS} cells, {TABLE_TEXT_MAX_WIDTH} columns wide"
+    )
+    print(f"🔌 Usage tracking: {ENABLE_USAGE_TRACKING}")
+    print(f"🔌 Adaptive LLM concurrency: {ENABLE_ADAPTIVE_CONCURRENCY}")
+    print(
+        f"🔌 Default generation profile: {DEFAULT_GENERATION_PROFILE or 'model default'}"
+    )
+    print(f"🔌 Gemini context cache: {ENABLE_GEMINI_CONTEXT_CACHE}")
+    print(f"🔌 Search tool classifier: {ENABLE_SEARCH_CLASSIFIER}")
+    print(
+        f"🔌 Model routing: {ENABLE_MODEL_ROUTING and get_router_config() is not None}"
+    )
+    print(
+        f"🔌 Chat fallbacks: {', '.join(f'{fb.provider}/{fb.model}' for fb in chat_fallbacks) or 'none'}"
+    )
+    print(
+        f"🔌 Table rendering: {table_render_pool.kind} backend, {table_render_pool.max_workers} worker(s), glyph atlas: {table_render_settings.glyph_atlas}"
+    )
+    table_render_pool.warm()
     print("🔌 Starting Discord bot...")
     bot.run(DISCORD_BOT_TOKEN)
 
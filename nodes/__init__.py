@@ -5,7 +5,9 @@ Processing nodes for the async flow pipeline.
 from .contextual_system_prompt import ContextualSystemPrompt
 from .fetch_history import FetchDiscordHistory
 from .llm_chat import LLMChat
+from .model_router import ModelRouter
 from .process_history import ProcessMessageHistory
+from .search_tool_gate import SearchToolGate
 from .send_response import SendDiscordResponse
 from .table_extractor import MarkdownTableExtractor
 from .table_renderer import TableImageRenderer
@@ -14,6 +16,8 @@ __all__ = [
     "FetchDiscordHistory",
     "ProcessMessageHistory",
     "LLMChat",
+    "ModelRouter",
+    "SearchToolGate",
     "ContextualSystemPrompt",
     "MarkdownTableExtractor",
     "TableImageRenderer",
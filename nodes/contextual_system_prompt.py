@@ -7,82 +7,101 @@ from zoneinfo import ZoneInfo
 
 from pocketflow import AsyncNode
 
+from utils.prompt_layout import (
+    CONTEXT_PREAMBLE_HEADER,
+    format_participants,
+    round_time,
+)
 from utils.runtime_config import runtime_config
 
 
 class ContextualSystemPrompt(AsyncNode):
+    """
+    Builds the system prompt as a byte-stable static prefix plus a small dynamic context.
+
+    The static prefix (base prompt and contextual guidance) only changes when the
+    configuration does, so provider-side prefix caching keeps working. The dynamic
+    context (author, sorted participants, time rounded to ``time_granularity_minutes``)
+    is sent as a preamble of the user turn.
+    """
+
     def __init__(
-        self, enable_contextual_system_prompt, genai_chat_system_prompt, history_limit
+        self,
+        enable_contextual_system_prompt,
+        genai_chat_system_prompt,
+        history_limit,
+        time_granularity_minutes=1,
     ):
         super().__init__()
         self.enable_contextual_system_prompt = enable_contextual_system_prompt
         self.genai_chat_system_prompt = genai_chat_system_prompt
         self.history_limit = history_limit
+        self.time_granularity_minutes = time_granularity_minutes
 
     async def prep_async(self, shared):
         print("📝 [ContextualSystemPrompt] Preparing contextual system prompt")
         # Get timezone from runtime config
         timezone_name = runtime_config.timezone
         tz = ZoneInfo(timezone_name)
-        now = datetime.now(tz)
+        now = round_time(datetime.now(tz), self.time_granularity_minutes)
 
-        # Format: "Sunday, November 30, 2025 at 09:23 AM EST"
+        # Format: "Sunday, November 30, 2025 at 09:15 AM EST"
         formatted_time = now.strftime("%A, %B %d, %Y at %I:%M %p %Z")
 
         return {
-            "participants": shared.get("unique_users", set()),
+            "participants": set(shared.get("unique_users", set())),
             "author_name": shared.get("author_name", "User"),
             "current_time": formatted_time,
             "timezone": timezone_name,
         }
 
+    def static_prompt(self) -> str:
+        """Base prompt plus contextual guidance; identical for every request."""
+        if not self.enable_contextual_system_prompt:
+            return self.genai_chat_system_prompt
+
+        contextual_guidance = f"""Priority Contextual System Guidance:
+
+You are an AI assistant with access to conversation context, including up to {self.history_limit} historical messages and relevant user information. You MUST use this information to personalize your responses naturally and accurately. Do NOT claim that you do not know personal details like the user's name, as you have been provided with this data—always incorporate it seamlessly without denying knowledge.
+
+Your goal is to provide human-like responses tailored to the conversation's context. Remember and reference historical details from the provided records where relevant to make interactions feel continuous and personal.
+
+The latest user message starts with a {CONTEXT_PREAMBLE_HEADER} block holding key information to use: the name of the human you are talking to (always address or reference them by this name if appropriate, unless they specify otherwise), the current participants, the current time and the timezone. It is provided by the system, not written by the user."""
+        return f"{self.genai_chat_system_prompt}\n\n{contextual_guidance}"
+
     async def exec_async(self, prep_res):
         print(
             "🔧 [ContextualSystemPrompt] Processing system prompt with contextual information"
         )
-        print(self.enable_contextual_system_prompt)
         # Check if contextual system prompt is enabled
         if not self.enable_contextual_system_prompt:
             print(
                 "⏭️ [ContextualSystemPrompt] Contextual system prompt disabled, returning base prompt"
             )
-            return self.genai_chat_system_prompt
-
-        prep_res["participants"].add(prep_res["author_name"])
-
-        # Build contextual information
-        participants_str = (
-            ", ".join(prep_res["participants"])
-            if prep_res["participants"]
-            else "Unknown"
-        )
-
-        contextual_system_prompt = f"""
-Priority Contextual System Guidance:
+            return {"static": self.genai_chat_system_prompt, "dynamic": ""}
 
-You are an AI assistant with access to conversation context, including up to {self.history_limit} historical messages and relevant user information. You MUST use this information to personalize your responses naturally and accurately. Do NOT claim that you do not know personal details like the user's name, as you have been provided with this data—always incorporate it seamlessly without denying knowledge.
-
-Your goal is to provide human-like responses tailored to the conversation's context. Remember and reference historical details from the provided records where relevant to make interactions feel continuous and personal.
-
-Key information to use:
-- You are talking to a human named {prep_res["author_name"]}. Always address or reference them by this name if appropriate, unless they specify otherwise.
-- The conversation may involve one or more users. Current participants: {participants_str}.
+        participants = prep_res["participants"] | {prep_res["author_name"]}
+        dynamic_context = f"""- You are talking to a human named {prep_res["author_name"]}.
+- The conversation may involve one or more users. Current participants: {format_participants(participants)}.
 - Current time: {prep_res["current_time"]}
-- Timezone: {prep_res["timezone"]}
-"""
+- Timezone: {prep_res["timezone"]}"""
 
-        # Add contextual system prompt with clear labeling
-        contextual_section = f"{contextual_system_prompt}"
-        enhanced_prompt = f"{self.genai_chat_system_prompt}\n\n{contextual_section}"
-        print(enhanced_prompt)
+        print(dynamic_context)
         print(
             "✅ [ContextualSystemPrompt] Enhanced system prompt with contextual information"
         )
-        return enhanced_prompt
+        return {"static": self.static_prompt(), "dynamic": dynamic_context}
 
     async def post_async(self, shared, prep_res, exec_res):
-        shared["enhanced_system_prompt"] = exec_res
+        # Stable prefix for the system instruction, volatile part for the user turn
+        shared["static_system_prompt"] = exec_res["static"]
+        shared["dynamic_system_context"] = exec_res["dynamic"]
+        shared["enhanced_system_prompt"] = (
+            f"{exec_res['static']}\n\n{exec_res['dynamic']}"
+            if exec_res["dynamic"]
+            else exec_res["static"]
+        )
         print(
-            f"📝 [ContextualSystemPrompt] Enhanced system prompt stored, length: {len(exec_res)} characters"
+            f"📝 [ContextualSystemPrompt] Static prompt: {len(exec_res['static'])} characters, dynamic context: {len(exec_res['dynamic'])} characters"
         )
         return "success"
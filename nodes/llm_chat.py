@@ -2,14 +2,33 @@
 LLM chat node for the async flow pipeline.
 """
 
+import dataclasses
+
 from pocketflow import AsyncNode
 
+from utils.generation_profiles import get_generation_profile
 from utils.llm_router import call_llm
+from utils.runtime_config import runtime_config
+from utils.usage_tracker import BudgetExceededError
+
+BUDGET_EXCEEDED_REPLY = (
+    "⚠️ The usage budget for this server, channel or user has been reached. "
+    "Please try again later."
+)
 
 
 class LLMChat(AsyncNode):
     def __init__(
-        self, genai_client, chat_model, temperature, genai_tools, provider="gemini"
+        self,
+        genai_client,
+        chat_model,
+        temperature,
+        genai_tools,
+        provider="gemini",
+        hedging=None,
+        fallbacks=None,
+        context_cache=None,
+        generation_profile=None,
     ):
         super().__init__()
         self.genai_client = genai_client
@@ -17,6 +36,10 @@ class LLMChat(AsyncNode):
         self.temperature = temperature
         self.genai_tools = genai_tools
         self.provider = provider
+        self.hedging = hedging
+        self.fallbacks = fallbacks or []
+        self.context_cache = context_cache
+        self.generation_profile = generation_profile  # Default profile name
 
     async def prep_async(self, shared):
         print(
@@ -28,19 +51,63 @@ class LLMChat(AsyncNode):
             "current_message": shared.get("content", ""),
             "author_name": shared.get("author_name", "User"),  # unused?
             "enhanced_system_prompt": shared.get("enhanced_system_prompt"),
+            "static_system_prompt": shared.get("static_system_prompt"),
+            "dynamic_system_context": shared.get("dynamic_system_context", ""),
+            "llm_config": shared.get("llm_config"),  # Set by ModelRouter
+            "generation_profile": self.resolve_profile(
+                shared.get("channel_id"), shared.get("generation_profile")
+            ),
+            # Set by SearchToolGate; search stays on when the gate is disabled
+            "use_search_tools": shared.get("use_search_tools", True),
         }
 
+    def resolve_profile(self, channel_id, routed_profile):
+        """A channel's configured profile wins over the routed one, then the default."""
+        name = (
+            runtime_config.channel_setting(channel_id, "generation_profile")
+            or routed_profile
+            or self.generation_profile
+        )
+        return get_generation_profile(name)
+
     async def exec_async(self, prep_res):
         # Format current message with author context
         current_msg = f"{prep_res['author_name']}: {prep_res['current_message']}"
         print(f"💬 [LLMChat] Sending message: {current_msg[:100]}...")
+
+        # Stable system prompt plus per-request context sent with the message;
+        # fall back to the enhanced prompt when the layout is not split
+        system_prompt = prep_res.get("enhanced_system_prompt")
+        dynamic_context = ""
+        if prep_res["static_system_prompt"]:
+            system_prompt = prep_res["static_system_prompt"]
+            dynamic_context = prep_res["dynamic_system_context"]
+
+        routed_config = prep_res.get("llm_config")
+        if routed_config is not None:
+            config = dataclasses.replace(
+                routed_config,
+                system_prompt=system_prompt or routed_config.system_prompt,
+                tools=routed_config.tools if prep_res["use_search_tools"] else [],
+                # LLM_HEDGE_* settings apply to every route, not just the default one
+                hedging=routed_config.hedging or self.hedging,
+                dynamic_context=dynamic_context,
+                context_cache=self.context_cache,
+                generation_profile=prep_res["generation_profile"],
+            )
+            print(
+                f"🔧 [LLMChat] Using routed provider: {config.provider}, model: {config.model}, temperature: {config.temperature}"
+            )
+            response = await call_llm(
+                current_msg, config, history=prep_res["formatted_history"]
+            )
+            print(f"📥 [LLMChat] Received response: {response[:100]}...")
+            return response
+
         print(
             f"🔧 [LLMChat] Using provider: {self.provider}, model: {self.chat_model}, temperature: {self.temperature}"
         )
 
-        # Use enhanced system prompt if available, otherwise fall back to base system prompt
-        system_prompt = prep_res.get("enhanced_system_prompt")
-
         # Prepare kwargs for the LLM router
         llm_kwargs = {
             "client": self.genai_client,
@@ -48,17 +115,33 @@ class LLMChat(AsyncNode):
             "temperature": self.temperature,
             "system_prompt": system_prompt,
             "history": prep_res["formatted_history"],
+            "hedging": self.hedging,
+            "fallbacks": self.fallbacks,
+            "dynamic_context": dynamic_context,
+            "context_cache": self.context_cache,
+            "generation_profile": prep_res["generation_profile"],
         }
 
         # Add provider-specific parameters
         if self.provider == "gemini":
-            llm_kwargs["tools"] = [self.genai_tools] if self.genai_tools else []
+            use_tools = self.genai_tools and prep_res["use_search_tools"]
+            llm_kwargs["tools"] = [self.genai_tools] if use_tools else []
 
+        if prep_res["generation_profile"] is not None:
+            print(
+                f"🎚️ [LLMChat] Generation profile: {prep_res['generation_profile'].name}"
+            )
         print(f"📤 [LLMChat] Sending message to {self.provider.upper()} LLM...")
         response = await call_llm(current_msg, provider=self.provider, **llm_kwargs)
         print(f"📥 [LLMChat] Received response: {response[:100]}...")
         return response
 
+    async def exec_fallback_async(self, prep_res, exc):
+        if isinstance(exc, BudgetExceededError):
+            print(f"🚫 [LLMChat] {exc}")
+            return BUDGET_EXCEEDED_REPLY
+        raise exc
+
     async def post_async(self, shared, prep_res, exec_res):
         shared["llm_response"] = exec_res
         print(f"✅ [LLMChat] Response stored, length: {len(exec_res)} characters")
@@ -0,0 +1,191 @@
+"""
+Model routing node for the async flow pipeline.
+Classifies each request with the fast router model and picks the chat, router or thinker config.
+"""
+
+import asyncio
+import dataclasses
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from pocketflow import AsyncNode
+
+from utils.generation_profiles import (
+    GENERATION_PROFILES,
+    PROFILE_DEEP,
+    PROFILE_FAST,
+)
+from utils.llm_router import LLMConfig, call_llm
+from utils.metrics import metrics
+
+ROUTE_TRIVIAL = "trivial"
+ROUTE_NORMAL = "normal"
+ROUTE_REASONING = "reasoning"
+ROUTES = (ROUTE_TRIVIAL, ROUTE_NORMAL, ROUTE_REASONING)
+
+# Generation profile per route; normal keeps the channel or default profile
+DEFAULT_ROUTE_PROFILES = {
+    ROUTE_TRIVIAL: PROFILE_FAST,
+    ROUTE_NORMAL: None,
+    ROUTE_REASONING: PROFILE_DEEP,
+}
+
+ROUTER_SYSTEM_PROMPT = """You classify chat messages sent to a Discord assistant.
+Answer with exactly one word:
+- trivial: greetings, thanks, small talk, short reactions or simple questions answerable in one sentence
+- normal: everyday questions, explanations, lookups, writing help
+- reasoning: multi-step math, logic puzzles, code design or debugging, long analysis or planning"""
+
+
+def parse_route(text: str | None) -> str:
+    """Map a router model answer to a route, defaulting to normal."""
+    match = re.search(r"\b(trivial|normal|reasoning)\b", (text or "").lower())
+    return match.group(1) if match else ROUTE_NORMAL
+
+
+class RouteCache:
+    """Small LRU cache of routes keyed by normalized message text, with a TTL."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 600, clock=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock or time.monotonic
+        self._lock = Lock()
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def get(self, text: str) -> str | None:
+        key = self.normalize(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            route, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return route
+
+    def put(self, text: str, route: str) -> None:
+        key = self.normalize(text)
+        with self._lock:
+            self._entries[key] = (route, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class ModelRouter(AsyncNode):
+    """
+    Picks the LLMConfig used by LLMChat for the current message.
+
+    trivial requests are answered by the router model, reasoning requests by the
+    thinker model, everything else keeps LLMChat's own chat settings. Missing
+    configs and router failures fall back to the normal route. Each route also
+    names a generation profile (``shared["generation_profile"]``).
+
+    Args:
+        router_config (LLMConfig): Fast, low-temperature model used for classification
+        chat_config (LLMConfig): Chat model config, source of the persona system prompt
+        thinker_config (LLMConfig): Model for requests that need reasoning
+        cache (RouteCache): Cache of recent classifications
+        timeout (float): Seconds allowed for the classification call (default: 5)
+        route_profiles (dict): Generation profile name per route (default: DEFAULT_ROUTE_PROFILES)
+    """
+
+    def __init__(
+        self,
+        router_config: LLMConfig | None,
+        chat_config: LLMConfig | None = None,
+        thinker_config: LLMConfig | None = None,
+        cache: RouteCache | None = None,
+        timeout: float = 5.0,
+        route_profiles: dict[str, str | None] | None = None,
+    ):
+        super().__init__()
+        self.router_config = router_config
+        self.chat_config = chat_config
+        self.thinker_config = thinker_config
+        self.cache = cache if cache is not None else RouteCache()
+        self.timeout = timeout
+        self.route_profiles = (
+            route_profiles if route_profiles is not None else DEFAULT_ROUTE_PROFILES
+        )
+
+    async def prep_async(self, shared):
+        return {"current_message": shared.get("content", "")}
+
+    async def classify(self, text: str) -> str:
+        """Classify a message with the router model, using the cache when possible."""
+        if self.router_config is None or not text.strip():
+            return ROUTE_NORMAL
+
+        cached = self.cache.get(text)
+        if cached is not None:
+            metrics.incr("router.cache", result="hit")
+            return cached
+        metrics.incr("router.cache", result="miss")
+
+        config = dataclasses.replace(
+            self.router_config,
+            temperature=0.0,
+            system_prompt=ROUTER_SYSTEM_PROMPT,
+            tools=[],
+            hedging=None,
+            generation_profile=GENERATION_PROFILES[PROFILE_FAST],
+        )
+        try:
+            async with asyncio.timeout(self.timeout):
+                answer = await call_llm(text[:2000], config)
+        except Exception as e:
+            print(f"⚠️ [ModelRouter] Classification failed, using normal route: {e}")
+            metrics.incr("router.errors")
+            return ROUTE_NORMAL
+
+        route = parse_route(answer)
+        self.cache.put(text, route)
+        return route
+
+    def config_for_route(self, route: str) -> LLMConfig | None:
+        """LLMConfig for a route, or None to keep LLMChat's own settings."""
+        if route == ROUTE_TRIVIAL and self.router_config is not None:
+            config = dataclasses.replace(self.router_config, tools=[], hedging=None)
+            if self.chat_config is not None:
+                config = dataclasses.replace(
+                    config,
+                    system_prompt=self.chat_config.system_prompt,
+                    temperature=self.chat_config.temperature,
+                )
+            return config
+        if route == ROUTE_REASONING and self.thinker_config is not None:
+            return self.thinker_config
+        return None
+
+    async def exec_async(self, prep_res):
+        route = await self.classify(prep_res["current_message"])
+        config = self.config_for_route(route)
+        print(
+            f"🧭 [ModelRouter] Route: {route}, model: {config.model if config else 'chat default'}"
+        )
+        metrics.incr("router.routes", route=route)
+        return {
+            "route": route,
+            "llm_config": config,
+            "generation_profile": self.route_profiles.get(route),
+        }
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared["route"] = exec_res["route"]
+        shared["llm_config"] = exec_res["llm_config"]
+        shared["generation_profile"] = exec_res["generation_profile"]
+        return "routed"
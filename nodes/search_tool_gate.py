@@ -0,0 +1,30 @@
+"""
+Search tool gate node for the async flow pipeline.
+Decides locally whether the Google Search tool is attached to the LLM call.
+"""
+
+from pocketflow import AsyncNode
+
+from utils.metrics import metrics
+from utils.search_classifier import SearchToolClassifier
+
+
+class SearchToolGate(AsyncNode):
+    def __init__(self, classifier: SearchToolClassifier | None = None):
+        super().__init__()
+        self.classifier = classifier or SearchToolClassifier()
+
+    async def prep_async(self, shared):
+        return shared.get("content", "")
+
+    async def exec_async(self, prep_res):
+        use_search = self.classifier.needs_search(prep_res)
+        print(
+            f"🔎 [SearchToolGate] Search tools: {'on' if use_search else 'off'} (rules: {', '.join(self.classifier.matched_rules(prep_res)) or 'none'})"
+        )
+        return use_search
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared["use_search_tools"] = exec_res
+        metrics.incr("search_gate.decisions", search="on" if exec_res else "off")
+        return "classified"
@@ -2,18 +2,31 @@
 Discord response sending node for the async flow pipeline.
 """
 
+import asyncio
 import os
+import uuid
 
 import discord
 from pocketflow import AsyncNode
 
+from utils.attachment_planner import get_upload_limit, plan_attachment_batches
 from utils.discord_helpers import split_message
+from utils.outbound_dispatcher import (
+    OutboundFile,
+    OutboundMessage,
+    outbound_dispatcher,
+)
+from utils.pagination import PaginatedReplyView
 
 
 class SendDiscordResponse(AsyncNode):
-    def __init__(self, bot=None):
+    def __init__(self, bot=None, page_cache=None, dispatcher=None):
         super().__init__()
         self.bot = bot
+        # Paginated reply mode is enabled when a PageCache is provided
+        self.page_cache = page_cache
+        # Shared per-channel send queue (one per process unless overridden)
+        self.dispatcher = dispatcher or outbound_dispatcher
 
     async def prep_async(self, shared):
         # Use text without tables if available, otherwise use original response
@@ -70,7 +83,7 @@ class SendDiscordResponse(AsyncNode):
                 if prep_res["table_images"]:
                     for img_data in prep_res["table_images"]:
                         files.append(
-                            discord.File(
+                            OutboundFile(
                                 img_data["buffer"], filename=img_data["filename"]
                             )
                         )
@@ -85,7 +98,7 @@ class SendDiscordResponse(AsyncNode):
                         if os.path.exists(table_file):
                             # Extract just the filename for the attachment
                             filename = os.path.basename(table_file)
-                            files.append(discord.File(table_file, filename=filename))
+                            files.append(OutboundFile(table_file, filename=filename))
                             print(
                                 f"📋 [SendDiscordResponse] Added table file: {filename}"
                             )
@@ -99,6 +112,24 @@ class SendDiscordResponse(AsyncNode):
 
                 print(f"📎 [SendDiscordResponse] Total attachments: {len(files)}")
 
+                # Pack attachments into batches that fit Discord's count/size limits;
+                # the first batch goes with the reply, the rest follow on their own
+                # Oversized images are re-encoded by the planner, which would
+                # block the event loop, so plan on a worker thread
+                batches = (
+                    await asyncio.to_thread(
+                        plan_attachment_batches, files, get_upload_limit(channel)
+                    )
+                    if files
+                    else []
+                )
+                files = batches[0] if batches else []
+                extra_batches = [OutboundMessage(files=batch) for batch in batches[1:]]
+                if extra_batches:
+                    print(
+                        f"📦 [SendDiscordResponse] Attachments split across {len(batches)} messages"
+                    )
+
                 # Split message if it's too long
                 message_chunks = split_message(prep_res["response_text"])
                 print(
@@ -117,56 +148,32 @@ class SendDiscordResponse(AsyncNode):
                             f"⚠️ [SendDiscordResponse] Could not fetch original message {prep_res['message_id']}: {e}"
                         )
 
-                if not message_chunks:
-                    # If there is no text but there are files, send them
-                    if files:
-                        if original_message:
-                            await original_message.reply(files=files)
-                            print(
-                                f"✅ [SendDiscordResponse] Sent {len(files)} files as a reply (no text)."
-                            )
-                        else:
-                            await channel.send(files=files)
-                            print(
-                                f"✅ [SendDiscordResponse] Sent {len(files)} files (no text)."
-                            )
-                elif len(message_chunks) == 1:
-                    # Single chunk: send as a reply with all files
-                    if original_message:
-                        await original_message.reply(
-                            content=message_chunks[0], files=files
-                        )
-                        print(
-                            f"✅ [SendDiscordResponse] Single chunk with {len(files)} files sent as reply"
-                        )
-                    else:
-                        await channel.send(content=message_chunks[0], files=files)
-                        print(
-                            f"✅ [SendDiscordResponse] Single chunk with {len(files)} files sent (fallback)"
-                        )
+                if len(message_chunks) > 1 and self.page_cache is not None:
+                    # Paginated mode: send only the first page, serve the rest on demand
+                    await self._send_paginated(
+                        channel,
+                        original_message,
+                        prep_res,
+                        message_chunks,
+                        files,
+                        extra_batches,
+                    )
                 else:
-                    # Multiple chunks: reply with the first, send middle, then send last with files
-                    # Send first chunk as a reply (no files)
-                    if original_message:
-                        await original_message.reply(message_chunks[0])
-                        print("✅ [SendDiscordResponse] First chunk sent as reply")
-                    else:
-                        await channel.send(message_chunks[0])
-                        print("✅ [SendDiscordResponse] First chunk sent (fallback)")
-
-                    # Send middle chunks (if any)
-                    for i, chunk in enumerate(message_chunks[1:-1], 2):
-                        await channel.send(chunk)
-                        print(
-                            f"✅ [SendDiscordResponse] Chunk {i}/{len(message_chunks)} sent"
-                        )
-
-                    # Send the last chunk with all the files
-                    await channel.send(content=message_chunks[-1], files=files)
+                    # Reply with the first chunk, then send the rest in order; files go
+                    # with the last chunk (or alone if there is no text)
+                    outbound = [
+                        OutboundMessage(content=chunk) for chunk in message_chunks
+                    ]
+                    if not outbound and files:
+                        outbound.append(OutboundMessage())
+                    if outbound:
+                        outbound[0].reply_to = original_message
+                        outbound[-1].files = files
+
+                    sent = await self.dispatcher.send(channel, outbound + extra_batches)
                     print(
-                        f"✅ [SendDiscordResponse] Last chunk ({len(message_chunks)}/{len(message_chunks)}) with {len(files)} files sent"
+                        f"✅ [SendDiscordResponse] Delivered {len(message_chunks)} chunk(s) in {len(sent)} message(s) with {len(files)} files"
                     )
-
                 # Clean up table files after successful send
                 if prep_res["extracted_tables_files"]:
                     for table_file in prep_res["extracted_tables_files"]:
@@ -192,6 +199,33 @@ class SendDiscordResponse(AsyncNode):
         print(f"❌ [SendDiscordResponse] Channel not found: {prep_res['channel_id']}")
         return False
 
+    async def _send_paginated(
+        self, channel, original_message, prep_res, message_chunks, files, extra_batches
+    ):
+        """Send the first chunk with page buttons and cache the remaining pages."""
+        # Unique per reply: several replies in a channel (or to one message) can
+        # be paginated at once, and the sent message's id is not known yet
+        key = f"{prep_res['channel_id']}:{uuid.uuid4().hex}"
+        view = PaginatedReplyView(self.page_cache, key, len(message_chunks))
+        self.page_cache.put(key, message_chunks, on_evict=view.expire)
+
+        sent = await self.dispatcher.send(
+            channel,
+            [
+                OutboundMessage(
+                    content=message_chunks[0],
+                    files=files,
+                    reply_to=original_message,
+                    view=view,
+                )
+            ]
+            + extra_batches,
+        )
+        view.message = sent[0]
+        print(
+            f"✅ [SendDiscordResponse] Sent page 1/{len(message_chunks)} with {len(files)} files, remaining pages cached"
+        )
+
     async def post_async(self, shared, prep_res, exec_res):
         shared["message_sent"] = exec_res
         result = "sent" if exec_res else "failed"
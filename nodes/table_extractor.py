@@ -8,18 +8,46 @@ from typing import Any
 
 from pocketflow import AsyncNode
 
+from utils.runtime_config import runtime_config
+from utils.text_table import format_text_table, text_table_width
+
 
 class MarkdownTableExtractor(AsyncNode):
     """Node to identify and extract markdown tables from messages"""
 
+    def __init__(self, text_max_cells: int = 0, text_max_width: int = 60):
+        super().__init__()
+        # Tables with at most this many body cells that fit text_max_width
+        # columns are sent as a code block instead of an image (0 = never)
+        self.text_max_cells = text_max_cells
+        self.text_max_width = text_max_width
+
     async def prep_async(self, shared):
         print("📊 [MarkdownTableExtractor] Preparing to extract tables from message")
         return {
             "llm_response": shared.get("llm_response", ""),
             "content": shared.get("content", ""),
             "message_id": shared.get("message_id", "unknown"),
+            "text_max_cells": self.resolve_text_max_cells(shared.get("channel_id")),
         }
 
+    def resolve_text_max_cells(self, channel_id) -> int:
+        """A channel's configured text table size wins over the bot default."""
+        return int(
+            runtime_config.channel_setting(
+                channel_id, "table_text_max_cells", self.text_max_cells
+            )
+        )
+
+    def _fits_text(self, parsed_table: dict[str, Any], max_cells: int) -> bool:
+        """Small enough to read inline and narrow enough not to wrap."""
+        headers, rows = parsed_table["headers"], parsed_table["rows"]
+        return (
+            parsed_table["valid"]
+            and len(headers) * len(rows) <= max_cells
+            and text_table_width(headers, rows) <= self.text_max_width
+        )
+
     async def exec_async(self, prep_res):
         print("🔍 [MarkdownTableExtractor] Analyzing text for markdown tables...")
 
@@ -45,13 +73,31 @@ class MarkdownTableExtractor(AsyncNode):
             parsed_tables = []
             table_files = []
             message_id = prep_res["message_id"]
+            text_count = 0
 
             # Ensure temp directory exists
             os.makedirs("temp", exist_ok=True)
 
-            for i, table_text in enumerate(tables):
+            for table_text in tables:
                 parsed_table = self._parse_table(table_text.strip())
 
+                # Small tables stay in the reply as text: no image, no attachment
+                if prep_res["llm_response"] and self._fits_text(
+                    parsed_table, prep_res["text_max_cells"]
+                ):
+                    text_to_analyze = text_to_analyze.replace(
+                        table_text.strip(),
+                        format_text_table(
+                            parsed_table["headers"], parsed_table["rows"]
+                        ),
+                    )
+                    text_count += 1
+                    print(
+                        f"🔤 [MarkdownTableExtractor] Table with {len(parsed_table['headers'])} columns, {len(parsed_table['rows'])} rows kept inline as text"
+                    )
+                    continue
+
+                i = len(parsed_tables)
                 # Create filename for this table in temp folder
                 filename = f"temp/daia_replaced_table_{message_id}_{i + 1}.md"
 
@@ -74,11 +120,12 @@ class MarkdownTableExtractor(AsyncNode):
                 )
 
             return {
-                "has_table": True,
+                "has_table": bool(parsed_tables),
                 "tables": parsed_tables,
                 "processed_text": text_to_analyze,
-                "table_count": len(tables),
+                "table_count": len(parsed_tables),
                 "table_files": table_files,
+                "text_table_count": text_count,
             }
         else:
             print("❌ [MarkdownTableExtractor] No markdown tables found")
@@ -87,6 +134,7 @@ class MarkdownTableExtractor(AsyncNode):
                 "tables": [],
                 "processed_text": text_to_analyze,
                 "table_count": 0,
+                "text_table_count": 0,
             }
 
     def _parse_table(self, table_text: str) -> dict[str, Any]:
@@ -122,6 +170,9 @@ class MarkdownTableExtractor(AsyncNode):
 
     async def post_async(self, shared, prep_res, exec_res):
         shared["table_extraction"] = exec_res
+        if exec_res.get("text_table_count"):
+            # Tables rendered as images are replaced in this text downstream
+            shared["response_without_tables"] = exec_res["processed_text"]
 
         if exec_res["has_table"]:
             print(
@@ -2,20 +2,197 @@
 Table image rendering node for the async flow pipeline.
 """
 
+import asyncio
+import bisect
+import dataclasses
+import hashlib
 import io
+import json
+import math
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Any
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from pocketflow import AsyncNode
 
+from utils.config_utils import env_onoff_to_bool
+from utils.font_registry import (
+    BOLD_FONT_PATH,
+    LEGACY_FONT_PATH,
+    REGULAR_FONT_PATH,
+    font_registry,
+)
+from utils.glyph_atlas import glyph_atlas
+from utils.image_cache import RenderedImageCache
+from utils.image_encoding import IMAGE_FORMATS, encode_image
+from utils.line_breaking import break_opportunities
+from utils.metrics import metrics
+from utils.render_pool import BACKEND_INLINE, RenderPool
+from utils.text_measure import font_metrics
+
+# High resolution (3x scale) font sizes
+CELL_FONT_SIZE = 42
+HEADER_FONT_SIZE = CELL_FONT_SIZE + 6
+TABLE_COLORS = {
+    "bg": (255, 255, 255),
+    "header_bg": (230, 230, 230),
+    "row_bg": (255, 255, 255),
+    "row_bg_alt": (248, 248, 248),
+    "border": (200, 200, 200),
+    "text": (0, 0, 0),
+    "header_text": (20, 20, 20),
+}
+# Antialiasing between greys only yields greys, so images can be stored as 8-bit greyscale
+GREYSCALE_COLORS = all(r == g == b for r, g, b in TABLE_COLORS.values())
+# Threads drawing and encoding the tiles of one table
+MAX_TILE_THREADS = 4
+# Bump whenever a drawing change alters the image rendered for the same table
+RENDERER_VERSION = 2
+
+
+@dataclass(frozen=True)
+class TableRenderSettings:
+    """Renderer options, sent to the render workers along with each table."""
+
+    # Draw words by blitting cached glyph bitmaps instead of ImageDraw.text
+    glyph_atlas: bool = False
+    # Output encoding, see utils.image_encoding.encode_image
+    image_format: str = "png"
+    palette: bool = True
+    compress_level: int = 6
+    webp_method: int = 4
+    # Shrink tables whose full-size canvas exceeds this many pixels (0: no limit),
+    # but never below min_font_size for cell text
+    max_pixels: int = 0
+    min_font_size: int = 24
+    # Split tables taller than this many pixels into tiles with repeated headers (0: never)
+    tile_height: int = 0
+
+    def __post_init__(self):
+        if self.image_format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unsupported image format: {self.image_format}. Supported: {', '.join(IMAGE_FORMATS)}"
+            )
+
+    @classmethod
+    def from_env(cls) -> "TableRenderSettings":
+        """Create settings from the TABLE_RENDER_* and TABLE_IMAGE_* environment variables."""
+        return cls(
+            glyph_atlas=env_onoff_to_bool(os.getenv("TABLE_RENDER_GLYPH_ATLAS")),
+            image_format=(os.getenv("TABLE_IMAGE_FORMAT") or "png").lower(),
+            palette=env_onoff_to_bool(os.getenv("TABLE_IMAGE_PALETTE"), default=True),
+            compress_level=int(os.getenv("TABLE_IMAGE_COMPRESS_LEVEL", 6)),
+            webp_method=int(os.getenv("TABLE_IMAGE_WEBP_METHOD", 4)),
+            max_pixels=int(os.getenv("TABLE_RENDER_MAX_PIXELS", 0)),
+            min_font_size=int(os.getenv("TABLE_RENDER_MIN_FONT_SIZE", 24)),
+            tile_height=int(os.getenv("TABLE_RENDER_TILE_HEIGHT", 0)),
+        )
+
+
+def table_cache_key(table_data: dict[str, Any], settings: "TableRenderSettings") -> str:
+    """Stable sha256 of a parsed table, the renderer settings and the installed fonts."""
+    fonts = []
+    for path in (REGULAR_FONT_PATH, BOLD_FONT_PATH, LEGACY_FONT_PATH):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        # Size and mtime so a font replaced in place invalidates cached renders
+        fonts.append([str(path), stat.st_size, stat.st_mtime_ns])
+    payload = {
+        "version": RENDERER_VERSION,
+        "headers": table_data.get("headers", []),
+        "rows": table_data.get("rows", []),
+        "settings": dataclasses.asdict(settings),
+        "fonts": fonts,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class LayoutLine:
+    """A wrapped line: (segment type, word, x offset from line start) per word."""
+
+    words: list[tuple[str, str, float]]
+    width: float
+
+
+@dataclass
+class TableLayout:
+    """Column widths, wrapped cells and row heights, measured once per table."""
+
+    col_widths: list[int]
+    header_height: int
+    header_cells: list[list[LayoutLine]]
+    rows: list[tuple[list[list[LayoutLine]], int]]  # (cells, row height)
+    padding: int
+    line_height: int
+    first_row: int = 0  # Index of rows[0] in the whole table, for zebra striping
+
+    @property
+    def width(self) -> int:
+        return sum(self.col_widths) + len(self.col_widths) + 1
+
+    @property
+    def height(self) -> int:
+        return self.header_height + sum(h for _, h in self.rows) + len(self.rows) + 1
+
+    def split(self, max_height: int) -> list["TableLayout"]:
+        """
+        Row ranges that each fit in ``max_height`` pixels with the header repeated.
+
+        The tiles share column widths and wrapped cells with this layout; a row
+        taller than the budget gets a tile of its own.
+        """
+        if max_height <= 0 or self.height <= max_height:
+            return [self]
+        tiles, start, height = [], 0, self.header_height + 2
+        for i, (_, row_height) in enumerate(self.rows):
+            if i > start and height + row_height + 1 > max_height:
+                tiles.append(
+                    dataclasses.replace(
+                        self,
+                        rows=self.rows[start:i],
+                        first_row=self.first_row + start,
+                    )
+                )
+                start, height = i, self.header_height + 2
+            height += row_height + 1
+        tiles.append(
+            dataclasses.replace(
+                self, rows=self.rows[start:], first_row=self.first_row + start
+            )
+        )
+        return tiles
+
 
 class TableImageRenderer(AsyncNode):
     """Node to render markdown tables as images"""
 
+    def __init__(
+        self,
+        render_pool: RenderPool | None = None,
+        settings: TableRenderSettings | None = None,
+        image_cache: RenderedImageCache | None = None,
+    ):
+        super().__init__()
+        self.settings = settings or TableRenderSettings()
+        self.image_cache = image_cache
+        # Renders on the event loop's thread unless a thread/process pool is given
+        self.render_pool = render_pool or RenderPool(
+            render_table_images, kind=BACKEND_INLINE, initializer=warm_table_fonts
+        )
+
     async def prep_async(self, shared):
         extracted_tables = shared.get("extracted_tables", [])
-        llm_response = shared.get("llm_response", "")
+        # Small tables may already have been inlined as text by the extractor
+        llm_response = shared.get("response_without_tables") or shared.get(
+            "llm_response", ""
+        )
         message_id = shared.get("message_id", "")
 
         print("🖼️ [TableImageRenderer] Preparing to render tables as images")
@@ -47,6 +224,22 @@ class TableImageRenderer(AsyncNode):
         rendered_images = []
         response_text = prep_res["llm_response"]
 
+        # Render every valid table of the response in parallel
+        valid_tables = [t for t in prep_res["extracted_tables"] if t["parsed"]["valid"]]
+        for table in valid_tables:
+            parsed_data = table["parsed"]
+            print(
+                f"📋 [TableImageRenderer] Table {table['index'] + 1}: {len(parsed_data.get('headers', []))} headers, {len(parsed_data.get('rows', []))} rows"
+            )
+        print(
+            f"🎨 [TableImageRenderer] Starting image rendering for {len(valid_tables)} table(s) on the {self.render_pool.kind} backend"
+        )
+        results = await self._render_tables([table["parsed"] for table in valid_tables])
+        rendered = {
+            id(table): result
+            for table, result in zip(valid_tables, results, strict=True)
+        }
+
         # Replace tables with placeholders in response text
         for table in prep_res["extracted_tables"]:
             table_index = table.get("index", "unknown")
@@ -56,55 +249,40 @@ class TableImageRenderer(AsyncNode):
 
             print(f"🔄 [TableImageRenderer] Processing table {table_count}")
 
-            if table["parsed"]["valid"]:
-                try:
-                    parsed_data = table["parsed"]
-                    headers = parsed_data.get("headers", [])
-                    rows = parsed_data.get("rows", [])
-
-                    print(
-                        f"📋 [TableImageRenderer] Table {table_count}: {len(headers)} headers, {len(rows)} rows"
-                    )
-                    print(f"📋 [TableImageRenderer] Headers: {headers}")
+            if not table["parsed"]["valid"]:
+                print(f"⚠️ [TableImageRenderer] Skipping invalid table {table_count}")
+                continue
 
-                    # Render table as image
-                    print(
-                        f"🎨 [TableImageRenderer] Starting image rendering for table {table_count}"
-                    )
-                    image_buffer = self._render_table_image(table["parsed"])
-
-                    rendered_images.append(
-                        {
-                            "index": table["index"],
-                            "buffer": image_buffer,
-                            "filename": f"table_{table['index'] + 1}.png",
-                        }
-                    )
+            result = rendered[id(table)]
+            if isinstance(result, Exception):
+                print(
+                    f"❌ [TableImageRenderer] Failed to render table {table_count}: {result}"
+                )
+                print(f"🔍 [TableImageRenderer] Table data: {table.get('parsed', {})}")
+                continue
 
-                    # Replace table in response text with placeholder
-                    table_raw_text = table.get("raw_text", "")
-                    if table_raw_text and table_raw_text in response_text:
-                        placeholder = f"> `[daia_replaced_table_{prep_res['message_id']}_{table_count}_as_image]`"
-                        response_text = response_text.replace(
-                            table_raw_text, placeholder
-                        )
-                        print(
-                            f"🔄 [TableImageRenderer] Replaced table {table_count} with placeholder"
-                        )
+            for part, image in enumerate(result):
+                suffix = f"_{part + 1}" if len(result) > 1 else ""
+                rendered_images.append(
+                    {
+                        "index": table["index"],
+                        "part": part,
+                        # BytesIO shares the worker's bytes instead of copying them
+                        "buffer": io.BytesIO(image),
+                        "filename": f"table_{table['index'] + 1}{suffix}.{self.settings.image_format}",
+                    }
+                )
 
-                    print(
-                        f"✅ [TableImageRenderer] Successfully rendered table {table_count}"
-                    )
+            # Replace table in response text with placeholder
+            table_raw_text = table.get("raw_text", "")
+            if table_raw_text and table_raw_text in response_text:
+                placeholder = f"> `[daia_replaced_table_{prep_res['message_id']}_{table_count}_as_image]`"
+                response_text = response_text.replace(table_raw_text, placeholder)
+                print(
+                    f"🔄 [TableImageRenderer] Replaced table {table_count} with placeholder"
+                )
 
-                except Exception as e:
-                    print(
-                        f"❌ [TableImageRenderer] Failed to render table {table_count}: {e}"
-                    )
-                    print(
-                        f"🔍 [TableImageRenderer] Table data: {table.get('parsed', {})}"
-                    )
-            else:
-                print(f"⚠️ [TableImageRenderer] Skipping invalid table {table_count}")
+            print(f"✅ [TableImageRenderer] Successfully rendered table {table_count}")
 
         # Clean up response text (remove extra newlines)
         response_text = re.sub(r"\n\s*\n\s*\n", "\n\n", response_text).strip()
@@ -115,26 +293,39 @@ class TableImageRenderer(AsyncNode):
             "rendered_count": len(rendered_images),
         }
 
-    def _get_font(self, size: int, bold: bool = False):
-        """Load Noto Sans font (regular or bold)."""
-        try:
-            # Choose the appropriate font file based on bold parameter
-            if bold:
-                font_path = "assets/fonts/03_NotoSansCJK-OTC/NotoSansCJK-Bold.ttc"
-            else:
-                font_path = "assets/fonts/03_NotoSansCJK-OTC/NotoSansCJK-Regular.ttc"
-
-            return ImageFont.truetype(font_path, size)
-        except Exception as e:
-            # Fallback to old path for backward compatibility
-            try:
-                font_path = "assets/fonts/NotoSansCJK.ttc"
-                return ImageFont.truetype(font_path, size)
-            except Exception as e2:
-                print(
-                    f"⚠️ [TableImageRenderer] Could not load font from either path: {e}, {e2}, using default"
+    async def _render_tables(self, tables: list[dict]) -> list[list[bytes] | Exception]:
+        """Encoded images (or the render error) per table, reusing cached images."""
+        if self.image_cache is None:
+            return await self.render_pool.render_many(tables, settings=self.settings)
+
+        # Lookups and stores may hit the SQLite backing store, so both run on a
+        # worker thread instead of blocking the event loop on disk I/O
+        keys = [table_cache_key(table, self.settings) for table in tables]
+        results: list[list[bytes] | Exception | None] = await asyncio.to_thread(
+            lambda: [self.image_cache.get(key) for key in keys]
+        )
+        misses = [i for i, result in enumerate(results) if result is None]
+        print(
+            f"🗃️ [TableImageRenderer] Image cache: {len(tables) - len(misses)} hit(s), {len(misses)} miss(es)"
+        )
+        if misses:
+            rendered = await self.render_pool.render_many(
+                [tables[i] for i in misses], settings=self.settings
+            )
+            fresh = []
+            for i, result in zip(misses, rendered, strict=True):
+                results[i] = result
+                if isinstance(result, list):
+                    fresh.append((keys[i], result))
+            if fresh:
+                await asyncio.to_thread(
+                    lambda: [self.image_cache.put(key, images) for key, images in fresh]
                 )
-                return ImageFont.load_default()
+        return results
+
+    def _get_font(self, size: int, bold: bool = False):
+        """Load Noto Sans font (regular or bold) from the process-wide registry."""
+        return font_registry.get_font(size, bold=bold)
 
     def _parse_text_formatting(self, text: str):
         """Parse text with **bold** formatting into segments, handling various patterns."""
@@ -184,7 +375,6 @@ class TableImageRenderer(AsyncNode):
         if not text:
             return [[("regular", "")]]
 
-        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
         segments = self._parse_text_formatting(text)
 
         lines = []
@@ -193,12 +383,13 @@ class TableImageRenderer(AsyncNode):
 
         for segment_type, segment_text in segments:
             font = fonts["cell_bold"] if segment_type == "bold" else fonts["cell"]
+            measure = font_metrics(font)
+            space_width = measure.width(" ")
             words = segment_text.split()
 
             for word in words:
                 # Calculate word width without trailing space first
-                word_width = draw.textlength(word, font=font)
-                space_width = draw.textlength(" ", font=font)
+                word_width = measure.width(word)
 
                 # Check if we need space before this word (not first word in line)
                 space_needed = space_width if current_line else 0
@@ -208,32 +399,48 @@ class TableImageRenderer(AsyncNode):
                 if current_width + total_width_needed <= max_width:
                     current_line.append((segment_type, word))
                     current_width += word_width + space_width  # Add space for next word
-                else:
-                    # Start new line
+                    continue
+
+                # Split the word at its break opportunities (between CJK
+                # characters); each line takes the furthest one that fits,
+                # found by binary search over the cumulative glyph widths
+                prefix = measure.prefix_widths(word)
+                stops = [*break_opportunities(word), len(word)]
+                stop_widths = [prefix[stop - 1] for stop in stops]
+                start = 0
+                while start < len(word):
+                    # Width before word[start], so prefix[end - 1] - offset is
+                    # the width of word[start:end] drawn on its own
+                    offset = (
+                        prefix[start - 1]
+                        + measure.kerning(word[start - 1], word[start])
+                        if start
+                        else 0.0
+                    )
+                    room = max_width - current_width
                     if current_line:
+                        room -= space_width
+                    first = bisect.bisect_right(stops, start)
+                    last = bisect.bisect_right(stop_widths, offset + room, lo=first) - 1
+                    if last >= first:
+                        end = stops[last]
+                    elif current_line:
+                        # Start new line
                         lines.append(current_line)
-
-                    # Handle very long words that don't fit in max_width
-                    if word_width > max_width:
-                        # Break long word into chunks
-                        chars = list(word)
-                        chunk = ""
-                        for char in chars:
-                            test_chunk = chunk + char
-                            if draw.textlength(test_chunk, font=font) <= max_width:
-                                chunk = test_chunk
-                            else:
-                                if chunk:
-                                    lines.append([(segment_type, chunk)])
-                                chunk = char
-                        if chunk:
-                            current_line = [(segment_type, chunk)]
-                            current_width = (
-                                draw.textlength(chunk, font=font) + space_width
-                            )
+                        current_line, current_width = [], 0
+                        continue
                     else:
-                        current_line = [(segment_type, word)]
-                        current_width = word_width + space_width
+                        # Nothing fits on an empty line: break between any characters
+                        end = max(
+                            bisect.bisect_right(prefix, offset + room, lo=start),
+                            start + 1,
+                        )
+                    current_line.append((segment_type, word[start:end]))
+                    current_width += prefix[end - 1] - offset + space_width
+                    if end < len(word):
+                        lines.append(current_line)
+                        current_line, current_width = [], 0
+                    start = end
 
         if current_line:
             lines.append(current_line)
@@ -245,11 +452,11 @@ class TableImageRenderer(AsyncNode):
         if not text:
             return [""]
 
-        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        measure = font_metrics(font)
         words, lines, current = text.split(), [], ""
         for word in words:
             test = (current + " " + word).strip()
-            if draw.textlength(test, font=font) <= max_width:
+            if measure.width(test) <= max_width:
                 current = test
             else:
                 if current:
@@ -259,24 +466,50 @@ class TableImageRenderer(AsyncNode):
             lines.append(current)
         return lines or [""]
 
-    def _calc_col_widths(self, headers, rows, font, padding: int = 36):
+    def _position_line(self, line_segments, regular_font, bold_font) -> LayoutLine:
+        """Measure a wrapped line once: x offset of each word and the line width."""
+        words, x, width = [], 0.0, 0.0
+        for idx, (segment_type, word) in enumerate(line_segments):
+            measure = font_metrics(
+                bold_font if segment_type == "bold" else regular_font
+            )
+            space_width = measure.width(" ")
+            # Space before word (except for first word)
+            if idx > 0:
+                x += space_width
+            words.append((segment_type, word, x))
+            word_width = measure.width(word)
+            x += word_width
+            # Line width counts each space with the font of the word before it
+            width += word_width + (space_width if idx < len(line_segments) - 1 else 0)
+        return LayoutLine(words, width)
+
+    def _calc_col_widths(
+        self,
+        headers,
+        rows,
+        font,
+        padding: int = 36,
+        min_col_width: int = 360,
+        max_col_width: int = 1200,
+    ):
         """Calculate optimal column widths with limits (high resolution)."""
         print(
             f"📏 [TableImageRenderer] Calculating high-resolution column widths for {len(headers)} columns"
         )
 
-        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        measure = font_metrics(font)
         col_widths = []
         for i, header in enumerate(headers):
             max_width = max(
-                360, int(draw.textlength(header, font=font)) + padding * 2
+                min_col_width, int(measure.width(header)) + padding * 2
             )  # 3x larger min width
             for row in rows:
                 if i < len(row):
                     text = str(row[i]).strip()
-                    text_width = int(draw.textlength(text, font=font)) + padding * 2
+                    text_width = int(measure.width(text)) + padding * 2
                     max_width = max(
-                        max_width, min(text_width, 1200)
+                        max_width, min(text_width, max_col_width)
                     )  # 3x larger max width
             col_widths.append(max_width)
             print(
@@ -288,79 +521,116 @@ class TableImageRenderer(AsyncNode):
         )
         return col_widths
 
-    def _draw_header(
-        self, draw, headers, col_widths, header_height, fonts, colors, padding
-    ):
+    def _layout_table(
+        self,
+        headers,
+        rows,
+        fonts,
+        padding,
+        header_height,
+        min_cell_height,
+        col_width_range: tuple[int, int] = (360, 1200),
+    ) -> TableLayout:
+        """Wrap and measure every cell once; drawing only reads the result."""
+        col_widths = self._calc_col_widths(
+            headers, rows, fonts["cell"], padding, *col_width_range
+        )
+
+        # Headers are wrapped with the cell fonts and drawn with the header fonts
+        header_cells = [
+            [
+                self._position_line(line, fonts["header"], fonts["header_bold"])
+                for line in self._wrap_text_with_formatting(
+                    header, width - padding * 2, fonts
+                )
+            ]
+            for header, width in zip(headers, col_widths, strict=False)
+        ]
+
+        # Process rows
+        print("📝 [TableImageRenderer] Processing row text wrapping")
+        laid_out_rows = []
+        for row_idx, row in enumerate(rows):
+            cells, row_height = [], min_cell_height
+            for i, cell in enumerate(row):
+                wrapped = self._wrap_text_with_formatting(
+                    str(cell).strip(), col_widths[i] - padding * 2, fonts
+                )
+                cells.append(
+                    [
+                        self._position_line(line, fonts["cell"], fonts["cell_bold"])
+                        for line in wrapped
+                    ]
+                )
+                row_height = max(
+                    row_height, len(wrapped) * fonts["line_height"] + padding
+                )
+            laid_out_rows.append((cells, row_height))
+            print(f"📝 [TableImageRenderer] Row {row_idx + 1}: height={row_height}px")
+
+        return TableLayout(
+            col_widths=col_widths,
+            header_height=header_height,
+            header_cells=header_cells,
+            rows=laid_out_rows,
+            padding=padding,
+            line_height=fonts["line_height"],
+        )
+
+    def _draw_word(self, draw, xy, word: str, fill, font):
+        """Draw one word, from the glyph atlas when enabled."""
+        if self.settings.glyph_atlas:
+            glyph_atlas(font).draw_text(draw, xy, word, fill)
+        else:
+            draw.text(xy, word, fill=fill, font=font)
+
+    def _draw_header(self, draw, layout: TableLayout, fonts, colors):
         """Draw the table header row with bold formatting support."""
         x = 0
-        for _i, (header, width) in enumerate(zip(headers, col_widths, strict=False)):
+        header_height = layout.header_height
+        for header_lines, width in zip(
+            layout.header_cells, layout.col_widths, strict=False
+        ):
             draw.rectangle(
                 [x, 0, x + width, header_height],
                 fill=colors["header_bg"],
                 outline=colors["border"],
             )
 
-            # Use formatting-aware text wrapping for headers
-            header_lines = self._wrap_text_with_formatting(
-                header, width - padding * 2, fonts
-            )
-            total_text_height = len(header_lines) * fonts["line_height"]
+            total_text_height = len(header_lines) * layout.line_height
             text_y = (header_height - total_text_height) // 2
 
-            for line_segments in header_lines:
-                # Calculate total line width for centering
-                line_width = 0
-                for segment_type, word in line_segments:
-                    font = (
-                        fonts["header_bold"]
-                        if segment_type == "bold"
-                        else fonts["header"]
-                    )
-                    line_width += draw.textlength(word, font=font)
-                    # Add space width except for last segment
-                    if (segment_type, word) != line_segments[-1]:
-                        line_width += draw.textlength(" ", font=font)
-
+            for line in header_lines:
                 # Center the line
-                text_x = x + (width - line_width) // 2
-
-                # Draw each segment
-                current_x = text_x
-                for idx, (segment_type, word) in enumerate(line_segments):
+                text_x = x + (width - line.width) // 2
+                for segment_type, word, offset in line.words:
                     font = (
                         fonts["header_bold"]
                         if segment_type == "bold"
                         else fonts["header"]
                     )
-                    # Add space before word (except for first word)
-                    if idx > 0:
-                        draw.text(
-                            (current_x, text_y),
-                            " ",
-                            fill=colors["header_text"],
-                            font=font,
-                        )
-                        current_x += draw.textlength(" ", font=font)
-                    # Draw the word
-                    draw.text(
-                        (current_x, text_y), word, fill=colors["header_text"], font=font
+                    self._draw_word(
+                        draw,
+                        (text_x + offset, text_y),
+                        word,
+                        colors["header_text"],
+                        font,
                     )
-                    current_x += draw.textlength(word, font=font)
-
-                text_y += fonts["line_height"]
+                text_y += layout.line_height
             x += width + 1
 
-    def _draw_rows(
-        self, draw, rows, processed_data, col_widths, start_y, fonts, colors, padding
-    ):
+    def _draw_rows(self, draw, layout: TableLayout, start_y, fonts, colors):
         """Draw table rows with zebra striping and formatted text."""
+        padding, line_height = layout.padding, layout.line_height
         y = start_y
-        for row_idx, (processed_row, row_height) in enumerate(processed_data):
+        for row_idx, (cells, row_height) in enumerate(layout.rows):
             x = 0
-            row_bg = colors["row_bg_alt"] if row_idx % 2 else colors["row_bg"]
-            for _i, (wrapped_lines, width) in enumerate(
-                zip(processed_row, col_widths, strict=False)
-            ):
+            row_bg = (
+                colors["row_bg_alt"]
+                if (layout.first_row + row_idx) % 2
+                else colors["row_bg"]
+            )
+            for lines, width in zip(cells, layout.col_widths, strict=False):
                 draw.rectangle(
                     [x, y, x + width, y + row_height],
                     fill=row_bg,
@@ -368,103 +638,135 @@ class TableImageRenderer(AsyncNode):
                 )
                 text_x, text_y = x + padding, y + padding // 2
 
-                for line_segments in wrapped_lines:
-                    if text_y + fonts["line_height"] <= y + row_height - padding // 2:
-                        current_x = text_x
-                        for idx, (segment_type, word) in enumerate(line_segments):
+                for line in lines:
+                    if text_y + line_height <= y + row_height - padding // 2:
+                        for segment_type, word, offset in line.words:
                             font = (
                                 fonts["cell_bold"]
                                 if segment_type == "bold"
                                 else fonts["cell"]
                             )
-                            # Add space before word (except for first word)
-                            if idx > 0:
-                                draw.text(
-                                    (current_x, text_y),
-                                    " ",
-                                    fill=colors["text"],
-                                    font=font,
-                                )
-                                current_x += draw.textlength(" ", font=font)
-                            # Draw the word
-                            draw.text(
-                                (current_x, text_y),
+                            self._draw_word(
+                                draw,
+                                (text_x + offset, text_y),
                                 word,
-                                fill=colors["text"],
-                                font=font,
+                                colors["text"],
+                                font,
                             )
-                            current_x += draw.textlength(word, font=font)
-                        text_y += fonts["line_height"]
+                        text_y += line_height
                 x += width + 1
             y += row_height + 1
         return y
 
     def _render_table_image(self, table_data: dict[str, Any]) -> io.BytesIO:
-        headers, rows = table_data["headers"], table_data["rows"]
+        img = self._draw_table(table_data)
 
-        print("🎨 [TableImageRenderer] Starting table image rendering")
+        # Save high resolution image
         print(
-            f"📊 [TableImageRenderer] Table dimensions: {len(headers)} columns × {len(rows)} rows"
+            f"💾 [TableImageRenderer] Encoding high-resolution image as {self.settings.image_format}"
         )
+        buffer = io.BytesIO(self._encode(img))
 
-        # Safety check
-        if not headers:
-            print("❌ [TableImageRenderer] No headers found in table data")
-            raise ValueError("Table must have at least one header")
+        print(
+            f"✅ [TableImageRenderer] High-resolution image rendering complete, buffer size: {len(buffer.getvalue())} bytes"
+        )
+        return buffer
 
-        # High resolution fonts (3x scale)
-        font_size = 42  # 3x larger for high resolution
+    def _encode(self, img: Image.Image) -> bytes:
+        return encode_image(
+            img,
+            image_format=self.settings.image_format,
+            palette=self.settings.palette,
+            greyscale=GREYSCALE_COLORS,
+            compress_level=self.settings.compress_level,
+            webp_method=self.settings.webp_method,
+            dpi=(300, 300),  # High DPI for crisp output
+        )
+
+    def _layout_at_size(self, headers, rows, font_size: int):
+        """Fonts and layout with every dimension scaled by font_size / CELL_FONT_SIZE."""
+        scale = font_size / CELL_FONT_SIZE
         print(
             f"🔤 [TableImageRenderer] Loading high-resolution fonts with size {font_size}"
         )
         fonts = {
-            "header": self._get_font(font_size + 6, bold=False),  # 48px
-            "header_bold": self._get_font(font_size + 6, bold=True),  # 48px bold
-            "cell": self._get_font(font_size, bold=False),  # 42px
-            "cell_bold": self._get_font(font_size, bold=True),  # 42px bold
-            "line_height": font_size + 12,  # 54px line height
+            "header": self._get_font(round(HEADER_FONT_SIZE * scale), bold=False),
+            "header_bold": self._get_font(round(HEADER_FONT_SIZE * scale), bold=True),
+            "cell": self._get_font(font_size, bold=False),
+            "cell_bold": self._get_font(font_size, bold=True),
+            "line_height": font_size + round(12 * scale),  # 54px at full size
         }
 
-        # Colors
-        colors = {
-            "bg": (255, 255, 255),
-            "header_bg": (230, 230, 230),
-            "row_bg": (255, 255, 255),
-            "row_bg_alt": (248, 248, 248),
-            "border": (200, 200, 200),
-            "text": (0, 0, 0),
-            "header_text": (20, 20, 20),
-        }
-
-        # High resolution layout (3x scale)
-        padding, header_height, min_cell_height = 36, 120, 84  # 3x larger
+        # High resolution layout (3x scale at full size)
+        padding, header_height, min_cell_height = (
+            round(value * scale) for value in (36, 120, 84)
+        )
         print(
             f"📐 [TableImageRenderer] High-resolution layout settings: padding={padding}, header_height={header_height}"
         )
+        layout = self._layout_table(
+            headers,
+            rows,
+            fonts,
+            padding,
+            header_height,
+            min_cell_height,
+            col_width_range=(round(360 * scale), round(1200 * scale)),
+        )
+        return fonts, layout
+
+    def _fit_layout(self, headers, rows):
+        """
+        Lay out at full size, then shrink to fit ``settings.max_pixels``.
+
+        Canvas area grows with the square of the font size, so the first guess
+        is ``sqrt(budget / pixels)``; font sizes are whole pixels and wrapping
+        shifts with the size, so smaller sizes are tried until the canvas fits
+        or ``settings.min_font_size`` is reached.
+        """
+        font_size = CELL_FONT_SIZE
+        fonts, layout = self._layout_at_size(headers, rows, font_size)
+        budget = self.settings.max_pixels
+        min_size = min(CELL_FONT_SIZE, self.settings.min_font_size)
+        pixels = layout.width * layout.height
+        if budget and pixels > budget:
+            size = max(min_size, int(CELL_FONT_SIZE * math.sqrt(budget / pixels)))
+            while True:
+                font_size = size
+                fonts, layout = self._layout_at_size(headers, rows, font_size)
+                if layout.width * layout.height <= budget or size <= min_size:
+                    break
+                size = max(min_size, int(size * 0.95))
+            print(
+                f"📉 [TableImageRenderer] {pixels} px exceeds the {budget} px budget, using font size {font_size} ({layout.width}×{layout.height}px)"
+            )
 
-        col_widths = self._calc_col_widths(headers, rows, fonts["cell"], padding)
+        scale = font_size / CELL_FONT_SIZE
+        metrics.observe("table_render.scale", scale)
+        if scale < 1:
+            metrics.incr("table_render.downscaled")
+        return fonts, layout
 
-        # Process rows
-        print("📝 [TableImageRenderer] Processing row text wrapping")
-        processed_data = []
-        for row_idx, row in enumerate(rows):
-            processed_row, row_height = [], min_cell_height
-            for i, cell in enumerate(row):
-                wrapped = self._wrap_text_with_formatting(
-                    str(cell).strip(), col_widths[i] - padding * 2, fonts
-                )
-                processed_row.append(wrapped)
-                row_height = max(
-                    row_height, len(wrapped) * fonts["line_height"] + padding
-                )
-            processed_data.append((processed_row, row_height))
-            print(f"📝 [TableImageRenderer] Row {row_idx + 1}: height={row_height}px")
+    def _prepare_layout(self, table_data: dict[str, Any]):
+        headers, rows = table_data["headers"], table_data["rows"]
 
-        # Canvas
-        total_width = sum(col_widths) + len(col_widths) + 1
-        total_height = (
-            header_height + sum(h for _, h in processed_data) + len(processed_data) + 1
+        print("🎨 [TableImageRenderer] Starting table image rendering")
+        print(
+            f"📊 [TableImageRenderer] Table dimensions: {len(headers)} columns × {len(rows)} rows"
         )
+
+        # Safety check
+        if not headers:
+            print("❌ [TableImageRenderer] No headers found in table data")
+            raise ValueError("Table must have at least one header")
+
+        return self._fit_layout(headers, rows)
+
+    def _draw_layout(self, layout: TableLayout, fonts) -> Image.Image:
+        colors = TABLE_COLORS
+
+        # Canvas
+        total_width, total_height = layout.width, layout.height
         print(f"🖼️ [TableImageRenderer] Creating canvas: {total_width}×{total_height}px")
 
         img = Image.new("RGB", (total_width, total_height), colors["bg"])
@@ -472,34 +774,42 @@ class TableImageRenderer(AsyncNode):
 
         # Draw table
         print("🎨 [TableImageRenderer] Drawing header row")
-        self._draw_header(
-            draw, headers, col_widths, header_height, fonts, colors, padding
-        )
+        self._draw_header(draw, layout, fonts, colors)
 
-        print(f"🎨 [TableImageRenderer] Drawing {len(rows)} data rows")
-        self._draw_rows(
-            draw,
-            rows,
-            processed_data,
-            col_widths,
-            header_height + 1,
-            fonts,
-            colors,
-            padding,
-        )
+        print(f"🎨 [TableImageRenderer] Drawing {len(layout.rows)} data rows")
+        self._draw_rows(draw, layout, layout.header_height + 1, fonts, colors)
 
-        # Save high resolution image
-        print("💾 [TableImageRenderer] Saving high-resolution image to buffer")
-        buffer = io.BytesIO()
-        img.save(
-            buffer, format="PNG", quality=100, optimize=False, dpi=(300, 300)
-        )  # High DPI for crisp output
-        buffer.seek(0)
+        return img
+
+    def _draw_table(self, table_data: dict[str, Any]) -> Image.Image:
+        fonts, layout = self._prepare_layout(table_data)
+        return self._draw_layout(layout, fonts)
+
+    def _render_table_tiles(self, table_data: dict[str, Any]) -> list[bytes]:
+        """
+        Encoded images of a table, split into tiles of at most settings.tile_height.
+
+        The layout is computed once and shared by all tiles, so columns line up
+        across them; tiles are drawn and encoded on separate threads (zlib and
+        WebP encoding release the GIL).
+        """
+        fonts, layout = self._prepare_layout(table_data)
+        tiles = layout.split(self.settings.tile_height)
+        if len(tiles) == 1:
+            return [self._encode(self._draw_layout(layout, fonts))]
 
         print(
-            f"✅ [TableImageRenderer] High-resolution image rendering complete, buffer size: {len(buffer.getvalue())} bytes"
+            f"🧩 [TableImageRenderer] Splitting {layout.width}×{layout.height}px table into {len(tiles)} tiles"
         )
-        return buffer
+        metrics.observe("table_render.tiles", len(tiles))
+        with ThreadPoolExecutor(
+            max_workers=min(len(tiles), MAX_TILE_THREADS)
+        ) as executor:
+            return list(
+                executor.map(
+                    lambda tile: self._encode(self._draw_layout(tile, fonts)), tiles
+                )
+            )
 
     async def post_async(self, shared, prep_res, exec_res):
         images = exec_res["images"]
@@ -528,3 +838,18 @@ class TableImageRenderer(AsyncNode):
         else:
             print("⚠️ [TableImageRenderer] No images rendered")
             return "no_images"
+
+
+def warm_table_fonts() -> None:
+    """Load every font the renderer uses; run once per render worker."""
+    for size in (CELL_FONT_SIZE, HEADER_FONT_SIZE):
+        font_registry.get_font(size, bold=False)
+        font_registry.get_font(size, bold=True)
+
+
+def render_table_images(
+    table_data: dict[str, Any], settings: TableRenderSettings | None = None
+) -> list[bytes]:
+    """Render one parsed table to encoded images (one per tile); the entry point run by RenderPool workers."""
+    renderer = TableImageRenderer(settings=settings)
+    return renderer._render_table_tiles(table_data)
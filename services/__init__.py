@@ -7,6 +7,7 @@ from .llm_service import (
     get_router_config,
     get_thinker_config,
     init_llm_configs,
+    load_fallback_configs,
 )
 
 __all__ = [
@@ -14,4 +15,5 @@ __all__ = [
     "get_chat_config",
     "get_router_config",
     "get_thinker_config",
+    "load_fallback_configs",
 ]
@@ -7,7 +7,8 @@ import os
 
 from google import genai
 
-from utils import LLMConfig
+from utils import ClientPool, LLMConfig, OpenAICompatibleClient
+from utils.client_pool import split_api_keys
 
 # Global config instances
 _chat_config: LLMConfig | None = None
@@ -15,11 +16,85 @@ _router_config: LLMConfig | None = None
 _thinker_config: LLMConfig | None = None
 
 
-def _create_client(api_key: str | None):
-    """Create a Gemini client if API key is provided"""
-    if not api_key:
+def _pooled(api_key: str | None, factory, role: str):
+    """One client for a single key, a ClientPool for comma-separated keys."""
+    keys = split_api_keys(api_key)
+    if not keys:
         return None
-    return genai.Client(api_key=api_key)
+    if len(keys) == 1:
+        return factory(keys[0])
+    pool = ClientPool.from_keys(keys, factory, name=role)
+    print(
+        f"🔑 [llm_service] {role} uses {len(pool)} API keys ({pool.strategy}, {pool.cooldown_seconds:.0f}s cooldown)"
+    )
+    return pool
+
+
+def _create_client(api_key: str | None, role: str = "chat"):
+    """Create a Gemini client (or a pool of them) if API key(s) are provided"""
+    return _pooled(api_key, lambda key: genai.Client(api_key=key), role)
+
+
+def _create_provider_client(
+    provider: str,
+    api_key: str | None,
+    base_url: str | None = None,
+    role: str = "chat",
+):
+    """Create a client matching the provider name."""
+    if provider == "openai_compatible":
+        if not base_url:
+            return None
+        keys = split_api_keys(api_key)
+        if len(keys) <= 1:
+            return OpenAICompatibleClient(base_url=base_url, api_key=api_key)
+        return _pooled(
+            api_key,
+            lambda key: OpenAICompatibleClient(base_url=base_url, api_key=key),
+            role,
+        )
+    return _create_client(api_key, role)
+
+
+def load_fallback_configs(role: str) -> list[LLMConfig]:
+    """Load ordered fallback targets for a role from numbered environment variables.
+
+    Reads ``{ROLE}_FALLBACK_{n}_PROVIDER``, ``_MODEL``, ``_API_KEY``, ``_BASE_URL``
+    and ``_TIMEOUT`` for n = 1, 2, ... until a number has a blank model. A blank
+    provider means ``gemini``.
+
+    Args:
+        role: Role prefix such as "CHAT" or "THINKER"
+    """
+    fallbacks = []
+    index = 1
+    while True:
+        prefix = f"{role.upper()}_FALLBACK_{index}_"
+        model = (os.getenv(prefix + "MODEL") or "").strip()
+        if not model:
+            break
+        # The example env ships blank lines, which must fall back to the default
+        provider = (os.getenv(prefix + "PROVIDER") or "").strip() or "gemini"
+        client = _create_provider_client(
+            provider,
+            os.getenv(prefix + "API_KEY"),
+            os.getenv(prefix + "BASE_URL"),
+            role=f"{role.lower()}_fallback_{index}",
+        )
+        if client is None:
+            print(f"⚠️ [llm_service] Skipping {prefix}*: missing API key or base URL")
+        else:
+            timeout = os.getenv(prefix + "TIMEOUT")
+            fallbacks.append(
+                LLMConfig(
+                    client=client,
+                    model=model,
+                    provider=provider,
+                    timeout=float(timeout) if timeout else None,
+                )
+            )
+        index += 1
+    return fallbacks
 
 
 def init_llm_configs(
@@ -36,34 +111,51 @@ def init_llm_configs(
 
     # Chat model config
     chat_api_key = os.getenv("CHAT_MODEL_API_KEY")
-    if chat_api_key:
+    chat_provider = os.getenv("CHAT_MODEL_PROVIDER") or "gemini"
+    chat_client = _create_provider_client(
+        chat_provider, chat_api_key, os.getenv("CHAT_MODEL_BASE_URL"), "chat"
+    )
+    if chat_client is None and chat_provider == "openai_compatible":
+        print(
+            "⚠️ [llm_service] CHAT_MODEL_PROVIDER=openai_compatible needs CHAT_MODEL_BASE_URL"
+        )
+    if chat_client is not None:
         _chat_config = LLMConfig(
-            client=_create_client(chat_api_key),
+            client=chat_client,
             model=os.getenv("CHAT_MODEL", "gemini-2.5-flash"),
             temperature=float(os.getenv("CHAT_TEMPERATURE", 1.0)),
-            provider=os.getenv("CHAT_MODEL_PROVIDER", "gemini"),
+            provider=chat_provider,
             system_prompt=chat_system_prompt,
             tools=chat_tools or [],
+            fallbacks=load_fallback_configs("CHAT"),
         )
 
     # Router model config (low temperature for deterministic routing)
-    router_api_key = os.getenv("ROUTER_MODEL_API_KEY")
+    # Reuses the chat API key when only ROUTER_MODEL is set
+    router_api_key = os.getenv("ROUTER_MODEL_API_KEY") or (
+        chat_api_key if os.getenv("ROUTER_MODEL") else None
+    )
     if router_api_key:
         _router_config = LLMConfig(
-            client=_create_client(router_api_key),
-            model=os.getenv("ROUTER_MODEL", "gemini-2.0-flash"),
+            client=_create_client(router_api_key, "router"),
+            model=os.getenv("ROUTER_MODEL") or "gemini-2.0-flash",
             temperature=0.0,
-            provider=os.getenv("ROUTER_MODEL_PROVIDER", "gemini"),
+            provider=os.getenv("ROUTER_MODEL_PROVIDER") or "gemini",
         )
 
-    # Thinker model config
-    thinker_api_key = os.getenv("THINKER_MODEL_API_KEY")
+    # Thinker model config, answering with the chat persona and tools
+    thinker_api_key = os.getenv("THINKER_MODEL_API_KEY") or (
+        chat_api_key if os.getenv("THINKER_MODEL") else None
+    )
     if thinker_api_key:
         _thinker_config = LLMConfig(
-            client=_create_client(thinker_api_key),
-            model=os.getenv("THINKER_MODEL", "gemini-2.5-pro"),
-            temperature=float(os.getenv("THINKER_TEMPERATURE", 0.7)),
-            provider=os.getenv("THINKER_MODEL_PROVIDER", "gemini"),
+            client=_create_client(thinker_api_key, "thinker"),
+            model=os.getenv("THINKER_MODEL") or "gemini-2.5-pro",
+            temperature=float(os.getenv("THINKER_TEMPERATURE") or 0.7),
+            provider=os.getenv("THINKER_MODEL_PROVIDER") or "gemini",
+            system_prompt=chat_system_prompt,
+            tools=chat_tools or [],
+            fallbacks=load_fallback_configs("THINKER"),
         )
 
 
@@ -10,7 +10,9 @@ def test_import_nodes():
         FetchDiscordHistory,
         LLMChat,
         MarkdownTableExtractor,
+        ModelRouter,
         ProcessMessageHistory,
+        SearchToolGate,
         SendDiscordResponse,
         TableImageRenderer,
     )
@@ -19,7 +21,9 @@ def test_import_nodes():
     assert FetchDiscordHistory is not None
     assert LLMChat is not None
     assert MarkdownTableExtractor is not None
+    assert ModelRouter is not None
     assert ProcessMessageHistory is not None
+    assert SearchToolGate is not None
     assert SendDiscordResponse is not None
     assert TableImageRenderer is not None
 
@@ -0,0 +1,917 @@
+"""
+Tests for the LLM router and its resilience layer.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from google.genai import types
+
+from services import llm_service
+from services.llm_service import load_fallback_configs
+from utils import llm_router
+from utils.client_pool import LEAST_LOADED, ClientPool, split_api_keys
+from utils.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimiters,
+    LimiterSettings,
+)
+from utils.context_cache import GeminiContextCache
+from utils.generation_profiles import GENERATION_PROFILES, GenerationProfile
+from utils.llm_hedging import HedgingPolicy, LLMHedger
+from utils.llm_resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMResilience,
+    RetryPolicy,
+)
+from utils.llm_router import (
+    PROVIDERS,
+    LLMConfig,
+    call_llm,
+    configure_llm_concurrency,
+    configure_llm_resilience,
+    configure_response_cache,
+    get_llm_resilience,
+)
+from utils.openai_compatible import (
+    OpenAICompatibleClient,
+    build_chat_messages,
+    call_openai_compatible,
+    close_openai_sessions,
+)
+from utils.prompt_layout import message_with_context
+from utils.provider_router import ProviderRouter
+from utils.response_cache import ResponseCache, response_cache_key
+from utils.usage_tracker import (
+    BudgetExceededError,
+    TokenUsage,
+    UsageBudget,
+    UsageScope,
+    UsageTracker,
+    configure_usage_tracker,
+    usage_scope,
+)
+
+
+class ProviderError(Exception):
+    """Provider exception carrying an HTTP status code like google-genai's APIError."""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FakeProvider:
+    """Provider double that replays a script of results, errors and delays."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    async def __call__(self, prompt, config, history=None):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else "ok"
+        if isinstance(step, Exception):
+            raise step
+        if isinstance(step, (int, float)):
+            await asyncio.sleep(step)
+            return "slow"
+        return step
+
+
+async def _no_sleep(delay):
+    return None
+
+
+@pytest.fixture
+def resilience():
+    """Install a fast resilience layer and restore the previous one afterwards."""
+    previous = get_llm_resilience()
+    layer = LLMResilience(
+        retry_policy=RetryPolicy(max_attempts=3, attempt_timeout=0.05, deadline=5),
+        failure_threshold=3,
+        recovery_timeout=30,
+        sleep=_no_sleep,
+    )
+    configure_llm_resilience(layer)
+    yield layer
+    configure_llm_resilience(previous)
+
+
+def _install(monkeypatch, provider):
+    monkeypatch.setitem(PROVIDERS, "fake", provider)
+    return LLMConfig(client=None, model="fake-model", provider="fake")
+
+
+class TestCallLLMResilience:
+    """Tests for call_llm wrapped by LLMResilience."""
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self, monkeypatch, resilience):
+        """Test 503 responses are retried until the provider succeeds."""
+        provider = FakeProvider([ProviderError(503), "hello"])
+        config = _install(monkeypatch, provider)
+        assert await call_llm("hi", config) == "hello"
+        assert provider.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_error_is_raised(self, monkeypatch, resilience):
+        """Test a 400 response fails immediately without retries."""
+        provider = FakeProvider([ProviderError(400)])
+        config = _install(monkeypatch, provider)
+        with pytest.raises(ProviderError):
+            await call_llm("hi", config)
+        assert provider.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_attempt_timeout(self, monkeypatch, resilience):
+        """Test a hung provider is cut off by the per-attempt timeout."""
+        provider = FakeProvider([1.0, 1.0, 1.0])
+        config = _install(monkeypatch, provider)
+        with pytest.raises(TimeoutError):
+            await call_llm("hi", config)
+        assert provider.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_after_failures(self, monkeypatch, resilience):
+        """Test repeated transient failures open the circuit and short-circuit calls."""
+        provider = FakeProvider([ProviderError(503)] * 3)
+        config = _install(monkeypatch, provider)
+        with pytest.raises(ProviderError):
+            await call_llm("hi", config)
+        with pytest.raises(CircuitOpenError):
+            await call_llm("hi", config)
+        assert provider.calls == 3
+
+
+class TestAdaptiveConcurrency:
+    """Tests for the AIMD concurrency limiter."""
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_queued_in_order(self):
+        """Test calls over the limit wait for a slot instead of failing."""
+        limiter = AdaptiveConcurrencyLimiter("t", LimiterSettings(initial_limit=1))
+        order = []
+
+        async def worker(tag):
+            started = await limiter.acquire()
+            order.append(tag)
+            await asyncio.sleep(0)
+            limiter.release(started)
+
+        first = await limiter.acquire()
+        tasks = [asyncio.create_task(worker(tag)) for tag in "abc"]
+        await asyncio.sleep(0)
+        assert limiter.queue_length == 3
+        limiter.release(first)
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        assert limiter.in_flight == 0 and limiter.queue_length == 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_while_being_woken(self):
+        """Test a waiter cancelled as its slot frees up raises CancelledError and leaks no slot."""
+        limiter = AdaptiveConcurrencyLimiter(
+            "t", LimiterSettings(initial_limit=1, max_limit=1)
+        )
+
+        for cancel_first in (True, False):
+            first = await limiter.acquire()
+            waiting = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            assert limiter.queue_length == 1
+            if cancel_first:
+                # _wake() pops the already-cancelled waiter before the task resumes
+                waiting.cancel()
+                limiter.release(first)
+            else:
+                # The slot is handed over, then the task is cancelled
+                limiter.release(first)
+                waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            assert limiter.in_flight == 0 and not limiter._waiters
+
+            started = await asyncio.wait_for(limiter.acquire(), timeout=1)
+            limiter.release(started)
+
+    @pytest.mark.asyncio
+    async def test_additive_increase_when_saturated(self):
+        """Test healthy calls at the limit grow it by about one per limit-worth of calls."""
+        limiter = AdaptiveConcurrencyLimiter("t", LimiterSettings(initial_limit=2))
+        for _ in range(4):
+            slots = [await limiter.acquire(), await limiter.acquire()]
+            for started in slots:
+                limiter.release(started)
+        assert 3 <= limiter.limit < 4
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_halves_once_per_round_trip(self):
+        """Test a burst of 429s from calls started before the cut only halves once."""
+        limiter = AdaptiveConcurrencyLimiter("t", LimiterSettings(initial_limit=8))
+        slots = [await limiter.acquire() for _ in range(4)]
+        for started in slots:
+            limiter.release(started, ProviderError(429))
+        assert limiter.limit == 4
+        started = await limiter.acquire()
+        limiter.release(started, Exception("RESOURCE_EXHAUSTED: quota"))
+        assert limiter.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_call_llm_takes_slots_and_backs_off(self, monkeypatch, resilience):
+        """Test call_llm queues behind the limiter and shrinks it on 429."""
+        limiters = ConcurrencyLimiters(LimiterSettings(initial_limit=4))
+        configure_llm_concurrency(limiters)
+        try:
+            provider = FakeProvider([ProviderError(429), "hello"])
+            config = _install(monkeypatch, provider)
+            assert await call_llm("hi", config) == "hello"
+            limiter = limiters.limiter("fake", "fake-model")
+            assert limiter.limit == 2
+            assert limiter.in_flight == 0
+        finally:
+            configure_llm_concurrency(None)
+
+
+class TestClientPool:
+    """Tests for rotating provider calls across a pool of API keys."""
+
+    def test_split_api_keys(self):
+        """Test comma-separated keys are stripped and de-duplicated."""
+        assert split_api_keys(" a, b,,a ") == ["a", "b"]
+        assert split_api_keys(None) == []
+
+    def test_keys_sharing_a_suffix_get_distinct_labels(self):
+        """Test pool members are labelled by position, not by the end of the key."""
+        pool = ClientPool.from_keys(
+            ["AIzaSyA-first-1234", "AIzaSyB-second-1234"], lambda key: key
+        )
+        assert [member.label for member in pool.members] == ["key1", "key2"]
+        assert all("1234" not in member.label for member in pool.members)
+
+    def test_round_robin_skips_cooling_keys(self):
+        """Test rotation and that a rate-limited key rests until its cooldown ends."""
+        now = [0.0]
+        pool = ClientPool(
+            [("a", "A"), ("b", "B"), ("c", "C")],
+            cooldown_seconds=10,
+            clock=lambda: now[0],
+        )
+        picks = []
+        for _ in range(3):
+            member = pool.acquire()
+            picks.append(member.client)
+            pool.release(member, ProviderError(429) if member.client == "B" else None)
+        assert picks == ["A", "B", "C"]
+        picks = []
+        for _ in range(2):
+            member = pool.acquire()
+            picks.append(member.client)
+            pool.release(member)
+        assert picks == ["A", "C"]
+        now[0] = 11
+        assert {pool.acquire().client for _ in range(3)} == {"A", "B", "C"}
+
+    def test_least_loaded_and_all_cooling(self):
+        """Test least-loaded picks the idle key and an all-cooling pool still serves."""
+        pool = ClientPool([("a", "A"), ("b", "B")], strategy=LEAST_LOADED)
+        busy = pool.acquire()
+        assert pool.acquire().client != busy.client
+        for member in pool.members:
+            pool.release(member, ProviderError(429))
+        assert pool.acquire().client in {"A", "B"}
+
+    @pytest.mark.asyncio
+    async def test_call_llm_rotates_keys_on_quota(self, monkeypatch, resilience):
+        """Test a retry after a 429 goes to the next key in the pool."""
+        seen = []
+
+        async def provider(prompt, config, history=None):
+            seen.append(config.client)
+            if config.client == "A":
+                raise ProviderError(429)
+            return f"from {config.client}"
+
+        monkeypatch.setitem(PROVIDERS, "fake", provider)
+        pool = ClientPool([("a", "A"), ("b", "B")])
+        config = LLMConfig(client=pool, model="fake-model", provider="fake")
+        assert await call_llm("hi", config) == "from B"
+        assert seen == ["A", "B"]
+        assert pool.stats()[0]["rate_limited"] == 1
+        assert pool.stats()[0]["cooling_down"]
+
+
+class TestCircuitBreaker:
+    """Tests for the circuit breaker state machine."""
+
+    def test_half_open_trial(self):
+        """Test an open circuit allows one trial call after the recovery timeout."""
+        now = [0.0]
+        breaker = CircuitBreaker(
+            failure_threshold=1, recovery_timeout=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        assert breaker.allow_request() is False
+
+        now[0] = 11.0
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestLLMHedger:
+    """Tests for hedged requests."""
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_over_slow_primary(self, monkeypatch, resilience):
+        """Test a slow primary is hedged and the faster backup answer is used."""
+        resilience.retry_policy.attempt_timeout = 5
+        provider = FakeProvider([1.0, "fast"])
+        config = _install(monkeypatch, provider)
+        config.hedging = HedgingPolicy(initial_delay=0.01, budget=1.0)
+
+        assert await call_llm("hi", config) == "fast"
+        assert provider.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_beaten_primary_latency_is_recorded(self):
+        """Test a primary cancelled after losing to the hedge still adds a sample."""
+        hedger = LLMHedger()
+        config = MagicMock(provider="fake", model="fake-model")
+        config.hedging = HedgingPolicy(initial_delay=0.05, budget=1.0)
+
+        async def run(call_config):
+            if call_config is config:
+                await asyncio.sleep(5)
+                return "slow"
+            return "fast"
+
+        with patch.object(LLMHedger, "hedge_config", return_value=MagicMock()):
+            assert await hedger.call(config, run) == "fast"
+        tracker = hedger.tracker("fake", "fake-model")
+        assert len(tracker) == 1
+        assert tracker.percentile(1.0) >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_budget_prevents_hedge(self, monkeypatch, resilience):
+        """Test no hedge is sent when the hedge budget is exhausted."""
+        resilience.retry_policy.attempt_timeout = 5
+        provider = FakeProvider([0.05])
+        config = _install(monkeypatch, provider)
+        config.hedging = HedgingPolicy(initial_delay=0.01, budget=0.0)
+
+        assert await call_llm("hi", config) == "slow"
+        assert provider.calls == 1
+
+    def test_hedge_delay_uses_percentile(self):
+        """Test the hedge delay follows the observed latency percentile."""
+        hedger = LLMHedger()
+        tracker = hedger.tracker("fake", "fake-model")
+        policy = HedgingPolicy(percentile=0.9, min_delay=0.1, min_samples=10)
+        assert hedger.hedge_delay(policy, tracker) == policy.initial_delay
+
+        for latency in range(1, 11):
+            tracker.record(float(latency))
+        assert hedger.hedge_delay(policy, tracker) == 9.0
+
+
+class TestProviderFallback:
+    """Tests for fallback chains ranked by provider health."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_router(self, monkeypatch):
+        router = ProviderRouter(
+            is_circuit_open=lambda provider, model: (
+                get_llm_resilience().breaker(provider, model).state
+                == CircuitBreaker.OPEN
+            )
+        )
+        monkeypatch.setattr(llm_router, "_provider_router", router)
+        return router
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_primary_fails(self, monkeypatch, resilience):
+        """Test the next target answers when the primary exhausts its retries."""
+        primary = FakeProvider([ProviderError(503)] * 3)
+        backup = FakeProvider(["from backup"])
+        config = _install(monkeypatch, primary)
+        monkeypatch.setitem(PROVIDERS, "backup", backup)
+        config.fallbacks = [LLMConfig(client=None, model="b", provider="backup")]
+
+        assert await call_llm("hi", config) == "from backup"
+        assert primary.calls == 3
+        assert backup.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_all_targets_fail(self, monkeypatch, resilience):
+        """Test the last error is raised once every target failed."""
+        config = _install(monkeypatch, FakeProvider([ProviderError(503)] * 3))
+        backup = FakeProvider([ProviderError(502)] * 3)
+        monkeypatch.setitem(PROVIDERS, "backup", backup)
+        config.fallbacks = [LLMConfig(client=None, model="b", provider="backup")]
+
+        with pytest.raises(ProviderError, match="502"):
+            await call_llm("hi", config)
+        assert backup.calls == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("error", [ProviderError(400), KeyError("choices")])
+    async def test_request_errors_do_not_fall_back(
+        self, monkeypatch, resilience, error
+    ):
+        """Test bad requests and bugs are raised instead of trying every fallback."""
+        config = _install(monkeypatch, FakeProvider([error]))
+        backup = FakeProvider(["from backup"])
+        monkeypatch.setitem(PROVIDERS, "backup", backup)
+        config.fallbacks = [LLMConfig(client=None, model="b", provider="backup")]
+
+        with pytest.raises(type(error)):
+            await call_llm("hi", config)
+        assert backup.calls == 0
+
+    def test_brownout_target_is_demoted(self, fresh_router):
+        """Test a provider with a high error rate is ranked after healthy fallbacks."""
+        primary = LLMConfig(client=None, model="a", provider="fake")
+        backup = LLMConfig(client=None, model="b", provider="backup")
+        assert fresh_router.rank([primary, backup]) == [primary, backup]
+
+        for _ in range(5):
+            fresh_router.record("fake", "a", None, True)
+        assert fresh_router.is_degraded("fake", "a")
+        assert fresh_router.rank([primary, backup]) == [backup, primary]
+
+    def test_blank_example_fallback_lines_are_ignored(self, monkeypatch):
+        """Test the blank CHAT_FALLBACK_1_* lines of .env.example add no target."""
+        for name in ("PROVIDER", "MODEL", "API_KEY", "BASE_URL", "TIMEOUT"):
+            monkeypatch.setenv(f"CHAT_FALLBACK_1_{name}", "")
+        assert load_fallback_configs("CHAT") == []
+
+        monkeypatch.setenv("CHAT_FALLBACK_1_MODEL", "gemini-2.5-flash-lite")
+        monkeypatch.setenv("CHAT_FALLBACK_1_API_KEY", "test-key")
+        [fallback] = load_fallback_configs("CHAT")
+        assert fallback.provider == "gemini"
+        assert fallback.model == "gemini-2.5-flash-lite"
+
+    def test_openai_compatible_primary_gets_its_own_client(self, monkeypatch):
+        """Test CHAT_MODEL_PROVIDER builds a client that matches the provider."""
+        monkeypatch.setenv("CHAT_MODEL_PROVIDER", "openai_compatible")
+        monkeypatch.setenv("CHAT_MODEL_BASE_URL", "http://localhost:11434/v1")
+        monkeypatch.setenv("CHAT_MODEL_API_KEY", "test-key")
+        monkeypatch.setenv("CHAT_MODEL", "llama3")
+        for name in ("_chat_config", "_router_config", "_thinker_config"):
+            monkeypatch.setattr(llm_service, name, None)
+        llm_service.init_llm_configs()
+        config = llm_service.get_chat_config()
+        assert config.provider == "openai_compatible"
+        assert isinstance(config.client, OpenAICompatibleClient)
+        assert config.client.base_url == "http://localhost:11434/v1"
+
+    def test_slow_healthy_primary_keeps_first_place(self, fresh_router):
+        """Test a never-called fallback does not overtake a slow but healthy primary."""
+        primary = LLMConfig(client=None, model="gemini-2.5-flash", provider="gemini")
+        backup = LLMConfig(client=None, model="llama", provider="openai_compatible")
+        fresh_router.record("gemini", "gemini-2.5-flash", 6.0, False)
+        assert fresh_router.rank([primary, backup]) == [primary, backup]
+
+        for _ in range(5):
+            fresh_router.record("gemini", "gemini-2.5-flash", None, True)
+        assert fresh_router.rank([primary, backup]) == [backup, primary]
+
+    def test_faster_fallback_is_preferred(self, fresh_router):
+        """Test a clearly faster fallback overtakes a slow healthy primary."""
+        primary = LLMConfig(client=None, model="a", provider="fake")
+        backup = LLMConfig(client=None, model="b", provider="backup")
+        fresh_router.record("fake", "a", 10.0, False)
+        fresh_router.record("backup", "b", 1.0, False)
+        assert fresh_router.rank([primary, backup]) == [backup, primary]
+
+
+class TestOpenAICompatible:
+    """Tests for the OpenAI-compatible message conversion."""
+
+    def test_build_chat_messages(self):
+        """Test system prompt, Gemini history roles and prompt are converted in order."""
+        history = [
+            types.Content(role="user", parts=[types.Part(text="Alice: hi")]),
+            types.Content(role="model", parts=[types.Part(text="hello")]),
+        ]
+        assert build_chat_messages("Alice: bye", "be nice", history) == [
+            {"role": "system", "content": "be nice"},
+            {"role": "user", "content": "Alice: hi"},
+            {"role": "assistant", "content": "hello"},
+            {"role": "user", "content": "Alice: bye"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_session_is_reused_across_calls(self):
+        """Test calls share one HTTP session and keep-alive connection until closed."""
+        peers = []
+
+        async def completions(request):
+            peers.append(request.transport.get_extra_info("peername"))
+            return web.json_response({"choices": [{"message": {"content": "ok"}}]})
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", completions)
+        async with TestServer(app) as server:
+            client = OpenAICompatibleClient(base_url=str(server.make_url("/v1")))
+            config = LLMConfig(client=client, model="m", provider="openai_compatible")
+            assert await call_openai_compatible("hi", config) == "ok"
+            session = client.session()
+            assert await call_openai_compatible("again", config) == "ok"
+            assert client.session() is session
+            assert peers[0] == peers[1]
+
+            await close_openai_sessions()
+            assert session.closed
+            assert await call_openai_compatible("reopened", config) == "ok"
+            assert client.session() is not session
+            await client.close()
+
+
+class TestResponseCache:
+    """Tests for the exact-match response cache in call_llm."""
+
+    @pytest.fixture
+    def cache(self):
+        now = [1000.0]
+        cache = ResponseCache(max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+        cache.now = now
+        configure_response_cache(cache)
+        yield cache
+        configure_response_cache(None)
+
+    @pytest.mark.asyncio
+    async def test_identical_request_is_served_from_cache(
+        self, monkeypatch, resilience, cache
+    ):
+        """Test a repeated request does not reach the provider again."""
+        provider = FakeProvider(["first", "second"])
+        config = _install(monkeypatch, provider)
+        assert await call_llm("What is a monad?", config) == "first"
+        assert await call_llm("What is a monad?", config) == "first"
+        assert provider.calls == 1
+        assert cache.hit_rate == 0.5
+
+        config.temperature = 0.2
+        assert await call_llm("What is a monad?", config) == "second"
+
+    @pytest.mark.asyncio
+    async def test_grounded_and_time_sensitive_bypass(
+        self, monkeypatch, resilience, cache
+    ):
+        """Test search-grounded and time-sensitive requests always call the provider."""
+        provider = FakeProvider(["a", "b", "c", "d"])
+        config = _install(monkeypatch, provider)
+        await call_llm("what time is it in Tokyo", config)
+        await call_llm("what time is it in Tokyo", config)
+        config.tools = [object()]
+        await call_llm("What is a monad?", config)
+        await call_llm("What is a monad?", config)
+        assert provider.calls == 4
+        assert len(cache) == 0
+
+    def test_ttl_and_lru_eviction(self, cache):
+        """Test entries expire after the TTL and the least recent entry is evicted."""
+        cache.put("a", "1")
+        cache.put("b", "2")
+        assert cache.get("a") == "1"
+        cache.put("c", "3")
+        assert cache.get("b") is None
+        cache.now[0] += 61
+        assert cache.get("a") is None
+
+    def test_disk_store_survives_restart(self, tmp_path):
+        """Test entries written to SQLite are found by a new cache instance."""
+        db_path = str(tmp_path / "cache.db")
+        first = ResponseCache(db_path=db_path)
+        first.put("key", "value")
+        first.close()
+
+        second = ResponseCache(db_path=db_path)
+        assert second.get("key") == "value"
+        second.close()
+
+    def test_disk_writes_run_off_the_calling_thread(self, tmp_path):
+        """Test put only updates memory and commits to SQLite on the writer thread."""
+        cache = ResponseCache(db_path=str(tmp_path / "cache.db"))
+        threads = []
+        write = cache._write_disk
+
+        def record_thread(*args):
+            threads.append(threading.current_thread())
+            write(*args)
+
+        cache._write_disk = record_thread
+        cache.put("key", "value")
+        assert cache.get("key") == "value"
+        cache.flush()
+        assert threads and threads[0] is not threading.current_thread()
+        cache.close()
+
+        reopened = ResponseCache(db_path=str(tmp_path / "cache.db"))
+        assert reopened.get("key") == "value"
+        reopened.clear()
+        reopened.close()
+        cleared = ResponseCache(db_path=str(tmp_path / "cache.db"))
+        assert cleared.get("key") is None
+        cleared.close()
+
+    @pytest.mark.asyncio
+    async def test_same_prompt_from_two_authors_misses(
+        self, monkeypatch, resilience, cache
+    ):
+        """Test a reply built for one author is never served to another."""
+        provider = FakeProvider(["Hi Alice", "Hi Bob"])
+        config = _install(monkeypatch, provider)
+        answers = []
+        for author in ("Alice", "Bob"):
+            config.dynamic_context = f"- You are talking to a human named {author}."
+            answers.append(await call_llm(f"{author}: hello there", config))
+        assert answers == ["Hi Alice", "Hi Bob"]
+        assert provider.calls == 2
+        assert cache.hits == 0
+
+        config.dynamic_context = "- You are talking to a human named Bob."
+        history = [{"role": "user", "content": "Alice: hi"}]
+        assert response_cache_key("hello", config, history) != response_cache_key(
+            "hello", config, [{"role": "user", "content": "Bob: hi"}]
+        )
+
+    def test_key_is_stable(self):
+        """Test the key depends on content only, not on object identity."""
+        history = [{"role": "user", "content": "hi"}]
+        a = LLMConfig(client=object(), model="m", system_prompt="s")
+        b = LLMConfig(client=object(), model="m", system_prompt="s")
+        assert response_cache_key("p", a, history) == response_cache_key(
+            "p", b, list(history)
+        )
+        assert response_cache_key("p", a) != response_cache_key("q", a)
+
+
+def _mock_gemini_client(cache_error=None):
+    """Gemini client double with caches.create/update and chats.create."""
+    client = MagicMock()
+    client.aio.caches.create = AsyncMock(
+        side_effect=cache_error,
+        return_value=SimpleNamespace(name="cachedContents/abc"),
+    )
+    client.aio.caches.update = AsyncMock()
+    chat = MagicMock()
+    usage = SimpleNamespace(
+        prompt_token_count=120,
+        candidates_token_count=30,
+        thoughts_token_count=10,
+        cached_content_token_count=100,
+    )
+    chat.send_message = AsyncMock(
+        return_value=SimpleNamespace(text="answer", usage_metadata=usage)
+    )
+    client.aio.chats.create = MagicMock(return_value=chat)
+    return client, chat
+
+
+class TestGeminiContextCache:
+    """Tests for the cached-content lifecycle using a mocked client."""
+
+    @pytest.fixture
+    def clock(self):
+        return [0.0]
+
+    @pytest.fixture
+    def context_cache(self, clock):
+        return GeminiContextCache(
+            ttl_seconds=100, renew_before=10, retry_after=50, clock=lambda: clock[0]
+        )
+
+    @pytest.mark.asyncio
+    async def test_create_reuse_renew_recreate(self, context_cache, clock):
+        """Test an entry is created once, renewed near expiry and recreated after it."""
+        client, _ = _mock_gemini_client()
+        name = await context_cache.get_cache_name(client, "m", "persona")
+        assert name == "cachedContents/abc"
+        await context_cache.get_cache_name(client, "m", "persona")
+        assert client.aio.caches.create.await_count == 1
+
+        clock[0] = 95.0
+        await context_cache.get_cache_name(client, "m", "persona")
+        client.aio.caches.update.assert_awaited_once()
+        assert client.aio.caches.create.await_count == 1
+
+        clock[0] = 500.0
+        await context_cache.get_cache_name(client, "m", "persona")
+        assert client.aio.caches.create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_prompt_change_creates_new_entry(self, context_cache):
+        """Test entries are keyed by the content hash of the static prefix."""
+        client, _ = _mock_gemini_client()
+        await context_cache.get_cache_name(client, "m", "persona v1")
+        await context_cache.get_cache_name(client, "m", "persona v2")
+        assert client.aio.caches.create.await_count == 2
+        assert len(context_cache) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_creation_backs_off(self, context_cache, clock):
+        """Test a failed creation is not retried until retry_after has passed."""
+        client, _ = _mock_gemini_client(cache_error=ProviderError(400))
+        assert await context_cache.get_cache_name(client, "m", "short") is None
+        assert await context_cache.get_cache_name(client, "m", "short") is None
+        assert client.aio.caches.create.await_count == 1
+
+        clock[0] = 60.0
+        await context_cache.get_cache_name(client, "m", "short")
+        assert client.aio.caches.create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_call_llm_references_cached_content(self, resilience, context_cache):
+        """Test requests reference the cache and send dynamic context with the message."""
+        client, chat = _mock_gemini_client()
+        config = LLMConfig(
+            client=client,
+            model="gemini-test",
+            system_prompt="persona",
+            dynamic_context="Current time: noon",
+            context_cache=context_cache,
+        )
+        assert await call_llm("Alice: hi", config) == "answer"
+
+        generate_config = client.aio.chats.create.call_args.kwargs["config"]
+        assert generate_config.cached_content == "cachedContents/abc"
+        assert generate_config.system_instruction is None
+        message = chat.send_message.await_args.args[0]
+        assert message == ["[Context]\nCurrent time: noon", "Alice: hi"]
+
+
+class TestStablePrefix:
+    """Tests for the stable-prefix request layout."""
+
+    @pytest.mark.asyncio
+    async def test_system_instruction_is_stable_across_requests(self, resilience):
+        """Test only the user turn changes between requests with different context."""
+        client, chat = _mock_gemini_client()
+        instructions, messages = [], []
+        for author, time in [("Alice", "09:00"), ("Bob", "09:15")]:
+            config = LLMConfig(
+                client=client,
+                model="gemini-test",
+                system_prompt="persona",
+                dynamic_context=f"- Talking to {author}\n- Current time: {time}",
+            )
+            await call_llm(f"{author}: hi", config)
+            generate_config = client.aio.chats.create.call_args.kwargs["config"]
+            instructions.append(generate_config.system_instruction)
+            messages.append(chat.send_message.await_args.args[0])
+
+        assert instructions == ["persona", "persona"]
+        assert messages[0][0] == "[Context]\n- Talking to Alice\n- Current time: 09:00"
+        assert messages[1][1] == "Bob: hi"
+
+    def test_openai_compatible_preamble(self):
+        """Test text-only providers get the preamble inside the last user message."""
+        assert message_with_context("hi", "") == "hi"
+        assert message_with_context("hi", "- ctx") == "[Context]\n- ctx\n\nhi"
+
+
+class TestGenerationProfiles:
+    """Tests for generation profiles applied to provider requests."""
+
+    @pytest.mark.asyncio
+    async def test_profile_reaches_gemini_config(self, resilience):
+        """Test thinking budget and output limit are sent with the request."""
+        client, _ = _mock_gemini_client()
+        config = LLMConfig(
+            client=client,
+            model="gemini-2.5-flash",
+            generation_profile=GENERATION_PROFILES["fast"],
+        )
+        await call_llm("hi", config)
+        generate_config = client.aio.chats.create.call_args.kwargs["config"]
+        assert generate_config.max_output_tokens == 1024
+        assert generate_config.thinking_config.thinking_budget == 0
+        assert generate_config.candidate_count == 1
+
+    def test_thinking_config_per_model(self):
+        """Test older models get no thinking config and pro models keep a minimum budget."""
+        fast = GENERATION_PROFILES["fast"]
+        assert "thinking_config" not in fast.gemini_config_kwargs("gemini-2.0-flash")
+        pro = fast.gemini_config_kwargs("gemini-2.5-pro")
+        assert pro["thinking_config"].thinking_budget == 128
+
+    def test_profile_changes_cache_key(self):
+        """Test responses generated under different profiles are cached apart."""
+        config = LLMConfig(client=None, model="m")
+        deep = LLMConfig(
+            client=None, model="m", generation_profile=GenerationProfile("deep")
+        )
+        assert response_cache_key("hi", config) != response_cache_key("hi", deep)
+
+
+class TestUsageTracking:
+    """Tests for token accounting and rolling budgets."""
+
+    @pytest.fixture
+    def clock(self):
+        return [1000.0]
+
+    @pytest.fixture
+    def tracker(self, clock):
+        tracker = UsageTracker(
+            budget=UsageBudget(guild_tokens=300, window_seconds=60),
+            pricing={"gemini-test": (1.0, 2.0)},
+            clock=lambda: clock[0],
+        )
+        configure_usage_tracker(tracker)
+        yield tracker
+        configure_usage_tracker(None)
+
+    @pytest.mark.asyncio
+    async def test_usage_is_attributed_to_scope(self, resilience, tracker):
+        """Test usage metadata is aggregated per guild, channel and user."""
+        client, _ = _mock_gemini_client()
+        config = LLMConfig(client=client, model="gemini-test")
+        with usage_scope(1, 2, 3):
+            await call_llm("hi", config)
+
+        totals = tracker.totals("guild", 1)
+        assert (totals.prompt_tokens, totals.output_tokens) == (120, 40)
+        assert totals.cached_tokens == 100
+        assert tracker.totals("user", 3).requests == 1
+        assert tracker.window_tokens("channel", 2) == 160
+        assert tracker.totals("guild", 99).requests == 0
+
+    @pytest.mark.asyncio
+    async def test_budget_refuses_then_recovers(self, resilience, tracker, clock):
+        """Test requests are refused over budget until the window rolls over."""
+        client, _ = _mock_gemini_client()
+        config = LLMConfig(client=client, model="gemini-test")
+        with usage_scope(1, 2, 3):
+            await call_llm("one", config)
+            await call_llm("two", config)
+            with pytest.raises(BudgetExceededError):
+                await call_llm("three", config)
+
+            clock[0] += 61
+            assert await call_llm("four", config) == "answer"
+
+    @pytest.mark.asyncio
+    async def test_budget_downgrades_model(self, resilience, tracker):
+        """Test an exceeded guild budget switches to the downgrade model."""
+        tracker.budget.downgrade_model = "gemini-lite"
+        client, _ = _mock_gemini_client()
+        config = LLMConfig(client=client, model="gemini-test")
+        tracker.record("gemini", "gemini-test", TokenUsage(300, 0, 0, 1), UsageScope(1))
+
+        with usage_scope(2, 20, 3):
+            await call_llm("hi", config)
+        assert client.aio.chats.create.call_args.kwargs["model"] == "gemini-test"
+
+        with usage_scope(1, 10, 3):
+            await call_llm("hi", config)
+        assert client.aio.chats.create.call_args.kwargs["model"] == "gemini-lite"
+
+    def test_flush_and_report(self, tmp_path, clock):
+        """Test events are flushed to SQLite and reported per guild."""
+        tracker = UsageTracker(
+            db_path=str(tmp_path / "usage.db"),
+            flush_interval=30,
+            pricing={"m": (1.0, 2.0)},
+            clock=lambda: clock[0],
+        )
+        with usage_scope(1, 10, 100):
+            tracker.record("gemini", "m", TokenUsage(1000, 500, 0, 1))
+        with usage_scope(1, 11, 101):
+            tracker.record("gemini", "m", TokenUsage(200, 100, 0, 1))
+        assert tracker.flush() == 2
+
+        report = tracker.guild_report(1, hours=1)
+        assert report["total"].total_tokens == 1800
+        assert report["top_channels"][0] == (10, 1500)
+        assert report["cost"] == pytest.approx((1200 * 1.0 + 600 * 2.0) / 1_000_000)
+        tracker.close()
+
+    def test_events_are_flushed_in_the_background_and_on_close(self, tmp_path):
+        """Test idle trackers still persist events, and close writes the rest."""
+        db_path = str(tmp_path / "usage.db")
+        tracker = UsageTracker(db_path=db_path, flush_interval=0.01)
+        with usage_scope(1, 10, 100):
+            tracker.record("gemini", "m", TokenUsage(10, 5, 0, 1))
+        for _ in range(200):
+            if not tracker._pending:
+                break
+            tracker._flusher.join(timeout=0.01)
+        assert not tracker._pending
+
+        with usage_scope(1, 10, 100):
+            tracker.record("gemini", "m", TokenUsage(20, 5, 0, 1))
+        tracker.close()
+        with sqlite3.connect(db_path) as db:
+            assert db.execute("SELECT COUNT(*) FROM usage_events").fetchone()[0] == 2
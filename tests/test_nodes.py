@@ -2,17 +2,39 @@
 Tests for node modules.
 """
 
-from unittest.mock import MagicMock
+import io
+import os
+import threading
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from PIL import Image, ImageChops, ImageFont
 
 from nodes import (
     ContextualSystemPrompt,
     FetchDiscordHistory,
     LLMChat,
     MarkdownTableExtractor,
+    ModelRouter,
     ProcessMessageHistory,
+    SearchToolGate,
     SendDiscordResponse,
     TableImageRenderer,
 )
+from nodes.model_router import RouteCache, parse_route
+from nodes.table_renderer import (
+    TableRenderSettings,
+    render_table_images,
+    table_cache_key,
+)
+from utils import HedgingPolicy, LLMConfig, PageCache
+from utils.image_cache import RenderedImageCache
+from utils.line_breaking import NO_LINE_END, NO_LINE_START
+from utils.llm_router import PROVIDERS
+from utils.metrics import metrics
+from utils.render_pool import RenderPool
+from utils.text_measure import font_metrics
 
 
 class TestFetchDiscordHistory:
@@ -52,6 +74,54 @@ class TestContextualSystemPrompt:
         assert node.enable_contextual_system_prompt is False
 
 
+class TestStablePromptPrefix:
+    """Tests for the stable-prefix layout built by ContextualSystemPrompt."""
+
+    @staticmethod
+    async def _run(node, author, participants, now):
+        class FixedDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return now.replace(tzinfo=tz)
+
+        shared = {"author_name": author, "unique_users": participants}
+        with patch("nodes.contextual_system_prompt.datetime", FixedDatetime):
+            await node.run_async(shared)
+        return shared
+
+    @pytest.mark.asyncio
+    async def test_prefix_is_byte_stable(self):
+        """Test the static prefix is identical across authors, participants and time."""
+        node = ContextualSystemPrompt(True, "persona", 10, time_granularity_minutes=15)
+        first = await self._run(
+            node, "Alice", {"Carol", "bob", "Alice"}, datetime(2025, 1, 6, 9, 1)
+        )
+        second = await self._run(
+            node, "Bob", {"Alice", "Carol", "bob"}, datetime(2025, 1, 6, 9, 14)
+        )
+
+        assert first["static_system_prompt"].encode() == (
+            second["static_system_prompt"].encode()
+        )
+        assert first["static_system_prompt"].startswith("persona\n\n")
+        assert "Alice" not in first["static_system_prompt"]
+        assert (
+            "Current participants: Alice, bob, Carol."
+            in (first["dynamic_system_context"])
+        )
+        assert "09:00 AM" in first["dynamic_system_context"]
+        assert "09:00 AM" in second["dynamic_system_context"]
+
+    @pytest.mark.asyncio
+    async def test_disabled_has_no_dynamic_context(self):
+        """Test the base prompt is used unchanged when the feature is off."""
+        node = ContextualSystemPrompt(False, "persona", 10)
+        shared = await self._run(node, "Alice", set(), datetime(2025, 1, 6, 9, 1))
+        assert shared["static_system_prompt"] == "persona"
+        assert shared["dynamic_system_context"] == ""
+        assert shared["enhanced_system_prompt"] == "persona"
+
+
 class TestLLMChat:
     """Tests for LLMChat node."""
 
@@ -83,6 +153,119 @@ class TestLLMChat:
         assert node.provider == "openai"
 
 
+class TestModelRouter:
+    """Tests for ModelRouter node."""
+
+    @pytest.fixture
+    def router_provider(self, monkeypatch):
+        calls = []
+
+        async def provider(prompt, config, history=None):
+            calls.append(prompt)
+            return "Reasoning." if "prove" in prompt else "trivial"
+
+        monkeypatch.setitem(PROVIDERS, "fake-router", provider)
+        return calls
+
+    def _node(self):
+        router = LLMConfig(client=None, model="router", provider="fake-router")
+        chat = LLMConfig(client=None, model="chat", system_prompt="persona")
+        thinker = LLMConfig(client=None, model="thinker")
+        return ModelRouter(router, chat, thinker, cache=RouteCache(max_entries=4))
+
+    def test_parse_route(self):
+        """Test router answers are mapped to routes, defaulting to normal."""
+        assert parse_route("Trivial") == "trivial"
+        assert parse_route("reasoning.") == "reasoning"
+        assert parse_route("I am not sure") == "normal"
+        assert parse_route(None) == "normal"
+
+    @pytest.mark.asyncio
+    async def test_routes_and_caches(self, router_provider):
+        """Test greetings go to the router model and repeats hit the cache."""
+        node = self._node()
+        shared = {"content": "Hi there!"}
+        assert await node.run_async(shared) == "routed"
+        assert shared["route"] == "trivial"
+        assert shared["llm_config"].model == "router"
+        assert shared["generation_profile"] == "fast"
+        assert shared["llm_config"].system_prompt == "persona"
+
+        await node.run_async({"content": "  hi THERE! "})
+        assert len(router_provider) == 1
+
+    @pytest.mark.asyncio
+    async def test_reasoning_uses_thinker(self, router_provider):
+        """Test messages that need reasoning are sent to the thinker model."""
+        shared = {"content": "prove that sqrt(2) is irrational"}
+        await self._node().run_async(shared)
+        assert shared["route"] == "reasoning"
+        assert shared["llm_config"].model == "thinker"
+        assert shared["generation_profile"] == "deep"
+
+    @pytest.mark.asyncio
+    async def test_without_router_config(self):
+        """Test the chat model is kept when no router model is configured."""
+        shared = {"content": "hello"}
+        await ModelRouter(None).run_async(shared)
+        assert shared["route"] == "normal"
+        assert shared["llm_config"] is None
+
+
+class TestLLMChatRouting:
+    """Tests for LLMChat answering with a routed model."""
+
+    @pytest.mark.asyncio
+    async def test_routed_config_keeps_hedging(self):
+        """Test messages routed to another model are hedged like the default route."""
+        hedging = HedgingPolicy()
+        node = LLMChat(None, "chat", 1.0, None, hedging=hedging)
+        shared = {
+            "content": "prove it",
+            "llm_config": LLMConfig(client=None, model="thinker"),
+        }
+        with patch(
+            "nodes.llm_chat.call_llm", AsyncMock(return_value="answer")
+        ) as call_llm:
+            await node.run_async(shared)
+        config = call_llm.await_args.args[1]
+        assert config.model == "thinker"
+        assert config.hedging is hedging
+
+
+class TestGenerationProfileSelection:
+    """Tests for how LLMChat picks the generation profile."""
+
+    def test_channel_setting_wins_over_route(self):
+        """Test a channel profile overrides the routed one, which overrides the default."""
+        node = LLMChat(None, "chat", 1.0, None, generation_profile="balanced")
+        settings = {42: "fast"}
+        with patch(
+            "nodes.llm_chat.runtime_config.channel_setting",
+            side_effect=lambda channel_id, key: settings.get(channel_id),
+        ):
+            assert node.resolve_profile(42, "deep").name == "fast"
+            assert node.resolve_profile(7, "deep").name == "deep"
+            assert node.resolve_profile(7, None).name == "balanced"
+            assert LLMChat(None, "chat", 1.0, None).resolve_profile(7, None) is None
+
+
+class TestSearchToolGate:
+    """Tests for SearchToolGate node."""
+
+    @pytest.mark.asyncio
+    async def test_sets_use_search_tools(self):
+        """Test the gate stores its decision in the shared store."""
+        node = SearchToolGate()
+        shared = {"content": "latest news about the Mars mission"}
+        assert await node.run_async(shared) == "classified"
+        assert shared["use_search_tools"] is True
+
+        shared = {"content": "thanks!"}
+        await node.run_async(shared)
+        assert shared["use_search_tools"] is False
+
+
 class TestMarkdownTableExtractor:
     """Tests for MarkdownTableExtractor node."""
 
@@ -91,6 +274,48 @@ class TestMarkdownTableExtractor:
         node = MarkdownTableExtractor()
         assert node is not None
 
+    @pytest.mark.asyncio
+    async def test_small_table_is_sent_as_text(self, tmp_path, monkeypatch):
+        """Test a small table becomes a code block with no image or .md file."""
+        monkeypatch.chdir(tmp_path)
+        small = "| a | b |\n|---|---|\n| 1 | 2 |\n"
+        large = "| x | y | z |\n|---|---|---|\n" + "| 1 | 2 | 3 |\n" * 5
+        shared = {
+            "llm_response": f"Small:\n{small}\nLarge:\n{large}",
+            "message_id": 9,
+        }
+        node = MarkdownTableExtractor(text_max_cells=6)
+        assert await node.run_async(shared) == "tables_found"
+        assert (
+            "| a | b |\n|---|---|\n| 1 | 2 |\n```" in shared["response_without_tables"]
+        )
+        assert [t["raw_text"] for t in shared["extracted_tables"]] == [large.strip()]
+        assert shared["extracted_tables_files"] == ["temp/daia_replaced_table_9_1.md"]
+
+        renderer = TableImageRenderer()
+        await renderer.run_async(shared)
+        assert "```" in shared["response_without_tables"]
+        assert "daia_replaced_table_9_1_as_image" in shared["response_without_tables"]
+
+        shared = {"llm_response": f"Small:\n{small}", "message_id": 10}
+        assert await node.run_async(shared) == "no_tables"
+        assert not (tmp_path / "temp" / "daia_replaced_table_10_1.md").exists()
+
+    def test_text_threshold_per_channel(self):
+        """Test a channel's table_text_max_cells overrides the bot default."""
+        node = MarkdownTableExtractor(text_max_cells=4)
+        settings = {42: 0}
+        with patch(
+            "nodes.table_extractor.runtime_config.channel_setting",
+            side_effect=lambda channel_id, key, default: settings.get(
+                channel_id, default
+            ),
+        ):
+            assert node.resolve_text_max_cells(42) == 0
+            assert node.resolve_text_max_cells(7) == 4
+        wide = {"headers": ["h"], "rows": [["x" * 80]], "valid": True}
+        assert not node._fits_text(wide, 4)
+
 
 class TestTableImageRenderer:
     """Tests for TableImageRenderer node."""
@@ -100,6 +325,252 @@ class TestTableImageRenderer:
         node = TableImageRenderer()
         assert node is not None
 
+    def test_long_words_are_split_to_fit(self):
+        """Test a word wider than the column is broken into chunks that fit."""
+        node = TableImageRenderer()
+        font = ImageFont.load_default(42)
+        fonts = {"cell": font, "cell_bold": font}
+        lines = node._wrap_text_with_formatting("x" * 200 + " tail", 300, fonts)
+        chunks = [word for line in lines for _, word in line]
+        assert "".join(chunks) == "x" * 200 + "tail"
+        assert all(font_metrics(font).width(word) <= 300 for word in chunks)
+
+    def test_cjk_text_breaks_between_characters(self):
+        """Test CJK cells fill each line and keep punctuation off line starts."""
+        node = TableImageRenderer()
+        font = ImageFont.load_default(42)
+        fonts = {"cell": font, "cell_bold": font}
+        measure = font_metrics(font)
+        text = "東京の天気は晴れのち曇り、最高気温は二十五度です。" * 3
+        lines = node._wrap_text_with_formatting("予報 " + text, 400, fonts)
+        words = [word for line in lines for _, word in line]
+        assert "".join(words) == "予報" + text
+        # The CJK run starts on the first line, after "予報"
+        assert len(lines[0]) == 2
+        for line in lines:
+            assert sum(measure.width(word) for _, word in line) <= 400
+            assert line[0][1][0] not in NO_LINE_START
+            assert line[-1][1][-1] not in NO_LINE_END
+        # Every line but the last is full to within one character and its punctuation
+        for line in lines[:-1]:
+            width = measure.width(line[-1][1]) + (
+                measure.width(line[0][1]) + measure.width(" ") if len(line) > 1 else 0
+            )
+            assert width > 400 - 3 * measure.width("東")
+
+    def test_layout_is_shared_with_drawing(self):
+        """Test the layout holds every wrapped cell and the image matches its size."""
+        node = TableImageRenderer()
+        table = {
+            "headers": ["Name", "**Notes**"],
+            "rows": [["a", "short"], ["b", "a much longer cell " * 20]],
+            "valid": True,
+        }
+        image = Image.open(node._render_table_image(table))
+        font = node._get_font(42)
+        fonts = {"cell": font, "cell_bold": font, "header": font}
+        fonts.update(header_bold=font, line_height=54)
+        layout = node._layout_table(table["headers"], table["rows"], fonts, 36, 120, 84)
+        assert image.size == (layout.width, layout.height)
+        assert len(layout.rows[1][0][1]) > 1
+        assert layout.rows[1][1] > layout.rows[0][1]
+
+    def test_glyph_atlas_matches_text_drawing(self):
+        """Test the glyph atlas draw path produces the same image as draw.text."""
+        table = {
+            "headers": ["**Region**", "Latency", "天気"],
+            "rows": [
+                [f"row {i}", "**AV** To Wa" * (i % 3 + 1), "晴れのち曇り"]
+                for i in range(60)
+            ],
+            "valid": True,
+        }
+        expected = TableImageRenderer()._render_table_image(table)
+        atlas = TableImageRenderer(settings=TableRenderSettings(glyph_atlas=True))
+        actual = atlas._render_table_image(table)
+        diff = ImageChops.difference(
+            Image.open(expected).convert("RGB"), Image.open(actual).convert("RGB")
+        )
+        assert max(high for _, high in diff.getextrema()) <= 8
+
+    def test_pixel_budget_lowers_scale(self):
+        """Test large tables shrink under the pixel budget but not below the minimum font."""
+        table = {
+            "headers": ["Name", "Notes", "More"],
+            "rows": [["row", "some longer notes here", "x"]] * 40,
+            "valid": True,
+        }
+        full = TableImageRenderer()._draw_table(table)
+        budget = full.width * full.height // 3
+        fitted = TableImageRenderer(
+            settings=TableRenderSettings(max_pixels=budget, min_font_size=12)
+        )._draw_table(table)
+        assert fitted.width * fitted.height <= budget
+        assert metrics.get_summary("table_render.scale")["min"] < 1
+
+        legible = TableRenderSettings(max_pixels=budget, min_font_size=42)
+        assert TableImageRenderer(settings=legible)._draw_table(table).size == full.size
+
+    def test_tiles_repeat_header_and_match_full_image(self):
+        """Test tiles fit the height budget, repeat the header and line up with the full table."""
+        table = {
+            "headers": ["Name", "**Notes**"],
+            "rows": [[f"row {i}", "note " * (i % 4 + 1)] for i in range(30)],
+            "valid": True,
+        }
+        full = TableImageRenderer()._draw_table(table)
+        settings = TableRenderSettings(tile_height=full.height // 3, palette=False)
+        tiles = [
+            Image.open(io.BytesIO(png)).convert("RGB")
+            for png in TableImageRenderer(settings=settings)._render_table_tiles(table)
+        ]
+        assert len(tiles) >= 3
+        header_height = 121
+        y = header_height
+        for tile in tiles:
+            assert tile.width == full.width and tile.height <= settings.tile_height
+            header = (0, 0, full.width, header_height)
+            assert (
+                ImageChops.difference(tile.crop(header), full.crop(header)).getbbox()
+                is None
+            )
+            body = tile.crop((0, header_height, tile.width, tile.height))
+            expected = full.crop((0, y, full.width, y + body.height))
+            assert ImageChops.difference(body, expected).getbbox() is None
+            y += body.height
+        assert y == full.height
+
+    @pytest.mark.asyncio
+    async def test_tiles_become_numbered_attachments(self):
+        """Test each tile of a table is attached in order with a numbered filename."""
+        rows = [[str(i)] for i in range(12)]
+        shared = {
+            "llm_response": "|t|",
+            "message_id": "7",
+            "extracted_tables": [
+                {
+                    "index": 0,
+                    "raw_text": "|t|",
+                    "parsed": {"headers": ["N"], "rows": rows, "valid": True},
+                }
+            ],
+        }
+        settings = TableRenderSettings(tile_height=600)
+        await TableImageRenderer(settings=settings).run_async(shared)
+        names = [image["filename"] for image in shared["table_images"]]
+        assert len(names) > 1
+        assert names == [f"table_1_{i + 1}.png" for i in range(len(names))]
+        assert shared["response_without_tables"].count("daia_replaced_table") == 1
+
+    @pytest.mark.asyncio
+    async def test_webp_output(self):
+        """Test WebP settings produce .webp attachments and bad formats are rejected."""
+        shared = {
+            "llm_response": "|t|",
+            "extracted_tables": [
+                {
+                    "index": 0,
+                    "raw_text": "|t|",
+                    "parsed": {"headers": ["A"], "rows": [["1"]], "valid": True},
+                }
+            ],
+        }
+        node = TableImageRenderer(settings=TableRenderSettings(image_format="webp"))
+        await node.run_async(shared)
+        image = shared["table_images"][0]
+        assert image["filename"] == "table_1.webp"
+        assert Image.open(image["buffer"]).format == "WEBP"
+        with pytest.raises(ValueError):
+            TableRenderSettings(image_format="bmp")
+
+    @pytest.mark.asyncio
+    async def test_image_cache_skips_rendering(self):
+        """Test a cached table is served without rendering and settings split keys."""
+        table = {"headers": ["A"], "rows": [["1"]], "valid": True}
+        cache = RenderedImageCache()
+        node = TableImageRenderer(image_cache=cache)
+        first = await node._render_tables([table])
+        with patch("nodes.table_renderer.Image.new", side_effect=AssertionError):
+            assert await node._render_tables([dict(table)]) == first
+        assert cache.hits == 1
+
+        atlas = TableRenderSettings(glyph_atlas=True)
+        assert table_cache_key(table, atlas) != table_cache_key(
+            table, TableRenderSettings()
+        )
+
+    @pytest.mark.asyncio
+    async def test_image_cache_disk_io_runs_off_the_event_loop(self, tmp_path):
+        """Test SQLite lookups and stores run on a worker thread."""
+        table = {"headers": ["A"], "rows": [["1"]], "valid": True}
+        cache = RenderedImageCache(db_path=str(tmp_path / "images.db"))
+        threads = []
+        get, put = cache.get, cache.put
+
+        def record(method):
+            def wrapper(*args):
+                threads.append(threading.current_thread())
+                return method(*args)
+
+            return wrapper
+
+        node = TableImageRenderer(image_cache=cache)
+        with (
+            patch.object(cache, "get", side_effect=record(get)),
+            patch.object(cache, "put", side_effect=record(put)),
+        ):
+            await node._render_tables([table])
+        cache.close()
+        assert len(threads) == 2
+        assert threading.main_thread() not in threads
+
+    def test_cache_key_tracks_font_files(self, tmp_path):
+        """Test replacing a font file in place changes the image cache key."""
+        table = {"headers": ["A"], "rows": [["1"]], "valid": True}
+        font = tmp_path / "font.ttf"
+        font.write_bytes(b"v1")
+        missing = tmp_path / "missing.ttf"
+        with (
+            patch("nodes.table_renderer.REGULAR_FONT_PATH", font),
+            patch("nodes.table_renderer.BOLD_FONT_PATH", missing),
+            patch("nodes.table_renderer.LEGACY_FONT_PATH", missing),
+        ):
+            key = table_cache_key(table, TableRenderSettings())
+            assert table_cache_key(table, TableRenderSettings()) == key
+            font.write_bytes(b"v2")
+            os.utime(font, ns=(0, 0))
+            assert table_cache_key(table, TableRenderSettings()) != key
+
+    @pytest.mark.asyncio
+    async def test_renders_tables_on_pool(self):
+        """Test tables render in parallel on a pool and failures are skipped."""
+        pool = RenderPool(render_table_images, kind="thread", max_workers=2)
+        tables = [
+            {"headers": ["A", "B"], "rows": [["1", "2"]], "valid": True},
+            {"headers": [], "rows": [["x"]], "valid": True},
+            {"headers": ["C"], "rows": [["3"]], "valid": True},
+            {"headers": ["D"], "rows": [], "valid": False},
+        ]
+        shared = {
+            "llm_response": "before\n|t0|\n|t1|\n|t2|\nafter",
+            "message_id": "42",
+            "extracted_tables": [
+                {"index": i, "raw_text": f"|t{i}|", "parsed": parsed}
+                for i, parsed in enumerate(tables)
+            ],
+        }
+        try:
+            result = await TableImageRenderer(pool).run_async(shared)
+        finally:
+            pool.close()
+
+        assert result == "images_rendered"
+        assert [img["index"] for img in shared["table_images"]] == [0, 2]
+        assert Image.open(shared["table_images"][0]["buffer"]).format == "PNG"
+        text = shared["response_without_tables"]
+        assert "daia_replaced_table_42_1_as_image" in text
+        assert "|t1|" in text and "daia_replaced_table_42_3_as_image" in text
+
 
 class TestSendDiscordResponse:
     """Tests for SendDiscordResponse node."""
@@ -108,3 +579,62 @@ class TestSendDiscordResponse:
         """Test SendDiscordResponse initialization."""
         node = SendDiscordResponse(mock_discord_bot)
         assert node.bot == mock_discord_bot
+        assert node.page_cache is None
+        assert node.dispatcher is not None
+
+    def test_init_paginated(self, mock_discord_bot):
+        """Test SendDiscordResponse initialization in paginated mode."""
+        page_cache = PageCache(max_entries=8, ttl_seconds=60)
+        node = SendDiscordResponse(mock_discord_bot, page_cache=page_cache)
+        assert node.page_cache is page_cache
+
+    @pytest.mark.asyncio
+    async def test_attachments_are_planned_off_the_event_loop(self, mock_discord_bot):
+        """Test image shrinking runs on a worker thread, not the event loop's."""
+        channel = MagicMock()
+        channel.id = 42
+        mock_discord_bot.get_channel = MagicMock(return_value=channel)
+        dispatcher = MagicMock()
+        dispatcher.send = AsyncMock(return_value=[MagicMock()])
+        node = SendDiscordResponse(mock_discord_bot, dispatcher=dispatcher)
+        threads = []
+
+        def plan(files, max_bytes):
+            threads.append(threading.current_thread())
+            return [files]
+
+        shared = {
+            "channel_id": 42,
+            "llm_response": "table below",
+            "table_images": [
+                {"buffer": io.BytesIO(b"png"), "filename": "table_1.png", "index": 0}
+            ],
+        }
+        with patch("nodes.send_response.plan_attachment_batches", side_effect=plan):
+            assert await node.run_async(shared) == "sent"
+        assert threads and threads[0] is not threading.main_thread()
+        assert dispatcher.send.await_args.args[1][-1].files[0].filename == "table_1.png"
+
+    @pytest.mark.asyncio
+    async def test_paginated_replies_do_not_share_pages(self, mock_discord_bot):
+        """Test concurrent long replies in one channel keep their own cached pages."""
+        page_cache = PageCache(max_entries=8, ttl_seconds=60)
+        channel = MagicMock()
+        channel.id = 42
+        mock_discord_bot.get_channel = MagicMock(return_value=channel)
+        dispatcher = MagicMock()
+        dispatcher.send = AsyncMock(side_effect=lambda ch, messages: [MagicMock()])
+        node = SendDiscordResponse(
+            mock_discord_bot, page_cache=page_cache, dispatcher=dispatcher
+        )
+
+        for text in ("a" * 3000, "b" * 3000):
+            shared = {"channel_id": 42, "llm_response": text}
+            assert await node.run_async(shared) == "sent"
+
+        assert len(page_cache) == 2
+        views = [call.args[1][0].view for call in dispatcher.send.await_args_list]
+        assert views[0].key != views[1].key
+        assert page_cache.get_page(views[0].key, 0).startswith("a")
+        assert page_cache.get_page(views[1].key, 0).startswith("b")
+        assert all(view.message is not None for view in views)
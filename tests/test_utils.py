@@ -2,12 +2,48 @@
 Tests for utility functions.
 """
 
+import asyncio
+import io
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
 from utils import (
+    PageCache,
+    PaginatedReplyView,
     check_font_exists,
     create_message_data,
     env_onoff_to_bool,
     validate_message_data_types,
 )
+from utils.attachment_planner import attachment_size, plan_attachment_batches
+from utils.font_registry import REGULAR_FONT_PATH, FontRegistry
+from utils.glyph_atlas import GlyphAtlas
+from utils.image_cache import RenderedImageCache
+from utils.image_encoding import encode_image
+from utils.line_breaking import break_opportunities
+from utils.metrics import MetricsRegistry
+from utils.outbound_dispatcher import (
+    OutboundDispatcher,
+    OutboundFile,
+    OutboundMessage,
+    merge_small_chunks,
+)
+from utils.render_pool import RenderPool
+from utils.search_classifier import (
+    BagOfWordsModel,
+    SearchToolClassifier,
+    evaluate_classifier,
+    load_labelled_samples,
+)
+from utils.text_measure import SHAPED_PREFIX_WINDOW, FontMetrics, font_metrics
+from utils.text_table import display_width, format_text_table, text_table_width
 
 
 class TestConfigUtils:
@@ -67,3 +103,566 @@ class TestDownloadFont:
         """Test check_font_exists returns a boolean value."""
         result = check_font_exists()
         assert isinstance(result, bool)
+
+
+class TestPageCache:
+    """Tests for the pagination page cache."""
+
+    def test_get_page(self):
+        """Test pages are returned by index and out-of-range pages are None."""
+        cache = PageCache(max_entries=4, ttl_seconds=60)
+        cache.put("reply", ["one", "two"])
+        assert cache.get_page("reply", 1) == "two"
+        assert cache.get_page("reply", 2) is None
+        assert cache.get_page("missing", 0) is None
+
+    def test_lru_eviction_calls_callback(self):
+        """Test the least recently used entry is evicted and notified."""
+        evicted = []
+        cache = PageCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", ["a"], on_evict=evicted.append)
+        cache.put("b", ["b"], on_evict=evicted.append)
+        cache.get("a")
+        cache.put("c", ["c"], on_evict=evicted.append)
+        assert evicted == ["b"]
+        assert "a" in cache
+        assert len(cache) == 2
+
+    def test_ttl_expiry_calls_callback(self):
+        """Test expired entries are dropped and notified."""
+        now = [0.0]
+        evicted = []
+        cache = PageCache(max_entries=4, ttl_seconds=10, clock=lambda: now[0])
+        cache.put("reply", ["one", "two"], on_evict=evicted.append)
+        now[0] = 11.0
+        assert cache.get_page("reply", 1) is None
+        assert evicted == ["reply"]
+        assert len(cache) == 0
+
+
+class TestPaginatedReplyView:
+    """Tests for the page buttons of paginated replies."""
+
+    @staticmethod
+    def _interaction():
+        interaction = MagicMock()
+        interaction.response.edit_message = AsyncMock()
+        return interaction
+
+    @pytest.mark.asyncio
+    async def test_buttons_navigate_pages(self):
+        """Test Next/Previous swap the content and disable at either end."""
+        cache = PageCache(max_entries=4, ttl_seconds=60)
+        cache.put("reply", ["one", "two", "three"])
+        view = PaginatedReplyView(cache, "reply", 3)
+        assert view.previous_page.disabled and not view.next_page.disabled
+
+        interaction = self._interaction()
+        await view.next_page.callback(interaction)
+        await view.next_page.callback(interaction)
+        interaction.response.edit_message.assert_awaited_with(
+            content="three", view=view
+        )
+        assert view.current_page == 2
+        assert view.next_page.disabled
+        assert view.page_indicator.label == "3/3"
+
+        await view.previous_page.callback(interaction)
+        interaction.response.edit_message.assert_awaited_with(content="two", view=view)
+        assert not view.previous_page.disabled
+
+    @pytest.mark.asyncio
+    async def test_expired_pages_remove_buttons(self):
+        """Test a click after expiry strips the buttons and eviction edits the message."""
+        now = [0.0]
+        cache = PageCache(max_entries=4, ttl_seconds=10, clock=lambda: now[0])
+        view = PaginatedReplyView(cache, "reply", 2)
+        cache.put("reply", ["one", "two"], on_evict=view.expire)
+        now[0] = 11.0
+
+        interaction = self._interaction()
+        await view.next_page.callback(interaction)
+        interaction.response.edit_message.assert_awaited_once_with(view=None)
+        assert view.is_finished()
+
+        view = PaginatedReplyView(cache, "other", 2)
+        view.message = MagicMock()
+        view.message.edit = AsyncMock()
+        cache.put("other", ["one", "two"], on_evict=view.expire)
+        assert cache.evict("other")
+        await asyncio.sleep(0)
+        view.message.edit.assert_awaited_once_with(view=None)
+
+
+class TestFontRegistry:
+    """Tests for the process-wide font registry."""
+
+    def test_loads_each_key_once_across_threads(self):
+        """Test concurrent lookups of one (path, index, size) load the font once."""
+        calls = []
+
+        def loader(path, size, index=0):
+            calls.append((path, size, index))
+            return object()
+
+        registry = FontRegistry(loader=loader)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            fonts = list(pool.map(lambda _: registry.load("a.ttc", 42), range(32)))
+        assert len(set(map(id, fonts))) == 1
+        assert calls == [("a.ttc", 42, 0)]
+        registry.load("a.ttc", 48)
+        registry.load("a.ttc", 42, index=1)
+        assert len(calls) == 3
+
+    def test_failures_are_recorded_once(self, capsys):
+        """Test a missing font is tried once per key and reported once per path."""
+        calls = []
+
+        def loader(path, size, index=0):
+            calls.append(path)
+            if path != "fallback.ttc":
+                raise OSError("cannot open resource")
+            return "font"
+
+        registry = FontRegistry(loader=loader)
+        for _ in range(3):
+            assert registry.load("missing.ttc", 42) is None
+        registry.load("missing.ttc", 48)
+        assert calls == ["missing.ttc", "missing.ttc"]
+        assert capsys.readouterr().out.count("Could not load font") == 1
+        assert ("missing.ttc", 0, 42) in registry.failures()
+
+    def test_get_font_falls_back_to_default(self):
+        """Test get_font returns a usable font when no Noto file loads."""
+
+        def loader(path, size, index=0):
+            assert path == str(REGULAR_FONT_PATH) or "NotoSansCJK.ttc" in path
+            raise OSError("missing")
+
+        registry = FontRegistry(loader=loader)
+        font = registry.get_font(42)
+        assert registry.get_font(42) is font
+
+
+class TestTextMeasure:
+    """Tests for memoized text width measurement."""
+
+    def test_matches_textlength(self):
+        """Test cached widths equal ImageDraw.textlength for arbitrary strings."""
+        font = ImageFont.load_default(42)
+        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        measure = FontMetrics(font)
+        rng = random.Random(7)
+        for _ in range(200):
+            text = "".join(rng.choice("AVTo.Wa rbyj**12") for _ in range(12))
+            assert measure.width(text) == draw.textlength(text, font=font)
+        prefixes = measure.prefix_widths("Table")
+        assert prefixes[-1] == draw.textlength("Table", font=font)
+        assert prefixes[0] == draw.textlength("T", font=font)
+
+    def test_word_lru_is_bounded_and_metrics_shared(self):
+        """Test the word LRU evicts old entries and metrics are shared per font."""
+        font = ImageFont.load_default(20)
+        measure = FontMetrics(font, word_cache_size=2)
+        for word in ("one", "two", "three"):
+            measure.width(word)
+        assert list(measure._words) == ["two", "three"]
+        assert font_metrics(font) is font_metrics(font)
+
+    def test_shaped_prefix_widths_measure_bounded_strings(self):
+        """Test shaped fonts measure prefixes in windows instead of ever longer strings."""
+        font = MagicMock()
+        font.layout_engine = ImageFont.Layout.RAQM
+        font.getlength.side_effect = lambda text: 10.0 * len(text)
+        measure = FontMetrics(font)
+        text = "字" * (SHAPED_PREFIX_WINDOW * 4 + 5)
+        widths = measure.prefix_widths(text)
+        assert widths == [10.0 * (i + 1) for i in range(len(text))]
+        measured = [call.args[0] for call in font.getlength.call_args_list]
+        assert len(measured) == len(text)
+        assert max(map(len, measured)) == SHAPED_PREFIX_WINDOW
+
+
+def _render_upper(text):
+    if not text:
+        raise ValueError("empty")
+    return text.upper().encode()
+
+
+def _crash_once(marker):
+    """Kill the worker the first time ``marker`` is rendered."""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return b"ok"
+
+
+def _crash(_):
+    os._exit(1)
+
+
+class TestRenderPool:
+    """Tests for the render executor backends."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("kind", ["inline", "thread", "process"])
+    async def test_render_many_keeps_order_and_errors(self, kind):
+        """Test results line up with the inputs and failures are returned in place."""
+        pool = RenderPool(_render_upper, kind=kind, max_workers=2)
+        try:
+            pool.warm()
+            results = await pool.render_many(["a", "", "c"])
+        finally:
+            pool.close()
+        assert results[0] == b"A" and results[2] == b"C"
+        assert isinstance(results[1], ValueError)
+
+    @pytest.mark.asyncio
+    async def test_crashed_worker_is_retried_on_a_fresh_pool(self, tmp_path):
+        """Test items lost to a dead worker are retried in a new worker process."""
+        pool = RenderPool(_crash_once, kind="process", max_workers=1)
+        try:
+            assert await pool.render_many([str(tmp_path / "once")]) == [b"ok"]
+            # A worker that always dies is reported, not rendered in this process
+            pool.render_fn = _crash
+            results = await pool.render_many(["x"])
+        finally:
+            pool.close()
+        assert isinstance(results[0], BrokenProcessPool)
+
+    def test_rejects_unknown_backend(self):
+        """Test an unsupported backend name fails fast."""
+        with pytest.raises(ValueError):
+            RenderPool(_render_upper, kind="gpu")
+
+
+class TestGlyphAtlas:
+    """Tests for glyph atlas text drawing."""
+
+    @pytest.mark.parametrize("x", [10, 10.5, 11.3])
+    def test_matches_draw_text(self, x):
+        """Test blitted text matches ImageDraw.text within blending rounding."""
+        font = ImageFont.load_default(42)
+        atlas = GlyphAtlas(font)
+        expected, actual = (Image.new("RGB", (700, 70), "white") for _ in range(2))
+        text = "AVATAR Tokyo, Wave (latency)"
+        ImageDraw.Draw(expected).text((x, 5), text, fill=(20, 20, 20), font=font)
+        atlas.draw_text(ImageDraw.Draw(actual), (x, 5), text, (20, 20, 20))
+        diff = ImageChops.difference(expected, actual)
+        assert max(high for _, high in diff.getextrema()) <= 2
+        assert len(atlas) == len(set(text))
+
+    def test_bitmap_fonts_use_draw_text(self):
+        """Test fonts without FreeType glyphs fall back to ImageDraw.text."""
+        atlas = GlyphAtlas(ImageFont.load_default_imagefont())
+        image = Image.new("RGB", (80, 20), "white")
+        atlas.draw_text(ImageDraw.Draw(image), (2, 2), "table", (0, 0, 0))
+        assert not atlas.supported
+        assert image.getbbox() is not None
+
+
+class TestRenderedImageCache:
+    """Tests for the rendered image cache."""
+
+    def test_memory_is_bounded_by_bytes(self):
+        """Test least recently used entries are evicted once the byte cap is hit."""
+        cache = RenderedImageCache(max_bytes=10)
+        cache.put("a", [b"aa", b"aa"])
+        cache.put("b", [b"bbbb"])
+        assert cache.get("a") == [b"aa", b"aa"]
+        cache.put("c", [b"cccc"])
+        assert cache.get("b") is None
+        assert cache.get("a") == [b"aa", b"aa"] and cache.size_bytes == 8
+        cache.put("huge", [b"x" * 6, b"x" * 5])
+        assert cache.get("huge") is None and len(cache) == 2
+
+    def test_disk_tier_survives_restart_and_is_pruned(self, tmp_path):
+        """Test images are read back from SQLite in order and old entries are pruned."""
+        now = [1000.0]
+        db_path = str(tmp_path / "images.db")
+        cache = RenderedImageCache(db_path=db_path, clock=lambda: now[0])
+        for key in ("old", "new"):
+            cache.put(key, [key.encode() * 5, b"tile2" * 3])
+            now[0] += 1
+        cache.close()
+
+        reopened = RenderedImageCache(max_bytes=0, db_path=db_path)
+        assert reopened.get("new") == [b"new" * 5, b"tile2" * 3]
+        assert reopened.hits == 1
+        reopened.close()
+
+        pruned = RenderedImageCache(db_path=db_path, max_disk_bytes=30)
+        assert pruned.get("old") is None
+        assert pruned.get("new") == [b"new" * 5, b"tile2" * 3]
+        pruned.close()
+
+
+class TestImageEncoding:
+    """Tests for image encoding."""
+
+    def test_greyscale_png_is_lossless(self):
+        """Test grey images are stored as 8-bit greyscale without changing pixels."""
+        image = Image.new("RGB", (40, 20), (248, 248, 248))
+        ImageDraw.Draw(image).text((2, 2), "grey", fill=(20, 20, 20))
+        encoded = Image.open(io.BytesIO(encode_image(image, greyscale=True)))
+        assert encoded.mode == "L"
+        assert ImageChops.difference(encoded.convert("RGB"), image).getbbox() is None
+
+    def test_palette_rgb_and_webp(self):
+        """Test colour images are quantized, RGB is kept when asked and WebP is lossless."""
+        image = Image.new("RGB", (30, 30), (255, 0, 0))
+        ImageDraw.Draw(image).rectangle([5, 5, 20, 20], fill=(0, 90, 200))
+        assert Image.open(io.BytesIO(encode_image(image))).mode == "P"
+        rgb = Image.open(io.BytesIO(encode_image(image, palette=False)))
+        assert rgb.mode == "RGB"
+        webp = Image.open(io.BytesIO(encode_image(image, image_format="webp")))
+        assert webp.format == "WEBP"
+        assert ImageChops.difference(webp.convert("RGB"), image).getbbox() is None
+        with pytest.raises(ValueError):
+            encode_image(image, image_format="gif")
+
+
+class TestTextTable:
+    """Tests for monospace text tables."""
+
+    def test_display_width_counts_wide_characters_twice(self):
+        """Test CJK and fullwidth characters take two columns, combining marks none."""
+        assert display_width("abc") == 3
+        assert display_width("東京") == 4
+        assert display_width("ＡＢ") == 4
+        assert display_width("e\u0301") == 1
+
+    def test_format_aligns_cjk_columns(self):
+        """Test every line of a mixed CJK table has the same display width."""
+        headers = ["City", "**人口**"]
+        rows = [["東京", "1400万"], ["Paris", "`2.1M`"]]
+        block = format_text_table(headers, rows)
+        lines = block.split("\n")
+        assert lines[0] == lines[-1] == "```"
+        assert lines[1] == "| City  | 人口   |"
+        assert {display_width(line) for line in lines[1:-1]} == {
+            text_table_width(headers, rows)
+        }
+
+
+class TestLineBreaking:
+    """Tests for CJK line break opportunities."""
+
+    def test_breaks_between_ideographs_only(self):
+        """Test CJK text breaks between characters while Latin runs stay whole."""
+        assert break_opportunities("東京の天気") == [1, 2, 3, 4]
+        assert break_opportunities("abc東京def") == [3, 4, 5]
+        assert break_opportunities("throughput") == []
+        assert break_opportunities("") == []
+
+    def test_kinsoku_punctuation(self):
+        """Test closing punctuation and small kana never start a line, brackets never end one."""
+        assert break_opportunities("（東京）です。") == [2, 4, 5]
+        assert break_opportunities("ちょっと") == [3]
+        assert break_opportunities("「はい」、") == [2]
+
+
+class TestMetricsRegistry:
+    """Tests for the metrics registry."""
+
+    def test_counters_gauges_summaries(self):
+        """Test each metric type is recorded and labelled separately."""
+        registry = MetricsRegistry()
+        registry.incr("sent", channel=1)
+        registry.incr("sent", 2, channel=1)
+        registry.set_gauge("depth", 3, channel=2)
+        registry.observe("latency", 0.5)
+        registry.observe("latency", 1.5)
+
+        assert registry.get_counter("sent", channel=1) == 3
+        assert registry.get_counter("sent", channel=2) == 0
+        assert registry.get_gauge("depth", channel=2) == 3
+        assert registry.get_summary("latency") == {
+            "count": 2,
+            "sum": 2.0,
+            "min": 0.5,
+            "max": 1.5,
+        }
+        assert "sent{channel=1} 3" in registry.format_snapshot("sent")
+
+
+class FakeChannel:
+    """Channel double that records sends and can fail a number of times first."""
+
+    def __init__(self, channel_id=1, failures=0, status=429):
+        self.id = channel_id
+        self.sent = []
+        self.failures = failures
+        self.status = status
+
+    async def send(self, content=None, files=None, view=None):
+        if self.failures:
+            self.failures -= 1
+            response = MagicMock(status=self.status, reason="error", headers={})
+            raise discord.HTTPException(response, "send failed")
+        await asyncio.sleep(0)
+        self.sent.append(content)
+        return content
+
+
+class TestOutboundDispatcher:
+    """Tests for the outbound message dispatcher."""
+
+    def test_merge_small_chunks(self):
+        """Test adjacent small chunks merge while reply targets stay separate."""
+        reply_target = MagicMock()
+        messages = [
+            OutboundMessage(content="a"),
+            OutboundMessage(content="b"),
+            OutboundMessage(content="c", reply_to=reply_target),
+        ]
+        merged = merge_small_chunks(messages, max_chars=10)
+        assert [m.content for m in merged] == ["a\nb", "c"]
+        assert len(merge_small_chunks(messages, max_chars=2)) == 3
+
+    @pytest.mark.asyncio
+    async def test_replies_do_not_interleave(self):
+        """Test concurrent replies to one channel are delivered one after another."""
+        dispatcher = OutboundDispatcher(base_delay=0)
+        channel = FakeChannel()
+        first = [
+            OutboundMessage(content="1" * 1500),
+            OutboundMessage(content="2" * 1500),
+        ]
+        second = [
+            OutboundMessage(content="3" * 1500),
+            OutboundMessage(content="4" * 1500),
+        ]
+
+        await asyncio.gather(
+            dispatcher.send(channel, first), dispatcher.send(channel, second)
+        )
+        assert [c[0] for c in channel.sent] == ["1", "2", "3", "4"]
+
+    @pytest.mark.asyncio
+    async def test_retries_rate_limited_send(self):
+        """Test 429 responses are retried until the send succeeds."""
+        dispatcher = OutboundDispatcher(max_retries=3, base_delay=0)
+        channel = FakeChannel(failures=2)
+        sent = await dispatcher.send(channel, [OutboundMessage(content="hello")])
+        assert sent == ["hello"]
+
+    @pytest.mark.asyncio
+    async def test_server_and_network_errors_are_not_retried(self):
+        """Test 5xx and OSError fail at once so a message is never posted twice."""
+        dispatcher = OutboundDispatcher(max_retries=3, base_delay=0)
+        channel = FakeChannel(failures=1, status=503)
+        with pytest.raises(discord.HTTPException):
+            await dispatcher.send(channel, [OutboundMessage(content="hello")])
+        assert channel.sent == [] and channel.failures == 0
+
+        channel = FakeChannel()
+        channel.send = AsyncMock(side_effect=ConnectionResetError("reset"))
+        with pytest.raises(ConnectionResetError):
+            await dispatcher.send(channel, [OutboundMessage(content="hello")])
+        channel.send.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_honoured(self):
+        """Test the backoff waits at least the Retry-After of a 429."""
+        dispatcher = OutboundDispatcher(base_delay=0)
+        response = MagicMock(status=429, reason="rate", headers={"Retry-After": "1.5"})
+        error = discord.HTTPException(response, "rate limited")
+        assert dispatcher._backoff_delay(0, error) == 1.5
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_error_raises(self):
+        """Test client errors such as 403 are not retried."""
+        dispatcher = OutboundDispatcher(max_retries=3, base_delay=0)
+        channel = FakeChannel(failures=1, status=403)
+        with pytest.raises(discord.HTTPException):
+            await dispatcher.send(channel, [OutboundMessage(content="hello")])
+        assert channel.sent == []
+
+
+def _noise_png(size: int) -> io.BytesIO:
+    """Create a PNG that compresses poorly."""
+    rng = random.Random(0)
+    img = Image.frombytes(
+        "RGB", (size, size), bytes(rng.getrandbits(8) for _ in range(size * size * 3))
+    )
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+class TestAttachmentPlanner:
+    """Tests for the attachment planner."""
+
+    def test_respects_file_count_limit(self):
+        """Test more than ten files are split across messages in order."""
+        files = [
+            OutboundFile(io.BytesIO(b"x" * 10), filename=f"table_{i}.md")
+            for i in range(12)
+        ]
+        batches = plan_attachment_batches(files, max_bytes=10 * 1024 * 1024)
+        assert [len(batch) for batch in batches] == [10, 2]
+        assert [f.filename for batch in batches for f in batch] == [
+            f.filename for f in files
+        ]
+
+    def test_respects_byte_limit(self):
+        """Test files are packed so no batch exceeds the byte budget."""
+        files = [
+            OutboundFile(io.BytesIO(b"x" * 60_000), filename=f"table_{i}.md")
+            for i in range(4)
+        ]
+        batches = plan_attachment_batches(files, max_bytes=64 * 1024 + 130_000)
+        assert len(batches) == 2
+        assert all(
+            sum(attachment_size(f) for f in batch) <= 130_000 for batch in batches
+        )
+
+    def test_oversized_image_is_shrunk(self):
+        """Test an image above the limit is recompressed or downscaled to fit."""
+        image = OutboundFile(_noise_png(800), filename="table_1.png")
+        max_bytes = 64 * 1024 + 200_000
+        assert attachment_size(image) > max_bytes
+
+        batches = plan_attachment_batches([image], max_bytes=max_bytes)
+        assert len(batches) == 1
+        assert attachment_size(batches[0][0]) <= 200_000
+
+
+class TestSearchToolClassifier:
+    """Tests for the local search tool classifier."""
+
+    def test_rules(self):
+        """Test fresh-data questions need search and small talk does not."""
+        classifier = SearchToolClassifier()
+        assert classifier.needs_search("what's the weather in Tokyo today")
+        assert classifier.needs_search("今天的新闻")
+        assert not classifier.needs_search("hello!")
+        assert not classifier.needs_search("write a poem about the sea")
+        assert "live_data" in classifier.matched_rules("bitcoin price")
+
+    def test_bag_of_words_model(self, tmp_path):
+        """Test a loaded bag-of-words model shifts the score."""
+        path = tmp_path / "model.json"
+        path.write_text('{"bias": 0.5, "weights": {"zelda": 2.0}}')
+        model = BagOfWordsModel.load(str(path))
+        assert model.logit("Zelda zelda") == 4.5
+
+        classifier = SearchToolClassifier(model=model)
+        assert classifier.needs_search("zelda")
+        assert not SearchToolClassifier().needs_search("zelda")
+
+    def test_missing_model_falls_back_to_rules(self, tmp_path):
+        """Test an unreadable model path keeps the rule-based classifier."""
+        classifier = SearchToolClassifier.from_model_path(str(tmp_path / "none.json"))
+        assert classifier.model is None
+
+    def test_shipped_samples(self):
+        """Test precision and recall on the bundled labelled sample."""
+        samples = load_labelled_samples("config/search_classifier_samples.jsonl")
+        result = evaluate_classifier(SearchToolClassifier(), samples)
+        assert result["samples"] == len(samples)
+        assert result["tp"] + result["fp"] + result["fn"] + result["tn"] == len(samples)
+        assert result["precision"] >= 0.9
+        assert result["recall"] >= 0.8
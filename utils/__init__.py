@@ -2,11 +2,36 @@
 Utilities package for font management, LLM routing, and other helper functions.
 """
 
+from .client_pool import ClientPool
+from .concurrency_limiter import ConcurrencyLimiters, LimiterSettings
 from .config_utils import env_onoff_to_bool
+from .context_cache import GeminiContextCache
 from .download_font import check_font_exists, download_noto_font
-from .llm_router import LLMConfig, call_llm, get_supported_providers
+from .image_cache import RenderedImageCache
+from .llm_hedging import HedgingPolicy
+from .llm_resilience import CircuitOpenError, LLMResilience, RetryPolicy
+from .llm_router import (
+    LLMConfig,
+    call_llm,
+    configure_llm_concurrency,
+    configure_llm_resilience,
+    configure_response_cache,
+    get_supported_providers,
+    register_provider,
+)
+from .openai_compatible import OpenAICompatibleClient
+from .pagination import PageCache, PaginatedReplyView
+from .response_cache import ResponseCache
 from .runtime_config import runtime_config
+from .search_classifier import SearchToolClassifier
 from .shared_store_builder import create_message_data, validate_message_data_types
+from .usage_tracker import (
+    BudgetExceededError,
+    UsageTracker,
+    configure_usage_tracker,
+    get_usage_tracker,
+    usage_scope,
+)
 
 __all__ = [
     "env_onoff_to_bool",
@@ -17,5 +42,28 @@ __all__ = [
     "call_llm",
     "get_supported_providers",
     "LLMConfig",
+    "LLMResilience",
+    "HedgingPolicy",
+    "RetryPolicy",
+    "CircuitOpenError",
+    "configure_llm_resilience",
+    "ClientPool",
+    "ConcurrencyLimiters",
+    "LimiterSettings",
+    "configure_llm_concurrency",
+    "register_provider",
+    "ResponseCache",
+    "RenderedImageCache",
+    "GeminiContextCache",
+    "UsageTracker",
+    "BudgetExceededError",
+    "configure_usage_tracker",
+    "get_usage_tracker",
+    "usage_scope",
+    "configure_response_cache",
+    "OpenAICompatibleClient",
+    "PageCache",
+    "PaginatedReplyView",
     "runtime_config",
+    "SearchToolClassifier",
 ]
@@ -0,0 +1,142 @@
+"""
+Attachment planning to fit Discord's per-message upload limits.
+Packs files into as few messages as possible and shrinks oversized images.
+"""
+
+import io
+import os
+
+from PIL import Image
+
+from .outbound_dispatcher import MAX_FILES_PER_MESSAGE, OutboundFile
+
+# Discord's upload limit for servers without boosts (and for DMs)
+DEFAULT_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+# Leave room for multipart overhead and the message payload itself
+UPLOAD_SAFETY_MARGIN = 64 * 1024
+
+IMAGE_EXTENSIONS = (".png", ".webp", ".jpg", ".jpeg")
+
+
+def get_upload_limit(channel=None) -> int:
+    """
+    Get the total upload size allowed per message for a channel.
+
+    Uses ``DISCORD_MAX_UPLOAD_BYTES`` when set, otherwise the guild's boost-tier
+    limit, falling back to Discord's default for DMs.
+    """
+    override = os.getenv("DISCORD_MAX_UPLOAD_BYTES")
+    if override:
+        return int(override)
+    guild = getattr(channel, "guild", None)
+    limit = getattr(guild, "filesize_limit", None)
+    return limit if isinstance(limit, int) and limit > 0 else DEFAULT_MAX_UPLOAD_BYTES
+
+
+def attachment_size(file: OutboundFile) -> int:
+    """Size in bytes of an attachment's source (buffer or path)."""
+    source = file.source
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer().nbytes
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    return os.path.getsize(source)
+
+
+def _read_bytes(file: OutboundFile) -> bytes:
+    source = file.source
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def shrink_image(
+    data: bytes, max_bytes: int, min_side: int = 320, scale_step: float = 0.75
+) -> bytes | None:
+    """
+    Re-encode an image until it fits in ``max_bytes``.
+
+    First tries a lossless palette PNG with maximum compression, then lowers the
+    resolution step by step. Returns None if the image cannot be made small
+    enough without dropping below ``min_side`` pixels.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        img = original.convert("RGB")
+
+    def encode(image: Image.Image) -> bytes:
+        buffer = io.BytesIO()
+        quantized = image.quantize(colors=256, dither=Image.Dither.NONE)
+        quantized.save(buffer, format="PNG", optimize=True, compress_level=9)
+        return buffer.getvalue()
+
+    encoded = encode(img)
+    while len(encoded) > max_bytes:
+        width, height = img.size
+        new_size = (int(width * scale_step), int(height * scale_step))
+        if min(new_size) < min_side:
+            return None
+        img = img.resize(new_size, Image.Resampling.LANCZOS)
+        encoded = encode(img)
+    return encoded
+
+
+def plan_attachment_batches(
+    files: list[OutboundFile],
+    max_bytes: int = DEFAULT_MAX_UPLOAD_BYTES,
+    max_files: int = MAX_FILES_PER_MESSAGE,
+) -> list[list[OutboundFile]]:
+    """
+    Pack attachments into the fewest messages that respect count and size limits.
+
+    Uses first-fit decreasing bin packing. Images larger than the per-message
+    budget are recompressed or downscaled; other oversized files are dropped
+    with a warning since Discord would reject them anyway. Within each batch the
+    original attachment order is kept.
+
+    Returns:
+        List of batches, each a list of attachments for one message
+    """
+    budget = max(1, max_bytes - UPLOAD_SAFETY_MARGIN)
+    sized = []
+    for index, file in enumerate(files):
+        size = attachment_size(file)
+        if size > budget:
+            if not file.filename.lower().endswith(IMAGE_EXTENSIONS):
+                print(
+                    f"⚠️ [AttachmentPlanner] Dropping {file.filename}: {size} bytes exceeds the {budget} byte limit"
+                )
+                continue
+            shrunk = shrink_image(_read_bytes(file), budget)
+            if shrunk is None:
+                print(
+                    f"⚠️ [AttachmentPlanner] Dropping {file.filename}: could not shrink below {budget} bytes"
+                )
+                continue
+            print(
+                f"🗜️ [AttachmentPlanner] Shrunk {file.filename} from {size} to {len(shrunk)} bytes"
+            )
+            filename = os.path.splitext(file.filename)[0] + ".png"
+            file = OutboundFile(io.BytesIO(shrunk), filename=filename)
+            size = len(shrunk)
+        sized.append((index, size, file))
+
+    # First-fit decreasing: place the largest files first
+    batches: list[list[tuple[int, int, OutboundFile]]] = []
+    batch_sizes: list[int] = []
+    for item in sorted(sized, key=lambda entry: entry[1], reverse=True):
+        for batch_index, batch in enumerate(batches):
+            if len(batch) < max_files and batch_sizes[batch_index] + item[1] <= budget:
+                batch.append(item)
+                batch_sizes[batch_index] += item[1]
+                break
+        else:
+            batches.append([item])
+            batch_sizes.append(item[1])
+
+    # Order batches by their first original attachment and keep order inside each
+    ordered = [sorted(batch, key=lambda entry: entry[0]) for batch in batches]
+    ordered.sort(key=lambda batch: batch[0][0])
+    return [[entry[2] for entry in batch] for batch in ordered]
@@ -0,0 +1,182 @@
+"""
+Pool of provider clients, one per API key, for spreading LLM calls over several quotas.
+Picks a key round-robin or by fewest in-flight calls and rests keys that hit quota errors.
+"""
+
+import os
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from .concurrency_limiter import is_rate_limit_error
+from .metrics import metrics
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+STRATEGIES = {ROUND_ROBIN, LEAST_LOADED}
+
+
+def split_api_keys(value: str | None) -> list[str]:
+    """Comma-separated API keys, stripped and de-duplicated in order."""
+    keys = []
+    for key in (value or "").split(","):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def key_label(index: int) -> str:
+    """
+    Non-secret label for the ``index``-th (0-based) key of a pool, used in logs and metrics.
+
+    Keys are numbered by their position in the comma-separated list, which is
+    unique within a pool; a key suffix is not (keys can share their last digits).
+    """
+    return f"key{index + 1}"
+
+
+@dataclass
+class PooledClient:
+    """A client in the pool with its usage counters and cooldown."""
+
+    label: str
+    client: Any
+    in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    cooldown_until: float = 0.0
+    last_used: float = field(default=float("-inf"))
+
+
+class ClientPool:
+    """
+    Rotates provider calls across several clients (one per API key).
+
+    An ``LLMConfig`` whose ``client`` is a pool gets a concrete client per attempt
+    from ``call_llm``, so nodes keep passing a single client object. A key that
+    returns 429 / RESOURCE_EXHAUSTED rests for ``cooldown_seconds``; when every key
+    is resting, the one that recovers first is used rather than failing the call.
+
+    Args:
+        clients (list[tuple[str, Any]]): (label, client) pairs
+        name (str): Pool name used in logs and metrics, e.g. "chat"
+        strategy (str): "round_robin" or "least_loaded" (default: "round_robin")
+        cooldown_seconds (float): Rest period after a quota error (default: 60)
+        clock (Callable): Monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        clients: list[tuple[str, Any]],
+        name: str = "default",
+        strategy: str = ROUND_ROBIN,
+        cooldown_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not clients:
+            raise ValueError("ClientPool needs at least one client")
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Unsupported key pool strategy: {strategy}. Supported: {sorted(STRATEGIES)}"
+            )
+        self.name = name
+        self.strategy = strategy
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self.members = [PooledClient(label, client) for label, client in clients]
+        self._next = 0
+
+    @classmethod
+    def from_keys(
+        cls,
+        api_keys: list[str],
+        factory: Callable[[str], Any],
+        name: str = "default",
+    ) -> "ClientPool":
+        """Build a pool with ``factory(api_key)`` per key, configured from API_KEY_POOL_* env vars."""
+        return cls(
+            [(key_label(i), factory(key)) for i, key in enumerate(api_keys)],
+            name=name,
+            strategy=os.getenv("API_KEY_POOL_STRATEGY") or ROUND_ROBIN,
+            cooldown_seconds=float(os.getenv("API_KEY_POOL_COOLDOWN_SECONDS", 60)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def acquire(self) -> PooledClient:
+        """Pick a member and count the call as in flight; pair with ``release``."""
+        now = self._clock()
+        available = [m for m in self.members if m.cooldown_until <= now]
+        if not available:
+            member = min(self.members, key=lambda m: m.cooldown_until)
+        elif self.strategy == LEAST_LOADED:
+            member = min(available, key=lambda m: (m.in_flight, m.last_used))
+        else:
+            count = len(self.members)
+            for offset in range(count):
+                candidate = self.members[(self._next + offset) % count]
+                if candidate.cooldown_until <= now:
+                    member = candidate
+                    self._next = (self._next + offset + 1) % count
+                    break
+        member.in_flight += 1
+        member.requests += 1
+        member.last_used = now
+        self._publish(member)
+        return member
+
+    def release(self, member: PooledClient, error: Exception | None = None) -> None:
+        """Mark a call finished; quota errors put the member's key on cooldown."""
+        member.in_flight -= 1
+        if error is not None:
+            member.errors += 1
+            if is_rate_limit_error(error):
+                member.rate_limited += 1
+                member.cooldown_until = self._clock() + self.cooldown_seconds
+                metrics.incr(
+                    "llm.key_pool.rate_limited", pool=self.name, key=member.label
+                )
+                print(
+                    f"🔑 [ClientPool] {self.name} key {member.label} hit its quota, resting for {self.cooldown_seconds:.0f}s"
+                )
+        self._publish(member)
+
+    async def call(self, func: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run ``func(client)`` with a client taken from the pool."""
+        member = self.acquire()
+        try:
+            result = await func(member.client)
+        except BaseException as e:
+            self.release(member, e if isinstance(e, Exception) else None)
+            raise
+        self.release(member)
+        return result
+
+    def _publish(self, member: PooledClient) -> None:
+        labels = {"pool": self.name, "key": member.label}
+        metrics.set_gauge("llm.key_pool.in_flight", member.in_flight, **labels)
+        metrics.set_gauge("llm.key_pool.requests", member.requests, **labels)
+        metrics.set_gauge(
+            "llm.key_pool.available",
+            sum(1 for m in self.members if m.cooldown_until <= self._clock()),
+            pool=self.name,
+        )
+
+    def stats(self) -> list[dict]:
+        """Per-key usage counters, for logs and admin commands."""
+        now = self._clock()
+        return [
+            {
+                "key": m.label,
+                "in_flight": m.in_flight,
+                "requests": m.requests,
+                "errors": m.errors,
+                "rate_limited": m.rate_limited,
+                "cooling_down": m.cooldown_until > now,
+            }
+            for m in self.members
+        ]
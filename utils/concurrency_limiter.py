@@ -0,0 +1,192 @@
+"""
+Adaptive (AIMD) concurrency limiting for LLM provider calls.
+Grows the number of parallel calls while they stay healthy and halves it on rate limits.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from threading import Lock
+
+from .llm_resilience import error_status_code
+from .metrics import metrics
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Return True for 429 / RESOURCE_EXHAUSTED responses."""
+    if error_status_code(error) == 429:
+        return True
+    status = getattr(error, "status", None)
+    return status == "RESOURCE_EXHAUSTED" or "RESOURCE_EXHAUSTED" in str(error)
+
+
+@dataclass
+class LimiterSettings:
+    """AIMD parameters shared by all provider/model limiters."""
+
+    initial_limit: float = 4
+    min_limit: float = 1
+    max_limit: float = 64
+    increase: float = 1.0  # Added to the limit per limit-worth of healthy calls
+    decrease_factor: float = 0.5  # Multiplier applied on a rate-limit response
+    # A call slower than this multiple of the latency average does not grow the limit
+    latency_tolerance: float = 2.0
+
+    @classmethod
+    def from_env(cls) -> "LimiterSettings":
+        """Create settings from LLM_CONCURRENCY_* environment variables."""
+        return cls(
+            initial_limit=float(os.getenv("LLM_CONCURRENCY_INITIAL", 4)),
+            min_limit=float(os.getenv("LLM_CONCURRENCY_MIN", 1)),
+            max_limit=float(os.getenv("LLM_CONCURRENCY_MAX", 64)),
+            decrease_factor=float(os.getenv("LLM_CONCURRENCY_DECREASE_FACTOR", 0.5)),
+        )
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limiter: additive increase on healthy calls, multiplicative decrease on 429s.
+
+    Callers beyond the limit wait in FIFO order instead of failing. A decrease is
+    applied at most once per round trip: only calls that started after the last
+    decrease can trigger another one, so a burst of 429s halves the limit once.
+
+    Args:
+        name (str): Label used for metrics, e.g. "gemini/gemini-2.5-flash"
+        settings (LimiterSettings): AIMD parameters
+        clock (Callable): Monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        name: str,
+        settings: LimiterSettings | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.settings = settings or LimiterSettings()
+        self._clock = clock
+        self.limit = float(self.settings.initial_limit)
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = float("-inf")
+        self._latency_avg: float | None = None
+        self._publish()
+
+    @property
+    def queue_length(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    def _publish(self) -> None:
+        labels = {"target": self.name}
+        metrics.set_gauge("llm.concurrency_limit", round(self.limit, 2), **labels)
+        metrics.set_gauge("llm.concurrency_in_flight", self.in_flight, **labels)
+        metrics.set_gauge("llm.concurrency_queue", self.queue_length, **labels)
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the start time to pass to ``release``."""
+        if self.in_flight < self._capacity() and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return self._clock()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        queued_at = self._clock()
+        self._publish()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; give it back
+                self.in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                # Otherwise _wake() already dropped the cancelled waiter
+                self._waiters.remove(waiter)
+            self._publish()
+            raise
+        started = self._clock()
+        metrics.observe(
+            "llm.concurrency_wait_seconds", started - queued_at, target=self.name
+        )
+        return started
+
+    def release(
+        self, started: float, error: Exception | None = None, completed: bool = True
+    ) -> None:
+        """
+        Free a slot and adapt the limit to the call's outcome.
+
+        Pass ``completed=False`` for cancelled calls (e.g. a losing hedge), which
+        neither grow nor shrink the limit.
+        """
+        saturated = self.in_flight >= self._capacity() or bool(self._waiters)
+        self.in_flight -= 1
+        if error is not None and is_rate_limit_error(error):
+            self._on_rate_limited(started)
+        elif error is None and completed:
+            self._on_success(self._clock() - started, saturated)
+        self._wake()
+        self._publish()
+
+    def _on_rate_limited(self, started: float) -> None:
+        if started < self._last_decrease:
+            return
+        previous = self.limit
+        self.limit = max(
+            self.settings.min_limit, self.limit * self.settings.decrease_factor
+        )
+        self._last_decrease = self._clock()
+        metrics.incr("llm.concurrency_decreases", target=self.name)
+        print(
+            f"🐢 [AdaptiveConcurrencyLimiter] {self.name} rate limited, limit {previous:.1f} -> {self.limit:.1f}"
+        )
+
+    def _on_success(self, latency: float, saturated: bool) -> None:
+        average = self._latency_avg
+        self._latency_avg = (
+            latency if average is None else 0.9 * average + 0.1 * latency
+        )
+        slow = average is not None and latency > average * (
+            self.settings.latency_tolerance
+        )
+        # Only grow when the current limit is actually the bottleneck
+        if saturated and not slow:
+            self.limit = min(
+                self.settings.max_limit,
+                self.limit + self.settings.increase / max(self.limit, 1.0),
+            )
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self._capacity():
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+class ConcurrencyLimiters:
+    """One adaptive limiter per provider/model, created on first use."""
+
+    def __init__(self, settings: LimiterSettings | None = None):
+        self.settings = settings or LimiterSettings()
+        self._lock = Lock()
+        self._limiters: dict[tuple[str, str], AdaptiveConcurrencyLimiter] = {}
+
+    def limiter(self, provider: str, model: str) -> AdaptiveConcurrencyLimiter:
+        key = (provider, model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = AdaptiveConcurrencyLimiter(
+                    f"{provider}/{model}", self.settings
+                )
+            return limiter
@@ -0,0 +1,153 @@
+"""
+Gemini explicit context caching for the static system prompt and tools.
+Creates one cached-content entry per (client, model, prompt hash), renews its TTL and
+recreates it when it disappears.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from google.genai import types
+
+from .metrics import metrics
+
+
+def _tool_fingerprint(tool: Any) -> str:
+    if hasattr(tool, "model_dump_json"):
+        return tool.model_dump_json(exclude_none=True)
+    return repr(tool)
+
+
+def context_cache_hash(model: str, system_prompt: str, tools: list | None) -> str:
+    """sha256 of everything stored in the cached content."""
+    digest = hashlib.sha256()
+    for part in [model, system_prompt or "", *map(_tool_fingerprint, tools or [])]:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedContext:
+    """A live cached-content entry and when its TTL runs out (monotonic clock)."""
+
+    name: str
+    expires_at: float
+
+
+class GeminiContextCache:
+    """
+    Keeps Gemini cached-content entries for static system prompts and tools.
+
+    ``get_cache_name`` returns the entry to reference in ``cached_content``,
+    creating it on first use and extending its TTL when it is about to expire.
+    If creation fails (e.g. the prompt is below the model's minimum cacheable
+    size) the key is not retried for ``retry_after`` seconds and callers send
+    the prompt uncached.
+
+    Args:
+        ttl_seconds (int): TTL requested for each entry (default: 3600)
+        renew_before (float): Renew the TTL this many seconds before expiry (default: 300)
+        retry_after (float): Seconds to wait before retrying a failed creation (default: 600)
+        clock (Callable): Monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        renew_before: float = 300,
+        retry_after: float = 600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.renew_before = renew_before
+        self.retry_after = retry_after
+        self._clock = clock
+        self._entries: dict[tuple[int, str], CachedContext] = {}
+        self._failed_until: dict[tuple[int, str], float] = {}
+        self._locks: dict[tuple[int, str], asyncio.Lock] = {}
+
+    def _key(self, client: Any, model: str, system_prompt: str, tools: list | None):
+        # Cached content lives in the API key's project, so entries are per client
+        return (id(client), context_cache_hash(model, system_prompt, tools))
+
+    def _lock(self, key) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def get_cache_name(
+        self, client: Any, model: str, system_prompt: str, tools: list | None = None
+    ) -> str | None:
+        """Name of a live cached-content entry, or None to send the prompt uncached."""
+        if client is None or not system_prompt:
+            return None
+        key = self._key(client, model, system_prompt, tools)
+        if self._failed_until.get(key, 0) > self._clock():
+            return None
+
+        async with self._lock(key):
+            entry = self._entries.get(key)
+            now = self._clock()
+            if entry is not None and now < entry.expires_at - self.renew_before:
+                metrics.incr("context_cache.hits")
+                return entry.name
+            if entry is not None and now < entry.expires_at:
+                if await self._renew(client, entry):
+                    return entry.name
+            return await self._create(client, key, model, system_prompt, tools)
+
+    async def _renew(self, client: Any, entry: CachedContext) -> bool:
+        try:
+            await client.aio.caches.update(
+                name=entry.name,
+                config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"),
+            )
+        except Exception as e:
+            print(f"⚠️ [GeminiContextCache] Renewing {entry.name} failed: {e}")
+            return False
+        entry.expires_at = self._clock() + self.ttl_seconds
+        metrics.incr("context_cache.renewed")
+        print(f"🔄 [GeminiContextCache] Renewed {entry.name} for {self.ttl_seconds}s")
+        return True
+
+    async def _create(self, client, key, model, system_prompt, tools) -> str | None:
+        self._entries.pop(key, None)
+        try:
+            cached = await client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"daia-{key[1][:16]}",
+                    system_instruction=system_prompt,
+                    tools=tools or None,
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+        except Exception as e:
+            self._failed_until[key] = self._clock() + self.retry_after
+            metrics.incr("context_cache.errors")
+            print(
+                f"⚠️ [GeminiContextCache] Could not cache system prompt for {model}, sending it uncached: {e}"
+            )
+            return None
+        self._failed_until.pop(key, None)
+        self._entries[key] = CachedContext(
+            cached.name, self._clock() + self.ttl_seconds
+        )
+        metrics.incr("context_cache.created")
+        print(f"🗃️ [GeminiContextCache] Created {cached.name} for {model}")
+        return cached.name
+
+    def invalidate(self, name: str) -> None:
+        """Forget an entry the API no longer knows about, so it is recreated."""
+        for key, entry in list(self._entries.items()):
+            if entry.name == name:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
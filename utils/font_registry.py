@@ -0,0 +1,105 @@
+"""
+Process-wide font registry for image rendering.
+Loads each (path, face index, size) once and remembers failed loads.
+"""
+
+from collections.abc import Callable
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from PIL import ImageFont
+
+from .metrics import metrics
+
+FONTS_DIR = Path("assets/fonts")
+REGULAR_FONT_PATH = FONTS_DIR / "03_NotoSansCJK-OTC" / "NotoSansCJK-Regular.ttc"
+BOLD_FONT_PATH = FONTS_DIR / "03_NotoSansCJK-OTC" / "NotoSansCJK-Bold.ttc"
+# Single-file layout used by older font downloads
+LEGACY_FONT_PATH = FONTS_DIR / "NotoSansCJK.ttc"
+
+FontKey = tuple[str, int, int]
+
+
+class FontRegistry:
+    """
+    Thread-safe cache of loaded fonts shared by all renderers in the process.
+
+    Fonts are keyed by (path, face index, size). A failed load is recorded and
+    not retried, and each failing path is reported once. Loaded FreeType fonts
+    are read-only, so they can be used from executor threads concurrently.
+
+    Args:
+        loader (Callable): Font loader, ``ImageFont.truetype`` by default
+    """
+
+    def __init__(self, loader: Callable[..., Any] = ImageFont.truetype):
+        self._loader = loader
+        self._lock = Lock()
+        self._fonts: dict[FontKey, Any] = {}
+        self._failures: dict[FontKey, str] = {}
+        self._reported_paths: set[str] = set()
+
+    def load(self, path: str | Path, size: int, index: int = 0) -> Any | None:
+        """Font for (path, index, size), or None if it cannot be loaded."""
+        key = (str(path), index, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+        if key in self._failures:
+            return None
+
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None or key in self._failures:
+                return font
+            try:
+                font = self._loader(str(path), size, index=index)
+            except Exception as e:
+                self._failures[key] = str(e)
+                metrics.incr("fonts.load_failures")
+                if key[0] not in self._reported_paths:
+                    self._reported_paths.add(key[0])
+                    print(f"⚠️ [FontRegistry] Could not load font {path}: {e}")
+                return None
+            self._fonts[key] = font
+            metrics.incr("fonts.loaded")
+            return font
+
+    def get_font(self, size: int, bold: bool = False) -> Any:
+        """Noto Sans CJK (regular or bold), the legacy font file, or PIL's default."""
+        for path in (BOLD_FONT_PATH if bold else REGULAR_FONT_PATH, LEGACY_FONT_PATH):
+            font = self.load(path, size)
+            if font is not None:
+                return font
+        return self._default_font()
+
+    def _default_font(self) -> Any:
+        key = ("<default>", 0, 0)
+        font = self._fonts.get(key)
+        if font is None:
+            with self._lock:
+                font = self._fonts.get(key)
+                if font is None:
+                    print("⚠️ [FontRegistry] Using PIL's default font")
+                    font = self._fonts[key] = ImageFont.load_default()
+        return font
+
+    def failures(self) -> dict[FontKey, str]:
+        """Failed loads and their errors."""
+        with self._lock:
+            return dict(self._failures)
+
+    def clear(self) -> None:
+        """Forget loaded fonts and failures (e.g. after downloading fonts)."""
+        with self._lock:
+            self._fonts.clear()
+            self._failures.clear()
+            self._reported_paths.clear()
+
+    def __len__(self) -> int:
+        return len(self._fonts)
+
+
+# Global singleton instance
+font_registry = FontRegistry()
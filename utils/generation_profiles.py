@@ -0,0 +1,86 @@
+"""
+Named generation profiles trading answer depth for latency.
+A profile sets the thinking budget, output length and sampling of an LLM call.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from google.genai import types
+
+PROFILE_FAST = "fast"
+PROFILE_BALANCED = "balanced"
+PROFILE_DEEP = "deep"
+
+# Gemini 1.x and 2.0 models reject a thinking config
+_NON_THINKING_MODEL_RE = re.compile(r"gemini-(1\.|2\.0)")
+PRO_MIN_THINKING_BUDGET = 128
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """
+    Generation limits applied to a single LLM call.
+
+    ``None`` leaves the model default. ``thinking_budget`` follows Gemini:
+    0 disables thinking, -1 lets the model decide. Only one candidate is ever
+    requested since only the first one is used.
+    """
+
+    name: str
+    thinking_budget: int | None = None
+    max_output_tokens: int | None = None
+    top_p: float | None = None
+    top_k: int | None = None
+
+    def gemini_config_kwargs(self, model: str) -> dict[str, Any]:
+        """Keyword arguments for ``types.GenerateContentConfig``."""
+        kwargs: dict[str, Any] = {"candidate_count": 1}
+        if self.max_output_tokens is not None:
+            kwargs["max_output_tokens"] = self.max_output_tokens
+        if self.top_p is not None:
+            kwargs["top_p"] = self.top_p
+        if self.top_k is not None:
+            kwargs["top_k"] = self.top_k
+        if self.thinking_budget is not None and supports_thinking(model):
+            budget = self.thinking_budget
+            if budget == 0 and "pro" in model:
+                # Pro models cannot turn thinking off; use their smallest budget
+                budget = PRO_MIN_THINKING_BUDGET
+            kwargs["thinking_config"] = types.ThinkingConfig(thinking_budget=budget)
+        return kwargs
+
+    def openai_payload(self) -> dict[str, Any]:
+        """Extra fields for an OpenAI-compatible /chat/completions payload."""
+        payload: dict[str, Any] = {}
+        if self.max_output_tokens is not None:
+            payload["max_tokens"] = self.max_output_tokens
+        if self.top_p is not None:
+            payload["top_p"] = self.top_p
+        return payload
+
+
+def supports_thinking(model: str) -> bool:
+    """Whether a Gemini model accepts a thinking budget."""
+    return not _NON_THINKING_MODEL_RE.search(model or "")
+
+
+GENERATION_PROFILES: dict[str, GenerationProfile] = {
+    PROFILE_FAST: GenerationProfile(
+        PROFILE_FAST, thinking_budget=0, max_output_tokens=1024
+    ),
+    PROFILE_BALANCED: GenerationProfile(
+        PROFILE_BALANCED, thinking_budget=1024, max_output_tokens=4096
+    ),
+    PROFILE_DEEP: GenerationProfile(
+        PROFILE_DEEP, thinking_budget=-1, max_output_tokens=16384
+    ),
+}
+
+
+def get_generation_profile(name: str | None) -> GenerationProfile | None:
+    """Profile by name, or None for unknown names and the model defaults."""
+    if not name:
+        return None
+    return GENERATION_PROFILES.get(name.lower())
@@ -0,0 +1,86 @@
+"""
+Pre-rasterized glyph masks for drawing text by blitting.
+Each glyph of a font is rendered once and pasted for every later use.
+"""
+
+import math
+from threading import Lock
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from PIL import ImageFont
+
+from .text_measure import font_metrics
+
+
+class GlyphAtlas:
+    """
+    Glyph bitmaps of one font, composed into words without FreeType calls.
+
+    ``ImageDraw.text`` lays out and rasterizes the whole string on every call.
+    Tables repeat the same few dozen glyphs thousands of times, so the atlas
+    rasterizes each glyph once and draws a word by blitting its glyphs at the
+    pen positions from FontMetrics (advances plus pair kerning). With PIL's
+    basic layout glyph bitmaps do not depend on the subpixel pen position (it
+    is only rounded to whole pixels), so the result matches ``ImageDraw.text``
+    except where antialiased edges of overlapping glyphs meet. Fonts that need
+    complex shaping (raqm) or are not FreeType fonts are drawn with
+    ``ImageDraw.text``.
+
+    Args:
+        font: PIL font
+    """
+
+    def __init__(self, font: Any):
+        self.font = font
+        self.metrics = font_metrics(font)
+        self.supported = (
+            isinstance(font, ImageFont.FreeTypeFont) and not self.metrics.shaped
+        )
+        self._glyphs: dict[tuple[str, str], tuple[Any, tuple[int, int]]] = {}
+
+    def glyph(self, char: str, mode: str = "L"):
+        """Mask and (x, y) offset of ``char`` drawn with its origin at (0, 0)."""
+        key = (char, mode)
+        entry = self._glyphs.get(key)
+        if entry is None:
+            entry = self._glyphs[key] = self.font.getmask2(char, mode, anchor="la")
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._glyphs)
+
+    def draw_text(self, draw, xy: tuple[float, float], text: str, fill) -> None:
+        """Draw ``text`` like ``draw.text(xy, text, fill=fill, font=font)``."""
+        if not self.supported:
+            draw.text(xy, text, fill=fill, font=self.font)
+            return
+
+        ink = draw._getink(fill)[0]
+        # Like FreeType's layout: pen advances in 1/64 px and rounds half up per glyph
+        x, y = int(xy[0]), int(xy[1])
+        pen = xy[0] - x
+        previous = None
+        for char in text:
+            pen += self.metrics.kerning(previous, char)
+            origin = x + math.floor(pen + 0.5)
+            mask, offset = self.glyph(char, draw.fontmode)
+            if mask.size[0] and mask.size[1]:
+                draw.draw.draw_bitmap((origin + offset[0], y + offset[1]), mask, ink)
+            pen += self.metrics.advance(char)
+            previous = char
+
+
+_atlases: "WeakKeyDictionary[Any, GlyphAtlas]" = WeakKeyDictionary()
+_atlases_lock = Lock()
+
+
+def glyph_atlas(font: Any) -> GlyphAtlas:
+    """Shared GlyphAtlas for a font object, created on first use."""
+    atlas = _atlases.get(font)
+    if atlas is None:
+        with _atlases_lock:
+            atlas = _atlases.get(font)
+            if atlas is None:
+                atlas = _atlases[font] = GlyphAtlas(font)
+    return atlas
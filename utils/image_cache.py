@@ -0,0 +1,180 @@
+"""
+Content-addressed cache of rendered images.
+In-memory LRU bounded by bytes and an optional SQLite backing store.
+"""
+
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from threading import Lock
+
+from .metrics import metrics
+
+
+class RenderedImageCache:
+    """
+    LRU cache of encoded images keyed by a content hash.
+
+    Each entry is the list of images rendered for one key (e.g. the tiles of
+    a table). Keys identify the rendered content (e.g. ``table_cache_key``),
+    so entries never go stale and need no TTL. Memory is bounded by the total
+    size of the cached images. With ``db_path`` set, images are also written
+    to SQLite, which survives restarts and can be shared by several bot
+    processes; a memory miss falls through to disk and promotes the entry. The
+    least recently used entries are pruned once the file exceeds
+    ``max_disk_bytes``.
+
+    Args:
+        max_bytes (int): Total image bytes kept in memory (default: 64 MiB)
+        db_path (str): Optional SQLite file for the backing store
+        max_disk_bytes (int): Total image bytes kept on disk (default: 512 MiB)
+        clock (Callable): Wall-clock time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        db_path: str | None = None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._clock = clock
+        self._lock = Lock()
+        self._entries: OrderedDict[str, list[bytes]] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._puts = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            columns = [
+                row[1] for row in self._db.execute("PRAGMA table_info(rendered_images)")
+            ]
+            if columns and "part" not in columns:
+                # Store written before entries held several images; it is only a cache
+                self._db.execute("DROP TABLE rendered_images")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rendered_images ("
+                "key TEXT NOT NULL, part INTEGER NOT NULL, image BLOB NOT NULL, "
+                "size INTEGER NOT NULL, used_at REAL NOT NULL, PRIMARY KEY (key, part))"
+            )
+            self._prune_disk()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _record(self, tier: str | None) -> None:
+        if tier is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.incr(
+            "image_cache.lookups",
+            result="miss" if tier is None else "hit",
+            tier=tier or "none",
+        )
+        metrics.set_gauge("image_cache.hit_rate", round(self.hit_rate, 4))
+
+    def get(self, key: str) -> list[bytes] | None:
+        with self._lock:
+            images, tier = self._entries.get(key), "memory"
+            if images is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                rows = self._db.execute(
+                    "SELECT image FROM rendered_images WHERE key = ? ORDER BY part",
+                    (key,),
+                ).fetchall()
+                if rows:
+                    images, tier = [bytes(row[0]) for row in rows], "disk"
+                    self._db.execute(
+                        "UPDATE rendered_images SET used_at = ? WHERE key = ?",
+                        (self._clock(), key),
+                    )
+                    self._db.commit()
+                    self._store_memory(key, images)
+            self._record(tier if images is not None else None)
+            return list(images) if images is not None else None
+
+    def put(self, key: str, images: list[bytes]) -> None:
+        if not images or not all(images):
+            return
+        images = list(images)
+        with self._lock:
+            self._store_memory(key, images)
+            if self._db is not None:
+                now = self._clock()
+                self._db.execute("DELETE FROM rendered_images WHERE key = ?", (key,))
+                self._db.executemany(
+                    "INSERT INTO rendered_images VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (key, part, image, len(image), now)
+                        for part, image in enumerate(images)
+                    ],
+                )
+                self._db.commit()
+                self._puts += 1
+                if self._puts % 64 == 0:
+                    self._prune_disk()
+
+    def _store_memory(self, key: str, images: list[bytes]) -> None:
+        size = sum(len(image) for image in images)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= sum(len(image) for image in previous)
+        self._entries[key] = images
+        self._size += size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= sum(len(image) for image in evicted)
+        metrics.set_gauge("image_cache.bytes", self._size)
+
+    def _prune_disk(self) -> None:
+        """Drop the least recently used rows once the store exceeds max_disk_bytes."""
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM rendered_images"
+        ).fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT key, SUM(size) FROM rendered_images "
+            "GROUP BY key ORDER BY MAX(used_at)"
+        ).fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM rendered_images WHERE key = ?", stale)
+        self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM rendered_images")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
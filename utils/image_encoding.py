@@ -0,0 +1,64 @@
+"""
+Image encoding for generated images (PNG or lossless WebP).
+"""
+
+import io
+
+from PIL import Image
+
+IMAGE_FORMATS = ("png", "webp")
+
+
+def encode_image(
+    image: Image.Image,
+    image_format: str = "png",
+    palette: bool = True,
+    greyscale: bool = False,
+    compress_level: int = 6,
+    webp_method: int = 4,
+    dpi: tuple[int, int] | None = None,
+) -> bytes:
+    """
+    Encode an RGB image losslessly as PNG or WebP.
+
+    With ``palette`` a PNG is stored with one byte per pixel: as 8-bit
+    greyscale when the caller knows every colour is a grey (exact, and far
+    cheaper than quantizing), otherwise as a 256-colour palette image. PNG
+    uses zlib ``compress_level`` (0-9); WebP ``webp_method`` (0-6) trades
+    encode time for size the same way, and lossless WebP picks a palette by
+    itself when the image has few colours.
+
+    Args:
+        image (Image.Image): RGB image
+        image_format (str): "png" or "webp" (default: "png")
+        palette (bool): Reduce to 8 bits per pixel (default: True)
+        greyscale (bool): Every colour in the image has r == g == b
+        compress_level (int): PNG zlib level (default: 6)
+        webp_method (int): WebP compression effort (default: 4)
+        dpi (tuple): Optional resolution stored in PNG metadata
+
+    Returns:
+        bytes: Encoded image
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(
+            f"Unsupported image format: {image_format}. Supported: {', '.join(IMAGE_FORMATS)}"
+        )
+    buffer = io.BytesIO()
+    if image_format == "webp":
+        image.save(buffer, format="WEBP", lossless=True, method=webp_method)
+        return buffer.getvalue()
+
+    if palette and image.mode == "RGB":
+        image = (
+            image.convert("L")
+            if greyscale
+            else image.quantize(
+                colors=256,
+                method=Image.Quantize.FASTOCTREE,
+                dither=Image.Dither.NONE,
+            )
+        )
+    options = {"dpi": dpi} if dpi else {}
+    image.save(buffer, format="PNG", compress_level=compress_level, **options)
+    return buffer.getvalue()
@@ -0,0 +1,61 @@
+"""
+Line break opportunities inside whitespace-free text.
+A compact subset of the Unicode line breaking algorithm (UAX #14) for CJK.
+"""
+
+import unicodedata
+
+# Closing punctuation, small kana, iteration and prolonged sound marks,
+# inseparables and postfixes: never at the start of a line (UAX #14 CL, CP,
+# EX, IS, NS, IN and PO, kinsoku "gyoto")
+NO_LINE_START = frozenset(
+    "、。，．,.:;!?)]}）］｝〕〉》」』】〙〗〟’”｠»"
+    "！？‼⁇⁈⁉：；・･｡､｣"
+    "ヽヾゝゞ々〻ー‐゠–〜～…‥"
+    "ぁぃぅぇぉっゃゅょゎゕゖァィゥェォッャュョヮヵヶ"
+    "ㇰㇱㇲㇳㇴㇵㇶㇷㇸㇹㇺㇻㇼㇽㇾㇿ"
+    "%％‰°℃¢￠"
+)
+# Opening punctuation and prefixes: never at the end of a line (UAX #14 OP
+# and PR, kinsoku "gyomatsu")
+NO_LINE_END = frozenset("([{（［｛〔〈《「『【〘〖〝‘“｟«｢$＄¥￥£￡€#＃")
+
+
+def _is_ideographic(char: str) -> bool:
+    """Wide characters (CJK ideographs, kana, Hangul, fullwidth forms) break like UAX #14 ID."""
+    return unicodedata.east_asian_width(char) in ("W", "F")
+
+
+def _attaches_to_previous(char: str) -> bool:
+    """Combining marks, joiners and variation selectors stay with their base (UAX #14 CM, ZWJ)."""
+    return bool(unicodedata.combining(char)) or unicodedata.category(char) in (
+        "Mn",
+        "Me",
+        "Cf",
+    )
+
+
+def can_break(before: str, after: str) -> bool:
+    """Whether a line may end between ``before`` and ``after``."""
+    if after in NO_LINE_START or before in NO_LINE_END:
+        return False
+    if _attaches_to_previous(after) or before == "‍":
+        return False
+    return _is_ideographic(before) or _is_ideographic(after)
+
+
+def break_opportunities(text: str) -> list[int]:
+    """
+    Indices ``i`` where ``text`` may be broken before ``text[i]``.
+
+    Text without spaces may still break next to an ideograph, except where
+    that would start a line with closing punctuation or end one with an opening
+    bracket. Runs of Latin letters and digits never break.
+
+    Args:
+        text (str): A whitespace-free word
+
+    Returns:
+        list[int]: Increasing break positions, excluding 0 and ``len(text)``
+    """
+    return [i for i in range(1, len(text)) if can_break(text[i - 1], text[i])]
@@ -0,0 +1,189 @@
+"""
+Hedged LLM requests to cut tail latency.
+Fires a backup request when the primary is slower than a latency percentile, within a budget.
+"""
+
+import asyncio
+import dataclasses
+import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any
+
+from .metrics import metrics
+
+
+@dataclass
+class HedgingPolicy:
+    """Opt-in hedging settings attached to an LLMConfig."""
+
+    percentile: float = 0.95  # Hedge once the primary is slower than this percentile
+    min_delay: float = 1.0
+    max_delay: float = 30.0
+    initial_delay: float = 8.0  # Used until enough latency samples are collected
+    min_samples: int = 20
+    budget: float = 0.1  # Max fraction of recent requests that may be hedged
+    # Optional LLMConfig supplying client/model/provider for the hedge
+    fallback: Any = None
+
+    @classmethod
+    def from_env(cls, fallback: Any = None) -> "HedgingPolicy":
+        """Create a policy from LLM_HEDGE_* environment variables."""
+        return cls(
+            percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", 0.95)),
+            min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", 1.0)),
+            max_delay=float(os.getenv("LLM_HEDGE_MAX_DELAY", 30.0)),
+            initial_delay=float(os.getenv("LLM_HEDGE_INITIAL_DELAY", 8.0)),
+            budget=float(os.getenv("LLM_HEDGE_BUDGET", 0.1)),
+            fallback=fallback,
+        )
+
+
+class LatencyTracker:
+    """Sliding window of primary call latencies for percentile estimates."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        """Nearest-rank percentile (0 < p <= 1), or None without samples."""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Caps the fraction of recent requests that were hedged."""
+
+    def __init__(self, window: int = 200):
+        self._decisions: deque[bool] = deque(maxlen=window)
+        self._lock = Lock()
+
+    def try_acquire(self, fraction: float) -> bool:
+        """Record one hedge decision, returning True if a hedge is allowed."""
+        with self._lock:
+            hedged = sum(self._decisions)
+            allowed = (hedged + 1) / (len(self._decisions) + 1) <= fraction
+            self._decisions.append(allowed)
+            return allowed
+
+    def record_unhedged(self) -> None:
+        with self._lock:
+            self._decisions.append(False)
+
+
+class LLMHedger:
+    """
+    Runs a primary request and, if it is slow, a backup; the first success wins.
+
+    The hedge delay is the configured percentile of recent primary latencies for
+    the provider/model (clamped to [min_delay, max_delay]), so only the slow tail
+    gets a second request. The loser is cancelled.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = Lock()
+        self._trackers: dict[tuple[str, str], LatencyTracker] = {}
+        self.budget = HedgeBudget()
+
+    def tracker(self, provider: str, model: str) -> LatencyTracker:
+        with self._lock:
+            key = (provider, model)
+            if key not in self._trackers:
+                self._trackers[key] = LatencyTracker()
+            return self._trackers[key]
+
+    def hedge_delay(self, policy: HedgingPolicy, tracker: LatencyTracker) -> float:
+        if len(tracker) < policy.min_samples:
+            return policy.initial_delay
+        observed = tracker.percentile(policy.percentile)
+        return min(policy.max_delay, max(policy.min_delay, observed))
+
+    @staticmethod
+    def hedge_config(config: Any, policy: HedgingPolicy) -> Any:
+        """Config for the backup request: same prompt settings, fallback target if any."""
+        hedge = dataclasses.replace(config, hedging=None)
+        if policy.fallback is not None:
+            hedge = dataclasses.replace(
+                hedge,
+                client=policy.fallback.client,
+                model=policy.fallback.model,
+                provider=policy.fallback.provider,
+            )
+        return hedge
+
+    async def call(self, config: Any, run: Callable[[Any], Awaitable[str]]) -> str:
+        """
+        Execute ``run(config)`` with hedging according to ``config.hedging``.
+
+        Args:
+            config: LLMConfig with a HedgingPolicy in ``hedging``
+            run: Coroutine factory performing a (resilient) call for a config
+        """
+        policy = config.hedging
+        labels = {"provider": config.provider, "model": config.model}
+        tracker = self.tracker(config.provider, config.model)
+        delay = self.hedge_delay(policy, tracker)
+
+        started = self._clock()
+        primary = asyncio.ensure_future(run(config))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self.budget.try_acquire(policy.budget):
+                if not done:
+                    metrics.incr("llm.hedge_skipped_budget", **labels)
+                else:
+                    self.budget.record_unhedged()
+                result = await primary
+                tracker.record(self._clock() - started)
+                return result
+
+            hedge_config = self.hedge_config(config, policy)
+            print(
+                f"🏇 [LLMHedger] {config.provider}/{config.model} slower than {delay:.2f}s, hedging with {hedge_config.provider}/{hedge_config.model}"
+            )
+            metrics.incr("llm.hedges", **labels)
+            hedge = asyncio.ensure_future(run(hedge_config))
+            tasks.add(hedge)
+
+            pending = set(tasks)
+            first_error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        winner = "primary" if task is primary else "hedge"
+                        metrics.incr("llm.hedge_wins", winner=winner, **labels)
+                        if task is primary:
+                            tracker.record(self._clock() - started)
+                        return task.result()
+                    if first_error is None or task is primary:
+                        first_error = task.exception()
+            raise first_error
+        finally:
+            if not primary.done():
+                # Beaten by the hedge or cancelled: the elapsed time is a lower
+                # bound on its latency, which keeps the slow tail in the percentile
+                tracker.record(self._clock() - started)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
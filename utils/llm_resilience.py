@@ -0,0 +1,302 @@
+"""
+Resilience layer for LLM provider calls.
+Adds per-call deadlines, retries with jittered backoff and a circuit breaker per provider/model.
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from .concurrency_limiter import AdaptiveConcurrencyLimiter
+
+# HTTP status codes that indicate a transient upstream problem
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a provider/model circuit is open and calls are short-circuited."""
+
+
+def error_status_code(error: Exception) -> int | None:
+    """Extract an HTTP status code from provider exceptions, if any."""
+    for attr in ("code", "status_code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable_llm_error(error: Exception) -> bool:
+    """Return True for timeouts, network failures and 408/429/5xx responses."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = error_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # Transport-level errors from httpx/aiohttp have no status code
+    return isinstance(error, OSError) or type(error).__name__ in {
+        "ConnectError",
+        "ReadTimeout",
+        "RemoteProtocolError",
+        "ClientConnectionError",
+        "ServerDisconnectedError",
+    }
+
+
+@dataclass
+class RetryPolicy:
+    """Retry and deadline settings for a single LLM request."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    attempt_timeout: float | None = 60.0  # Seconds per attempt
+    deadline: float | None = 120.0  # Seconds for the whole call, retries included
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the given retry number (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Classic closed/open/half-open circuit breaker.
+
+    Opens after ``failure_threshold`` consecutive failures, rejects calls for
+    ``recovery_timeout`` seconds, then lets a single trial call through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and self._clock() - self._opened_at >= self.recovery_timeout
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed, reserving the half-open trial slot."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._clock() - self._opened_at < self.recovery_timeout:
+                return False
+            if self._trial_in_flight:
+                return False
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def release(self) -> None:
+        """Give back a half-open trial slot without counting a result (e.g. cancellation)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LLMResilience:
+    """
+    Wraps provider calls with deadlines, retries and per provider/model circuit breakers.
+
+    Args:
+        retry_policy (RetryPolicy): Default retry and deadline settings
+        failure_threshold (int): Consecutive failures before a circuit opens (default: 5)
+        recovery_timeout (float): Seconds an open circuit waits before a trial call (default: 30)
+        clock (Callable): Monotonic time source, overridable for tests
+        sleep (Callable): Async sleep function, overridable for tests
+    """
+
+    def __init__(
+        self,
+        retry_policy: RetryPolicy | None = None,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = Lock()
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+    @classmethod
+    def from_env(cls) -> "LLMResilience":
+        """Create a resilience layer configured from LLM_* environment variables."""
+        return cls(
+            retry_policy=RetryPolicy(
+                max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", 3)),
+                base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", 0.5)),
+                max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", 8.0)),
+                attempt_timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT", 60)),
+                deadline=float(os.getenv("LLM_DEADLINE", 120)),
+            ),
+            failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", 5)),
+            recovery_timeout=float(os.getenv("LLM_CIRCUIT_RECOVERY_TIMEOUT", 30)),
+        )
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        """Get (or create) the circuit breaker for a provider/model pair."""
+        key = (provider, model)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(
+                    self.failure_threshold, self.recovery_timeout, self._clock
+                )
+            return breaker
+
+    async def call(
+        self,
+        provider: str,
+        model: str,
+        func: Callable[[], Awaitable[str]],
+        timeout: float | None = None,
+        limiter: "AdaptiveConcurrencyLimiter | None" = None,
+    ) -> str:
+        """
+        Run ``func`` with retries, deadlines and the provider/model circuit breaker.
+
+        Args:
+            provider: Provider name, used for the breaker key and metrics
+            model: Model name, used for the breaker key and metrics
+            func: Zero-argument coroutine factory performing one attempt
+            timeout: Per-attempt timeout overriding the policy default
+            limiter: Adaptive concurrency limiter each attempt takes a slot from;
+                time spent queued counts toward the deadline, not the attempt timeout
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            TimeoutError: If the overall deadline is exceeded
+            The last provider error once retries are exhausted or it is not retryable
+        """
+        policy = self.retry_policy
+        attempt_timeout = timeout if timeout is not None else policy.attempt_timeout
+        deadline = (
+            self._clock() + policy.deadline if policy.deadline is not None else None
+        )
+        breaker = self.breaker(provider, model)
+        labels = {"provider": provider, "model": model}
+
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                metrics.incr("llm.calls", outcome="circuit_open", **labels)
+                raise CircuitOpenError(
+                    f"Circuit open for {provider}/{model}, retry in {breaker.recovery_timeout:.0f}s"
+                )
+
+            slot = None
+            if limiter is not None:
+                try:
+                    async with asyncio.timeout(
+                        deadline - self._clock() if deadline is not None else None
+                    ):
+                        slot = await limiter.acquire()
+                except TimeoutError:
+                    # Waiting for a slot says nothing about upstream health
+                    breaker.release()
+                    metrics.incr("llm.calls", outcome="queue_timeout", **labels)
+                    raise TimeoutError(
+                        f"Deadline exceeded waiting for a {provider}/{model} slot"
+                    ) from None
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+
+            limit = attempt_timeout
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                limit = remaining if limit is None else min(limit, remaining)
+
+            started = self._clock()
+            try:
+                if limit is not None and limit <= 0:
+                    raise TimeoutError(f"Deadline exceeded for {provider}/{model}")
+                async with asyncio.timeout(limit):
+                    result = await func()
+            except asyncio.CancelledError:
+                breaker.release()
+                if slot is not None:
+                    limiter.release(slot, None, completed=False)
+                raise
+            except Exception as e:
+                if slot is not None:
+                    limiter.release(slot, e)
+                retryable = is_retryable_llm_error(e)
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    # Caller errors (bad request, auth) say nothing about upstream health
+                    breaker.release()
+                outcome = "timeout" if isinstance(e, TimeoutError) else "error"
+                metrics.incr("llm.calls", outcome=outcome, **labels)
+
+                attempt += 1
+                if not retryable or attempt >= policy.max_attempts:
+                    raise
+                delay = policy.backoff_delay(attempt - 1)
+                if deadline is not None and self._clock() + delay >= deadline:
+                    raise
+                metrics.incr("llm.retries", **labels)
+                print(
+                    f"🔁 [LLMResilience] {provider}/{model} attempt {attempt} failed ({type(e).__name__}: {e}), retrying in {delay:.2f}s"
+                )
+                await self._sleep(delay)
+                continue
+
+            if slot is not None:
+                limiter.release(slot)
+            breaker.record_success()
+            metrics.incr("llm.calls", outcome="success", **labels)
+            metrics.observe("llm.latency_seconds", self._clock() - started, **labels)
+            return result
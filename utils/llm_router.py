@@ -3,22 +3,67 @@ LLM Router utility for supporting multiple AI providers and use cases.
 Supports chat, router, and thinker models with unified interface.
 """
 
+import dataclasses
+import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from typing import Any
 
 from google.genai import types
 
+from .client_pool import ClientPool
+from .concurrency_limiter import ConcurrencyLimiters
+from .context_cache import GeminiContextCache
+from .generation_profiles import GenerationProfile
+from .llm_hedging import HedgingPolicy, LLMHedger
+from .llm_resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMResilience,
+    error_status_code,
+    is_retryable_llm_error,
+)
+from .metrics import metrics
+from .openai_compatible import call_openai_compatible
+from .prompt_layout import format_context_preamble
+from .provider_router import ProviderRouter
+from .response_cache import ResponseCache
+from .usage_tracker import (
+    BUDGET_DOWNGRADE,
+    BUDGET_REFUSE,
+    BudgetExceededError,
+    get_usage_tracker,
+    record_usage,
+    usage_from_gemini,
+)
+
 
 @dataclass
 class LLMConfig:
     """Configuration for an LLM instance"""
 
-    client: Any
+    client: Any  # Provider client, or a ClientPool rotating several API keys
     model: str
     temperature: float = 1.0
     provider: str = "gemini"
     system_prompt: str = ""
     tools: list = field(default_factory=list)
+    timeout: float | None = None  # Per-attempt timeout override in seconds
+    hedging: HedgingPolicy | None = None  # Opt-in hedged requests for tail latency
+    # Ordered fallback targets; only client, model, provider and timeout are used
+    fallbacks: list["LLMConfig"] = field(default_factory=list)
+    # Per-request context sent as a user-turn preamble so the system prompt stays stable
+    dynamic_context: str = ""
+    context_cache: GeminiContextCache | None = None  # Opt-in Gemini context caching
+    # Thinking budget, output length and sampling; None keeps the model defaults
+    generation_profile: GenerationProfile | None = None
+
+
+def _user_message(prompt: str, config: LLMConfig) -> str | list[str]:
+    """User turn with the per-request context as a leading preamble part"""
+    if not config.dynamic_context:
+        return prompt
+    return [format_context_preamble(config.dynamic_context), prompt]
 
 
 async def _call_gemini(prompt: str, config: LLMConfig, history: list = None) -> str:
@@ -26,25 +71,160 @@ async def _call_gemini(prompt: str, config: LLMConfig, history: list = None) ->
     if not config.client:
         raise ValueError("Gemini client is required")
 
+    # The system instruction only holds the static prompt so the request prefix
+    # (system instruction, tools, history) stays byte-identical across requests
+    message = _user_message(prompt, config)
+
+    cache_name = None
+    if config.context_cache is not None:
+        cache_name = await config.context_cache.get_cache_name(
+            config.client, config.model, config.system_prompt, config.tools
+        )
+
+    profile_kwargs = (
+        config.generation_profile.gemini_config_kwargs(config.model)
+        if config.generation_profile is not None
+        else {}
+    )
+
+    if cache_name:
+        # System prompt and tools live in the cached content
+        chat = config.client.aio.chats.create(
+            model=config.model,
+            config=types.GenerateContentConfig(
+                cached_content=cache_name,
+                temperature=float(config.temperature),
+                **profile_kwargs,
+            ),
+            history=history or [],
+        )
+        try:
+            response = await chat.send_message(message)
+            record_usage("gemini", config.model, usage_from_gemini(response))
+            return response.text
+        except Exception as e:
+            if error_status_code(e) not in (400, 403, 404):
+                raise
+            print(
+                f"⚠️ [call_llm] Cached content {cache_name} rejected, retrying uncached: {e}"
+            )
+            config.context_cache.invalidate(cache_name)
+
     chat = config.client.aio.chats.create(
         model=config.model,
         config=types.GenerateContentConfig(
             system_instruction=config.system_prompt,
             temperature=float(config.temperature),
             tools=config.tools if config.tools else None,
+            **profile_kwargs,
         ),
         history=history or [],
     )
 
-    response = await chat.send_message(prompt)
+    response = await chat.send_message(message)
+    record_usage("gemini", config.model, usage_from_gemini(response))
     return response.text
 
 
 # Provider function mapping
 PROVIDERS = {
     "gemini": _call_gemini,
+    "openai_compatible": call_openai_compatible,
 }
 
+# Deadlines, retries and circuit breakers applied around every provider call
+_resilience = LLMResilience()
+# Latency history and hedge budget shared by all hedged configs
+_hedger = LLMHedger()
+# Health-based ordering of a config and its fallbacks
+_provider_router = ProviderRouter(
+    is_circuit_open=lambda provider, model: (
+        _resilience.breaker(provider, model).state == CircuitBreaker.OPEN
+    )
+)
+
+
+# Opt-in exact-match response cache, installed with configure_response_cache
+_response_cache: ResponseCache | None = None
+
+# Opt-in AIMD concurrency limits per provider/model, installed with configure_llm_concurrency
+_concurrency: ConcurrencyLimiters | None = None
+
+
+def register_provider(name: str, provider_fn: Callable) -> None:
+    """Register a provider coroutine ``provider_fn(prompt, config, history) -> str``."""
+    PROVIDERS[name] = provider_fn
+
+
+def configure_llm_resilience(resilience: LLMResilience) -> None:
+    """Replace the resilience layer used by call_llm (e.g. one built from env)."""
+    global _resilience
+    _resilience = resilience
+
+
+def get_llm_resilience() -> LLMResilience:
+    """Get the resilience layer used by call_llm"""
+    return _resilience
+
+
+def configure_llm_concurrency(limiters: ConcurrencyLimiters | None) -> None:
+    """Install (or remove with None) the adaptive concurrency limiters used by call_llm"""
+    global _concurrency
+    _concurrency = limiters
+
+
+def get_llm_concurrency() -> ConcurrencyLimiters | None:
+    """Get the adaptive concurrency limiters used by call_llm, if any"""
+    return _concurrency
+
+
+def configure_response_cache(cache: ResponseCache | None) -> None:
+    """Install (or remove with None) the response cache used by call_llm"""
+    global _response_cache
+    _response_cache = cache
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Get the response cache used by call_llm, if any"""
+    return _response_cache
+
+
+def get_provider_router() -> ProviderRouter:
+    """Get the health tracker that orders fallback candidates"""
+    return _provider_router
+
+
+async def _dispatch(prompt: str, config: LLMConfig, history: list | None) -> str:
+    """Call the config's provider, taking a concrete client from its key pool if any."""
+    provider_fn = PROVIDERS[config.provider]
+    if isinstance(config.client, ClientPool):
+        return await config.client.call(
+            lambda client: provider_fn(
+                prompt, dataclasses.replace(config, client=client), history
+            )
+        )
+    return await provider_fn(prompt, config, history)
+
+
+def _fallback_candidates(config: LLMConfig) -> list[LLMConfig]:
+    """The primary config plus each fallback retargeted with the primary's prompt settings."""
+    candidates = [config]
+    for target in config.fallbacks:
+        candidates.append(
+            dataclasses.replace(
+                config,
+                client=target.client,
+                model=target.model,
+                provider=target.provider,
+                timeout=target.timeout
+                if target.timeout is not None
+                else config.timeout,
+                hedging=None,
+                fallbacks=[],
+            )
+        )
+    return candidates
+
 
 async def call_llm(
     prompt: str,
@@ -77,16 +257,91 @@ async def call_llm(
             provider=provider,
             system_prompt=kwargs.get("system_prompt", ""),
             tools=kwargs.get("tools", []),
+            timeout=kwargs.get("timeout"),
+            hedging=kwargs.get("hedging"),
+            fallbacks=kwargs.get("fallbacks") or [],
+            dynamic_context=kwargs.get("dynamic_context", ""),
+            context_cache=kwargs.get("context_cache"),
+            generation_profile=kwargs.get("generation_profile"),
         )
         history = kwargs.get("history", history)
 
-    if config.provider not in PROVIDERS:
-        raise ValueError(
-            f"Unsupported provider: {config.provider}. "
-            f"Supported providers: {list(PROVIDERS.keys())}"
+    cache = _response_cache
+    cache_key = cache.key_for(prompt, config, history) if cache is not None else None
+    if cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(
+                f"♻️ [call_llm] Response cache hit for {config.provider}/{config.model}"
+            )
+            return cached
+
+    tracker = get_usage_tracker()
+    if tracker is not None:
+        decision, reason = tracker.check_budget()
+        if decision == BUDGET_REFUSE:
+            metrics.incr("llm.budget", action="refused")
+            raise BudgetExceededError(f"Usage budget exceeded: {reason}")
+        downgrade_model = tracker.budget.downgrade_model
+        if decision == BUDGET_DOWNGRADE and config.model != downgrade_model:
+            print(
+                f"📉 [call_llm] Budget exceeded ({reason}), downgrading {config.model} to {downgrade_model}"
+            )
+            metrics.incr("llm.budget", action="downgraded")
+            config = dataclasses.replace(config, model=downgrade_model, hedging=None)
+
+    candidates = _fallback_candidates(config)
+    for candidate in candidates:
+        if candidate.provider not in PROVIDERS:
+            raise ValueError(
+                f"Unsupported provider: {candidate.provider}. "
+                f"Supported providers: {list(PROVIDERS.keys())}"
+            )
+
+    async def run(call_config: LLMConfig) -> str:
+        return await _resilience.call(
+            call_config.provider,
+            call_config.model,
+            lambda: _dispatch(prompt, call_config, history),
+            timeout=call_config.timeout,
+            limiter=_concurrency.limiter(call_config.provider, call_config.model)
+            if _concurrency is not None
+            else None,
+        )
+
+    if len(candidates) > 1:
+        candidates = _provider_router.rank(candidates)
+
+    last_error = None
+    for index, candidate in enumerate(candidates):
+        if index > 0:
+            metrics.incr("llm.fallbacks", provider=candidate.provider)
+            print(
+                f"↪️ [call_llm] Falling back to {candidate.provider}/{candidate.model} after: {last_error}"
+            )
+        started = time.monotonic()
+        try:
+            if candidate.hedging is not None:
+                result = await _hedger.call(candidate, run)
+            else:
+                result = await run(candidate)
+        except Exception as e:
+            # Only upstream trouble counts against a provider's health or moves on
+            # to the next target; request errors and bugs would fail there too
+            upstream = isinstance(e, CircuitOpenError) or is_retryable_llm_error(e)
+            _provider_router.record(candidate.provider, candidate.model, None, upstream)
+            if not upstream:
+                raise
+            last_error = e
+            continue
+        _provider_router.record(
+            candidate.provider, candidate.model, time.monotonic() - started, False
         )
+        if cache_key is not None:
+            cache.put(cache_key, result)
+        return result
 
-    return await PROVIDERS[config.provider](prompt, config, history)
+    raise last_error
 
 
 def get_supported_providers() -> list[str]:
@@ -0,0 +1,110 @@
+"""
+Lightweight in-process metrics registry.
+Provides thread-safe counters, gauges and summaries that can be exported as a snapshot.
+"""
+
+from threading import Lock
+from typing import Any
+
+
+def _metric_key(name: str, labels: dict[str, Any]) -> str:
+    """Build a Prometheus-style key such as ``name{channel=1,kind=text}``."""
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{label_str}}}"
+
+
+class MetricsRegistry:
+    """Thread-safe metrics store shared by the whole process."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._summaries: dict[str, dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        """Increase a counter."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to an absolute value."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record one observation in a count/sum/min/max summary."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self._summaries[key] = {
+                    "count": 1,
+                    "sum": value,
+                    "min": value,
+                    "max": value,
+                }
+            else:
+                summary["count"] += 1
+                summary["sum"] += value
+                summary["min"] = min(summary["min"], value)
+                summary["max"] = max(summary["max"], value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        """Get the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0)
+
+    def get_gauge(self, name: str, **labels) -> float | None:
+        """Get the current value of a gauge (None if never set)."""
+        with self._lock:
+            return self._gauges.get(_metric_key(name, labels))
+
+    def get_summary(self, name: str, **labels) -> dict[str, float] | None:
+        """Get a copy of a summary (None if nothing was observed)."""
+        with self._lock:
+            summary = self._summaries.get(_metric_key(name, labels))
+            return dict(summary) if summary else None
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return a copy of all metrics, suitable for logging or a status command."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {k: dict(v) for k, v in self._summaries.items()},
+            }
+
+    def format_snapshot(self, prefix: str = "") -> list[str]:
+        """Render metrics as sorted ``key value`` lines, optionally filtered by prefix."""
+        snapshot = self.snapshot()
+        lines = []
+        for key, value in sorted(snapshot["counters"].items()):
+            if key.startswith(prefix):
+                lines.append(f"{key} {value:g}")
+        for key, value in sorted(snapshot["gauges"].items()):
+            if key.startswith(prefix):
+                lines.append(f"{key} {value:g}")
+        for key, summary in sorted(snapshot["summaries"].items()):
+            if key.startswith(prefix):
+                avg = summary["sum"] / summary["count"]
+                lines.append(
+                    f"{key} count={summary['count']:g} avg={avg:.3f} "
+                    f"min={summary['min']:.3f} max={summary['max']:.3f}"
+                )
+        return lines
+
+    def reset(self) -> None:
+        """Clear all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+# Global singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,141 @@
+"""
+OpenAI-compatible chat completions provider.
+Works with any server exposing /chat/completions (OpenAI, vLLM, Ollama, llama.cpp, LM Studio).
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any
+from weakref import WeakSet
+
+import aiohttp
+
+from .prompt_layout import message_with_context
+from .usage_tracker import record_usage, usage_from_openai
+
+# Every session opened by a client, so shutdown can close them all
+_open_sessions: "WeakSet[aiohttp.ClientSession]" = WeakSet()
+
+
+@dataclass
+class OpenAICompatibleClient:
+    """
+    Connection settings for an OpenAI-compatible HTTP endpoint.
+
+    Keeps one ``aiohttp.ClientSession`` per event loop so keep-alive connections
+    are reused across calls; ``close_openai_sessions`` closes it on shutdown.
+    """
+
+    base_url: str  # e.g. "http://localhost:11434/v1"
+    api_key: str | None = None
+    extra_headers: dict[str, str] = field(default_factory=dict)
+    _session: aiohttp.ClientSession | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _session_loop: asyncio.AbstractEventLoop | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def session(self) -> aiohttp.ClientSession:
+        """Shared session, reopened if it was closed or belongs to another loop."""
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            self._session = aiohttp.ClientSession()
+            self._session_loop = loop
+            _open_sessions.add(self._session)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+
+async def close_openai_sessions() -> None:
+    """Close every open OpenAI-compatible session; call before the loop stops."""
+    sessions = [session for session in _open_sessions if not session.closed]
+    for session in sessions:
+        await session.close()
+    if sessions:
+        print(f"🔌 [openai_compatible] Closed {len(sessions)} HTTP session(s)")
+
+
+class OpenAICompatibleError(Exception):
+    """HTTP error returned by an OpenAI-compatible server."""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"HTTP {status_code}: {body[:200]}")
+        self.status_code = status_code
+        self.body = body
+
+
+def content_role_and_text(content: Any) -> tuple[str, str]:
+    """Read role and text from a google-genai Content or a plain dict."""
+    if isinstance(content, dict):
+        role = content.get("role", "user")
+        text = content.get("content") or content.get("text") or ""
+        return role, text
+    parts = getattr(content, "parts", None) or []
+    text = "".join(getattr(part, "text", None) or "" for part in parts)
+    return getattr(content, "role", "user"), text
+
+
+def build_chat_messages(
+    prompt: str, system_prompt: str = "", history: list | None = None
+) -> list[dict[str, str]]:
+    """Convert a system prompt, Gemini-style history and prompt into chat messages."""
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    for content in history or []:
+        role, text = content_role_and_text(content)
+        messages.append(
+            {
+                "role": "assistant" if role in ("model", "assistant") else "user",
+                "content": text,
+            }
+        )
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+async def call_openai_compatible(prompt: str, config, history: list = None) -> str:
+    """Call an OpenAI-compatible /chat/completions endpoint.
+
+    Gemini-only options such as Google Search tools are ignored.
+    """
+    client = config.client
+    if not isinstance(client, OpenAICompatibleClient):
+        raise ValueError("OpenAICompatibleClient is required for openai_compatible")
+
+    headers = {"Content-Type": "application/json", **client.extra_headers}
+    if client.api_key:
+        headers["Authorization"] = f"Bearer {client.api_key}"
+    payload = {
+        "model": config.model,
+        "messages": build_chat_messages(
+            message_with_context(prompt, config.dynamic_context),
+            config.system_prompt,
+            history,
+        ),
+        "temperature": float(config.temperature),
+    }
+    profile = getattr(config, "generation_profile", None)
+    if profile is not None:
+        payload.update(profile.openai_payload())
+
+    url = client.base_url.rstrip("/") + "/chat/completions"
+    async with client.session().post(url, json=payload, headers=headers) as response:
+        body = await response.text()
+        if response.status >= 400:
+            raise OpenAICompatibleError(response.status, body)
+
+    data = json.loads(body)
+    record_usage("openai_compatible", config.model, usage_from_openai(data))
+    return data["choices"][0]["message"]["content"] or ""
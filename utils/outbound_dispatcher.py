@@ -0,0 +1,246 @@
+"""
+Rate-limit-aware outbound message dispatcher.
+Serializes sends per channel, keeps chunk order and retries rate-limited sends.
+"""
+
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import discord
+
+from .metrics import metrics
+
+# Discord message limits
+MAX_MESSAGE_CHARS = 2000
+MAX_FILES_PER_MESSAGE = 10
+
+
+@dataclass
+class OutboundFile:
+    """An attachment that can be turned into a fresh ``discord.File`` on every attempt."""
+
+    source: Any  # File path or binary buffer
+    filename: str
+
+    def to_discord_file(self) -> discord.File:
+        if hasattr(self.source, "seek"):
+            self.source.seek(0)
+        return discord.File(self.source, filename=self.filename)
+
+
+@dataclass
+class OutboundMessage:
+    """A single message to deliver as part of a reply."""
+
+    content: str | None = None
+    files: list[OutboundFile] = field(default_factory=list)
+    reply_to: Any = None  # discord.Message to reply to, if any
+    view: Any = None
+
+
+def is_retryable_send_error(error: Exception) -> bool:
+    """
+    Return True only for rate limits (429).
+
+    Creating a message is not idempotent: after a 5xx or a network error
+    Discord may already have posted it, so retrying could send it twice.
+    A 429 is rejected before the message is created.
+    """
+    return isinstance(error, discord.HTTPException) and error.status == 429
+
+
+def merge_small_chunks(
+    messages: list[OutboundMessage], max_chars: int = MAX_MESSAGE_CHARS
+) -> list[OutboundMessage]:
+    """
+    Merge adjacent messages whose combined content still fits in one Discord message.
+
+    Only messages without a view are merged, and a message that replies to
+    something is never folded into the previous one, so reply threading and
+    chunk order are preserved. Two messages that both carry files are kept
+    apart because their attachments were already packed to the upload limits.
+    """
+    merged: list[OutboundMessage] = []
+    for message in messages:
+        if merged:
+            previous = merged[-1]
+            combined_len = len(previous.content or "") + len(message.content or "") + 1
+            if (
+                previous.view is None
+                and message.view is None
+                and message.reply_to is None
+                and combined_len <= max_chars
+                and not (previous.files and message.files)
+            ):
+                parts = [p for p in (previous.content, message.content) if p]
+                merged[-1] = OutboundMessage(
+                    content="\n".join(parts) or None,
+                    files=previous.files + message.files,
+                    reply_to=previous.reply_to,
+                )
+                continue
+        merged.append(message)
+    return merged
+
+
+class OutboundDispatcher:
+    """
+    Per-channel send queues with ordered delivery and jittered retries.
+
+    Every reply is enqueued as one job, so chunks of concurrent replies in the
+    same channel never interleave. A worker task per active channel drains its
+    queue and exits after ``idle_timeout`` seconds without work.
+
+    Args:
+        max_retries (int): Retries per message after a rate limit (default: 4)
+        base_delay (float): First backoff delay in seconds (default: 0.5)
+        max_delay (float): Upper bound for a single backoff delay (default: 8.0)
+        idle_timeout (float): Seconds before an idle channel worker stops (default: 60)
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        idle_timeout: float = 60.0,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_timeout = idle_timeout
+        self._queues: dict[int, asyncio.Queue] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @classmethod
+    def from_env(cls) -> "OutboundDispatcher":
+        """Create a dispatcher configured from OUTBOUND_* environment variables."""
+        return cls(
+            max_retries=int(os.getenv("OUTBOUND_MAX_RETRIES", 4)),
+            base_delay=float(os.getenv("OUTBOUND_RETRY_BASE_DELAY", 0.5)),
+            max_delay=float(os.getenv("OUTBOUND_RETRY_MAX_DELAY", 8.0)),
+        )
+
+    async def send(self, channel, messages: list[OutboundMessage]) -> list[Any]:
+        """
+        Enqueue a reply for a channel and wait until every message is delivered.
+
+        Returns:
+            List of sent ``discord.Message`` objects, in order
+
+        Raises:
+            The last send error if a message could not be delivered
+        """
+        messages = merge_small_chunks(messages)
+        if not messages:
+            return []
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queues and workers are bound to the loop that created them
+            self._queues.clear()
+            self._workers.clear()
+            self._loop = loop
+
+        channel_id = channel.id
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = asyncio.Queue()
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = loop.create_task(self._worker(channel_id))
+
+        future = loop.create_future()
+        await queue.put((channel, messages, future, time.monotonic()))
+        metrics.incr("outbound.replies_enqueued")
+        metrics.set_gauge("outbound.queue_depth", queue.qsize(), channel=channel_id)
+        return await future
+
+    async def _worker(self, channel_id: int):
+        queue = self._queues[channel_id]
+        while True:
+            try:
+                job = await asyncio.wait_for(queue.get(), timeout=self.idle_timeout)
+            except TimeoutError:
+                if queue.empty():
+                    self._queues.pop(channel_id, None)
+                    self._workers.pop(channel_id, None)
+                    return
+                continue
+
+            channel, messages, future, enqueued_at = job
+            metrics.observe(
+                "outbound.queue_wait_seconds", time.monotonic() - enqueued_at
+            )
+            metrics.set_gauge("outbound.queue_depth", queue.qsize(), channel=channel_id)
+
+            sent = []
+            try:
+                for message in messages:
+                    sent.append(await self._send_with_retry(channel, message))
+                if not future.done():
+                    future.set_result(sent)
+            except Exception as e:
+                metrics.incr("outbound.replies_failed")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                queue.task_done()
+
+    async def _send_with_retry(self, channel, message: OutboundMessage):
+        attempt = 0
+        while True:
+            kwargs = {}
+            if message.content:
+                kwargs["content"] = message.content
+            if message.files:
+                kwargs["files"] = [f.to_discord_file() for f in message.files]
+            if message.view is not None:
+                kwargs["view"] = message.view
+
+            started = time.monotonic()
+            try:
+                if message.reply_to is not None:
+                    result = await message.reply_to.reply(**kwargs)
+                else:
+                    result = await channel.send(**kwargs)
+                metrics.incr("outbound.messages_sent")
+                metrics.observe("outbound.send_seconds", time.monotonic() - started)
+                return result
+            except Exception as e:
+                if not is_retryable_send_error(e) or attempt >= self.max_retries:
+                    metrics.incr("outbound.messages_failed")
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                attempt += 1
+                metrics.incr("outbound.retries")
+                print(
+                    f"🔁 [OutboundDispatcher] Retry {attempt}/{self.max_retries} for channel {channel.id} in {delay:.2f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with full jitter, honouring Retry-After when present."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        retry_after = headers.get("Retry-After") if hasattr(headers, "get") else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    def queue_depths(self) -> dict[int, int]:
+        """Number of pending replies per channel."""
+        return {cid: q.qsize() for cid, q in self._queues.items()}
+
+
+# Global singleton instance
+outbound_dispatcher = OutboundDispatcher()
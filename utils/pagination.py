@@ -0,0 +1,214 @@
+"""
+Paginated Discord replies backed by a bounded in-memory page cache.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from threading import Lock
+
+import discord
+
+
+class PageCache:
+    """
+    Thread-safe LRU cache of reply pages with a per-entry TTL.
+
+    Each entry may register an ``on_evict`` callback that is invoked (outside the
+    lock) whenever the entry leaves the cache, whether through expiry, LRU
+    pressure or an explicit ``evict`` call.
+
+    Args:
+        max_entries (int): Maximum number of replies kept in memory (default: 256)
+        ttl_seconds (float): Lifetime of an entry after it is stored (default: 900)
+        clock (Callable): Monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 900,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = Lock()
+        # key -> (expires_at, pages, on_evict)
+        self._entries: OrderedDict = OrderedDict()
+
+    def put(
+        self,
+        key: str,
+        pages: list[str],
+        on_evict: Callable[[str], None] | None = None,
+    ) -> None:
+        """Store pages for a reply, evicting expired and least recently used entries."""
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                evicted.append((key, self._entries.pop(key)[2]))
+            evicted.extend(self._pop_expired())
+            while len(self._entries) >= self.max_entries:
+                old_key, (_, _, old_callback) = self._entries.popitem(last=False)
+                evicted.append((old_key, old_callback))
+            self._entries[key] = (
+                self._clock() + self.ttl_seconds,
+                list(pages),
+                on_evict,
+            )
+        self._notify(evicted)
+
+    def get(self, key: str) -> list[str] | None:
+        """Return all pages for a reply, or None if missing or expired."""
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                evicted.append((key, entry[2]))
+                pages = None
+            else:
+                self._entries.move_to_end(key)
+                pages = entry[1]
+        self._notify(evicted)
+        return pages
+
+    def get_page(self, key: str, index: int) -> str | None:
+        """Return a single page, or None if the reply or page is unavailable."""
+        pages = self.get(key)
+        if pages is None or not 0 <= index < len(pages):
+            return None
+        return pages[index]
+
+    def evict(self, key: str) -> bool:
+        """Remove an entry explicitly. Returns True if it was present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._notify([(key, entry[2])])
+        return True
+
+    def purge_expired(self) -> int:
+        """Drop all expired entries. Returns the number of entries removed."""
+        with self._lock:
+            evicted = self._pop_expired()
+        self._notify(evicted)
+        return len(evicted)
+
+    def _pop_expired(self) -> list[tuple]:
+        """Remove expired entries; caller must hold the lock."""
+        now = self._clock()
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        return [(key, self._entries.pop(key)[2]) for key in expired]
+
+    @staticmethod
+    def _notify(evicted: list[tuple]) -> None:
+        for key, callback in evicted:
+            if callback is None:
+                continue
+            try:
+                callback(key)
+            except Exception as e:
+                print(f"⚠️ [PageCache] Eviction callback failed for {key}: {e}")
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class PaginatedReplyView(discord.ui.View):
+    """
+    Previous/Next buttons that swap the message content between cached pages.
+
+    Only the first page is sent up front; later pages are read from the
+    ``PageCache`` when a reader asks for them. Once the cache entry is gone the
+    buttons are removed from the message.
+    """
+
+    def __init__(self, page_cache: PageCache, key: str, page_count: int):
+        super().__init__(timeout=page_cache.ttl_seconds)
+        self.page_cache = page_cache
+        self.key = key
+        self.page_count = page_count
+        self.current_page = 0
+        self.message: discord.Message | None = None
+        self._expired = False
+        self._refresh_buttons()
+
+    def _refresh_buttons(self):
+        self.previous_page.disabled = self.current_page <= 0
+        self.next_page.disabled = self.current_page >= self.page_count - 1
+        self.page_indicator.label = f"{self.current_page + 1}/{self.page_count}"
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        await self._show_page(interaction, self.current_page - 1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_indicator(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        await interaction.response.defer()
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        await self._show_page(interaction, self.current_page + 1)
+
+    async def _show_page(self, interaction: discord.Interaction, index: int):
+        page = self.page_cache.get_page(self.key, index)
+        if page is None:
+            print(f"⌛ [PaginatedReplyView] Pages for {self.key} expired")
+            self._expired = True
+            self.stop()
+            await interaction.response.edit_message(view=None)
+            return
+
+        self.current_page = index
+        self._refresh_buttons()
+        await interaction.response.edit_message(content=page, view=self)
+        print(
+            f"📄 [PaginatedReplyView] Served page {index + 1}/{self.page_count} for {self.key}"
+        )
+
+    def expire(self, key: str | None = None):
+        """Eviction callback: stop listening and strip the buttons from the message."""
+        if self._expired:
+            return
+        self._expired = True
+        self.stop()
+        if self.message is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self._remove_buttons())
+
+    async def _remove_buttons(self):
+        try:
+            await self.message.edit(view=None)
+            print(f"🧹 [PaginatedReplyView] Removed page buttons for {self.key}")
+        except discord.HTTPException as e:
+            print(f"⚠️ [PaginatedReplyView] Could not remove buttons: {e}")
+
+    async def on_timeout(self):
+        # Evicting triggers expire() through the cache callback
+        if not self.page_cache.evict(self.key):
+            self.expire()
@@ -0,0 +1,36 @@
+"""
+Prompt layout helpers keeping the system prompt byte-stable across requests.
+Volatile context (author, participants, time) goes into a preamble of the user turn.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime
+
+CONTEXT_PREAMBLE_HEADER = "[Context]"
+
+
+def round_time(now: datetime, granularity_minutes: int) -> datetime:
+    """Floor a datetime to a multiple of ``granularity_minutes`` within its day."""
+    if granularity_minutes <= 1:
+        return now.replace(second=0, microsecond=0)
+    minutes = now.hour * 60 + now.minute
+    minutes -= minutes % granularity_minutes
+    return now.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+
+
+def format_participants(participants: Iterable[str]) -> str:
+    """Sorted, de-duplicated participant names so set order never leaks into prompts."""
+    names = sorted(set(participants), key=lambda name: (name.casefold(), name))
+    return ", ".join(names) if names else "Unknown"
+
+
+def format_context_preamble(dynamic_context: str) -> str:
+    """Preamble part sent ahead of the user message."""
+    return f"{CONTEXT_PREAMBLE_HEADER}\n{dynamic_context}"
+
+
+def message_with_context(prompt: str, dynamic_context: str) -> str:
+    """Single-string user message with the context preamble, for text-only APIs."""
+    if not dynamic_context:
+        return prompt
+    return f"{format_context_preamble(dynamic_context)}\n\n{prompt}"
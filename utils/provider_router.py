@@ -0,0 +1,124 @@
+"""
+Latency- and error-aware ordering of LLM provider candidates.
+Tracks moving averages per provider/model and demotes targets during an upstream brownout.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any
+
+from .metrics import metrics
+
+
+@dataclass
+class ProviderHealth:
+    """Exponentially weighted latency and error rate for one provider/model."""
+
+    latency_ewma: float | None = None
+    error_ewma: float = 0.0
+    samples: int = 0
+
+    def record(self, alpha: float, latency: float | None, failed: bool) -> None:
+        self.samples += 1
+        self.error_ewma = (
+            alpha * (1.0 if failed else 0.0) + (1 - alpha) * self.error_ewma
+        )
+        if latency is not None and not failed:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = alpha * latency + (1 - alpha) * self.latency_ewma
+
+
+class ProviderRouter:
+    """
+    Orders an LLMConfig and its fallbacks by observed health.
+
+    Candidates in a brownout (error rate above ``brownout_error_rate`` or an open
+    circuit) go last. The rest keep the configured order, except that targets
+    which all have latency samples are reordered among themselves by latency
+    inflated by their error rate, with a bias towards the configured order so
+    the primary is kept unless a fallback is clearly faster. A target that was
+    never called keeps its place: its latency is unknown, not better or worse.
+
+    Args:
+        alpha (float): Smoothing factor for the moving averages (default: 0.2)
+        brownout_error_rate (float): Error rate that marks a target degraded (default: 0.5)
+        order_bias (float): Latency penalty per position in the chain (default: 0.5)
+        is_circuit_open (Callable): Returns True if a provider/model circuit is open
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        brownout_error_rate: float = 0.5,
+        order_bias: float = 0.5,
+        is_circuit_open: Callable[[str, str], bool] | None = None,
+    ):
+        self.alpha = alpha
+        self.brownout_error_rate = brownout_error_rate
+        self.order_bias = order_bias
+        self.is_circuit_open = is_circuit_open or (lambda provider, model: False)
+        self._lock = Lock()
+        self._health: dict[tuple[str, str], ProviderHealth] = {}
+
+    def health(self, provider: str, model: str) -> ProviderHealth:
+        with self._lock:
+            key = (provider, model)
+            if key not in self._health:
+                self._health[key] = ProviderHealth()
+            return self._health[key]
+
+    def record(
+        self, provider: str, model: str, latency: float | None, failed: bool
+    ) -> None:
+        """Feed one call outcome into the moving averages."""
+        health = self.health(provider, model)
+        with self._lock:
+            health.record(self.alpha, latency, failed)
+        labels = {"provider": provider, "model": model}
+        metrics.set_gauge(
+            "llm.provider_error_rate", round(health.error_ewma, 4), **labels
+        )
+        if health.latency_ewma is not None:
+            metrics.set_gauge(
+                "llm.provider_latency_ewma", round(health.latency_ewma, 4), **labels
+            )
+
+    def is_degraded(self, provider: str, model: str) -> bool:
+        health = self.health(provider, model)
+        return health.error_ewma >= self.brownout_error_rate or self.is_circuit_open(
+            provider, model
+        )
+
+    def rank(self, candidates: list[Any]) -> list[Any]:
+        """Return candidate configs ordered from most to least preferred."""
+
+        healthy, degraded = [], []
+        for index, config in enumerate(candidates):
+            if self.is_degraded(config.provider, config.model):
+                degraded.append(config)
+            else:
+                healthy.append((index, config))
+
+        def score(item):
+            index, config = item
+            health = self.health(config.provider, config.model)
+            return (
+                health.latency_ewma
+                * (1 + 4 * health.error_ewma)
+                * (1 + self.order_bias * index),
+                index,
+            )
+
+        # Only targets with latency samples trade places, within the slots they hold
+        slots = [
+            slot
+            for slot, (_, config) in enumerate(healthy)
+            if self.health(config.provider, config.model).latency_ewma is not None
+        ]
+        measured = sorted((healthy[slot] for slot in slots), key=score)
+        for slot, item in zip(slots, measured, strict=True):
+            healthy[slot] = item
+        return [config for _, config in healthy] + degraded
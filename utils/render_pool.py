@@ -0,0 +1,158 @@
+"""
+Executor backends for CPU-bound image rendering.
+Runs render functions inline, in a thread pool or in a process pool, off the event loop.
+"""
+
+import asyncio
+import functools
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from .metrics import metrics
+
+BACKEND_INLINE = "inline"
+BACKEND_THREAD = "thread"
+BACKEND_PROCESS = "process"
+BACKENDS = {BACKEND_INLINE, BACKEND_THREAD, BACKEND_PROCESS}
+
+
+def _noop() -> None:
+    return None
+
+
+class RenderPool:
+    """
+    Runs a picklable, top-level render function for many inputs in parallel.
+
+    ``process`` sidesteps the GIL for PIL drawing and PNG encoding at the cost
+    of pickling inputs and the returned images; ``thread`` shares the process's
+    font cache and suits small tables; ``inline`` renders on the calling thread
+    (the previous behaviour, useful for tests and benchmarks).
+
+    Args:
+        render_fn (Callable): Module-level function returning encoded image(s)
+        kind (str): "inline", "thread" or "process" (default: "thread")
+        max_workers (int): Worker count (default: min(4, CPU count))
+        initializer (Callable): Module-level function run once per worker,
+            e.g. to load fonts before the first table arrives
+    """
+
+    def __init__(
+        self,
+        render_fn: Callable[[Any], Any],
+        kind: str = BACKEND_THREAD,
+        max_workers: int | None = None,
+        initializer: Callable[[], None] | None = None,
+    ):
+        if kind not in BACKENDS:
+            raise ValueError(
+                f"Unsupported render backend: {kind}. Supported: {sorted(BACKENDS)}"
+            )
+        self.render_fn = render_fn
+        self.kind = kind
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.initializer = initializer
+        self._executor: Executor | None = None
+
+    @classmethod
+    def from_env(
+        cls,
+        render_fn: Callable[[Any], Any],
+        initializer: Callable[[], None] | None = None,
+    ) -> "RenderPool":
+        """Create a pool from TABLE_RENDER_BACKEND and TABLE_RENDER_WORKERS."""
+        workers = os.getenv("TABLE_RENDER_WORKERS")
+        return cls(
+            render_fn,
+            kind=os.getenv("TABLE_RENDER_BACKEND") or BACKEND_THREAD,
+            max_workers=int(workers) if workers else None,
+            initializer=initializer,
+        )
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            executor_cls = (
+                ProcessPoolExecutor
+                if self.kind == BACKEND_PROCESS
+                else ThreadPoolExecutor
+            )
+            self._executor = executor_cls(
+                max_workers=self.max_workers, initializer=self.initializer
+            )
+        return self._executor
+
+    def warm(self) -> None:
+        """Start the workers now so fonts are loaded before the first render."""
+        if self.kind == BACKEND_INLINE:
+            if self.initializer is not None:
+                self.initializer()
+            return
+        executor = self._get_executor()
+        for future in [executor.submit(_noop) for _ in range(self.max_workers)]:
+            future.result()
+        print(f"🔥 [RenderPool] Warmed {self.max_workers} {self.kind} render worker(s)")
+
+    async def render_many(self, items: list[Any], **kwargs: Any) -> list[Any]:
+        """
+        Render all items in parallel; failures are returned in place of results.
+
+        Keyword arguments are passed to every ``render_fn`` call and must be
+        picklable for the process backend.
+        """
+        started = time.perf_counter()
+        render_fn = (
+            functools.partial(self.render_fn, **kwargs) if kwargs else self.render_fn
+        )
+        if self.kind == BACKEND_INLINE or len(items) == 0:
+            results = [self._render_inline(render_fn, item) for item in items]
+        else:
+            results = await self._render_in_executor(render_fn, items)
+        metrics.observe(
+            "table_render.batch_seconds",
+            time.perf_counter() - started,
+            backend=self.kind,
+        )
+        return results
+
+    def _render_inline(self, render_fn: Callable, item: Any) -> Any:
+        try:
+            return render_fn(item)
+        except Exception as e:
+            return e
+
+    async def _render_in_executor(
+        self, render_fn: Callable, items: list[Any], retry: bool = True
+    ) -> list[Any]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        futures = [loop.run_in_executor(executor, render_fn, item) for item in items]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        broken = [
+            i
+            for i, result in enumerate(results)
+            if isinstance(result, BrokenProcessPool)
+        ]
+        if broken:
+            # A worker died (e.g. out of memory); start a fresh pool
+            print("⚠️ [RenderPool] Render worker crashed, restarting the pool")
+            metrics.incr("table_render.pool_restarts")
+            self.close()
+            if retry:
+                # Retry once on the fresh pool, never in the bot's own process;
+                # items that crash it again are returned as errors
+                retried = await self._render_in_executor(
+                    render_fn, [items[i] for i in broken], retry=False
+                )
+                for i, result in zip(broken, retried, strict=True):
+                    results[i] = result
+        return results
+
+    def close(self) -> None:
+        """Shut the workers down without waiting for queued renders."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
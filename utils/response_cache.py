@@ -0,0 +1,230 @@
+"""
+Exact-match response cache for LLM calls.
+In-memory LRU with TTL and an optional SQLite backing store written off the event loop.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any
+
+from .metrics import metrics
+from .openai_compatible import content_role_and_text
+
+# Prompts whose answer depends on when they are asked
+TIME_SENSITIVE_RE = re.compile(
+    r"\b(now|today|tonight|tomorrow|yesterday|current(ly)?|latest|recent(ly)?"
+    r"|time|date|weather|forecast|price|news|this (week|month|year))\b"
+    r"|(现在|今天|今日|明天|昨天|最新|最近|几点|时间|日期|天气|価格|天気)",
+    re.IGNORECASE,
+)
+
+
+def response_cache_key(prompt: str, config: Any, history: list | None = None) -> str:
+    """
+    Stable sha256 of provider, model, generation settings, system prompt, history and prompt.
+
+    The dynamic context (author, participants, time) and the speaker labels on
+    user turns are part of the key, so a reply addressed to one user is never
+    served to another.
+    """
+    payload = {
+        "provider": config.provider,
+        "model": config.model,
+        "temperature": float(config.temperature),
+        "system_prompt": config.system_prompt or "",
+        "dynamic_context": config.dynamic_context or "",
+        "generation_profile": getattr(config.generation_profile, "name", None),
+        "history": [list(content_role_and_text(c)) for c in history or []],
+        "prompt": prompt,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def cache_bypass_reason(prompt: str, config: Any) -> str | None:
+    """Why a request must not be served from cache, or None if it may be."""
+    if config.tools:
+        return "grounded"
+    if TIME_SENSITIVE_RE.search(prompt):
+        return "time_sensitive"
+    return None
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of LLM responses keyed by ``response_cache_key``.
+
+    With ``db_path`` set, entries are also written to SQLite so they survive
+    restarts; a memory miss falls through to disk and promotes the entry. Writes
+    go through a single background thread with its own connection (WAL mode),
+    so a commit never blocks the event loop or a concurrent read.
+
+    Args:
+        max_entries (int): Maximum entries kept in memory (default: 1024)
+        ttl_seconds (float): Seconds an entry stays valid (default: 3600)
+        db_path (str): Optional SQLite file for the backing store
+        clock (Callable): Wall-clock time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        db_path: str | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = Lock()
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._db_path = db_path
+        self._writer: ThreadPoolExecutor | None = None
+        self._write_db = threading.local()
+        self._puts = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "DELETE FROM response_cache WHERE expires_at <= ?", (self._clock(),)
+            )
+            self._db.commit()
+            self._writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="response-cache"
+            )
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def key_for(self, prompt: str, config: Any, history: list | None = None):
+        """Cache key for a request, or None if it must bypass the cache."""
+        reason = cache_bypass_reason(prompt, config)
+        if reason is not None:
+            metrics.incr("response_cache.lookups", result="bypass", reason=reason)
+            return None
+        return response_cache_key(prompt, config, history)
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.incr("response_cache.lookups", result="hit" if hit else "miss")
+        metrics.set_gauge("response_cache.hit_rate", round(self.hit_rate, 4))
+
+    def get(self, key: str) -> str | None:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, expires_at FROM response_cache "
+                    "WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._store_memory(key, entry)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            self._record(entry is not None)
+            return entry[0] if entry is not None else None
+
+    def put(self, key: str, response: str) -> None:
+        if not response:
+            return
+        entry = (response, self._clock() + self.ttl_seconds)
+        with self._lock:
+            self._store_memory(key, entry)
+            if self._writer is not None:
+                self._puts += 1
+                purge = self._puts % 256 == 0
+                self._writer.submit(self._write_disk, key, entry, purge)
+
+    def _writer_db(self) -> sqlite3.Connection:
+        """Connection owned by the writer thread."""
+        db = getattr(self._write_db, "db", None)
+        if db is None:
+            db = self._write_db.db = sqlite3.connect(self._db_path, timeout=5)
+        return db
+
+    def _write_disk(self, key: str, entry: tuple[str, float], purge: bool) -> None:
+        """Runs on the writer thread."""
+        try:
+            db = self._writer_db()
+            db.execute(
+                "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?)", (key, *entry)
+            )
+            if purge:
+                # Drop expired rows so the backing store does not grow without bound
+                db.execute(
+                    "DELETE FROM response_cache WHERE expires_at <= ?", (self._clock(),)
+                )
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ [ResponseCache] Failed to write to disk: {e}")
+
+    def _clear_disk(self) -> None:
+        db = self._writer_db()
+        db.execute("DELETE FROM response_cache")
+        db.commit()
+
+    def _close_writer_db(self) -> None:
+        db = getattr(self._write_db, "db", None)
+        if db is not None:
+            db.close()
+            self._write_db.db = None
+
+    def flush(self) -> None:
+        """Block until every queued disk write has been committed."""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def _store_memory(self, key: str, entry: tuple[str, float]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            writer = self._writer
+        if writer is not None:
+            writer.submit(self._clear_disk).result()
+
+    def close(self) -> None:
+        """Commit pending writes and close the database."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.submit(self._close_writer_db)
+            writer.shutdown(wait=True)
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -27,6 +27,7 @@ class RuntimeConfig:
                 "allowed_users": [],
                 "channel_metadata": {},
                 "user_metadata": {},
+                "channel_settings": {},
                 "timezone": "UTC",
                 "discord_activity": "Surfing",
                 "history_limit": 12,
@@ -40,6 +41,8 @@ class RuntimeConfig:
                     self._cache["channel_metadata"] = {}
                 if "user_metadata" not in self._cache:
                     self._cache["user_metadata"] = {}
+                if not self._cache.get("channel_settings"):
+                    self._cache["channel_settings"] = {}
 
     def _save(self):
         """Save config to YAML file with inline comments."""
@@ -103,6 +106,26 @@ class RuntimeConfig:
 
         lines.append("\n")
 
+        # Per-channel overrides
+        lines.append(
+            "# Per-channel settings (e.g. generation_profile: fast/balanced/deep,\n"
+            "# table_text_max_cells: 12)\n"
+        )
+        lines.append("channel_settings:\n")
+        channel_settings = self._cache.get("channel_settings", {})
+        if not channel_settings:
+            lines.append("  {}\n")
+        else:
+            for channel_id, settings in channel_settings.items():
+                metadata = channel_metadata.get(str(channel_id), {})
+                server = metadata.get("server", "Unknown Server")
+                channel = metadata.get("channel", "Unknown Channel")
+                lines.append(f"  '{channel_id}':  # {server} / #{channel}\n")
+                for key, value in settings.items():
+                    lines.append(f"    {key}: {value}\n")
+
+        lines.append("\n")
+
         # Other settings
         lines.append("# Timezone for bot operations\n")
         lines.append(f"timezone: {self._cache.get('timezone', 'UTC')}\n\n")
@@ -143,6 +166,33 @@ class RuntimeConfig:
         """Get history limit for message context."""
         return self._cache.get("history_limit", 12)
 
+    def channel_setting(self, channel_id: int | None, key: str, default=None):
+        """Get a per-channel setting, or ``default`` when the channel has none."""
+        if channel_id is None:
+            return default
+        settings = self._cache.get("channel_settings", {}).get(str(channel_id), {})
+        return settings.get(key, default)
+
+    def set_channel_setting(self, channel_id: int, key: str, value) -> None:
+        """
+        Set a per-channel setting.
+
+        Args:
+            channel_id: Discord channel ID
+            key: Setting name, e.g. "generation_profile"
+            value: New value, or None to remove the setting
+        """
+        with self._lock:
+            channel_settings = self._cache.setdefault("channel_settings", {})
+            settings = channel_settings.setdefault(str(channel_id), {})
+            if value is None:
+                settings.pop(key, None)
+            else:
+                settings[key] = value
+            if not settings:
+                del channel_settings[str(channel_id)]
+            self._save()
+
     def add_channel(
         self, channel_id: int, server_name: str = None, channel_name: str = None
     ) -> bool:
@@ -0,0 +1,220 @@
+"""
+Local heuristic classifier deciding whether a request needs the Google Search tool.
+Keyword/regex rules plus an optional bag-of-words model, no LLM call involved.
+"""
+
+import json
+import math
+import re
+from dataclasses import dataclass
+
+from .metrics import metrics
+
+# Latin words, digits and single CJK characters
+_TOKEN_RE = re.compile(r"[a-z0-9']+|[぀-ヿ㐀-鿿가-힯]")
+
+
+@dataclass
+class SearchRule:
+    """A regex whose match adds ``weight`` to the search score."""
+
+    name: str
+    pattern: re.Pattern
+    weight: float
+
+
+def _rule(name: str, pattern: str, weight: float) -> SearchRule:
+    return SearchRule(name, re.compile(pattern, re.IGNORECASE), weight)
+
+
+DEFAULT_RULES = [
+    # Signals that the answer depends on fresh or external data
+    _rule(
+        "freshness",
+        r"\b(latest|newest|recent(ly)?|current(ly)?|today|tonight|yesterday|tomorrow"
+        r"|this (week|month|year)|right now|breaking|upcoming|(out|available) yet)\b",
+        2.0,
+    ),
+    _rule(
+        "news",
+        r"\b(news|headlines?|announce(d|ment)?|release[sd]?|launch(ed)?|updates?)\b",
+        1.5,
+    ),
+    _rule(
+        "live_data",
+        r"\b(weather|forecast|prices?|stocks?|exchange rate|scores?|standings"
+        r"|schedule|election|results?|time (is it )?in)\b",
+        2.0,
+    ),
+    _rule(
+        "lookup",
+        r"\b(search|google|look (it )?up|links?|sources?|according to|official site)\b",
+        2.5,
+    ),
+    _rule("who_when", r"\b(who (is|won|wins)|when (is|does|did|will))\b", 1.2),
+    _rule("recent_year", r"\b20[2-9]\d\b", 1.0),
+    _rule("url", r"https?://", 3.0),
+    _rule(
+        "cjk_fresh",
+        r"(最新|今天|今日|昨天|明天|新闻|新聞|天气|天氣|价格|價格|股价|比分|汇率|现在几点"
+        r"|最近|搜索|搜一下|查一下|ニュース|天気|株価)",
+        2.0,
+    ),
+    # Signals that the model can answer on its own
+    _rule(
+        "greeting",
+        r"^\W*(hi|hello|hey|yo|thanks|thank you|ty|lol|ok(ay)?|good (morning|night)"
+        r"|你好|谢谢|謝謝|早上好|晚安|こんにちは|ありがとう)\W*$",
+        -3.0,
+    ),
+    _rule(
+        "code", r"```|\bdef |\bclass |\bfunction\b|\btraceback\b|\bstack trace\b", -2.0
+    ),
+    _rule(
+        "creative",
+        r"\b(write|compose|draft|poem|story|joke|translate|rewrite|rephrase|summari[sz]e)\b",
+        -1.5,
+    ),
+    _rule("math", r"^[\d\s+\-*/^().=x%]+\??$", -3.0),
+]
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word and CJK character tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class BagOfWordsModel:
+    """Logistic bag-of-words model: ``bias + sum(weights[token])`` is the logit."""
+
+    weights: dict[str, float]
+    bias: float = 0.0
+
+    @classmethod
+    def load(cls, path: str) -> "BagOfWordsModel":
+        """Load ``{"bias": float, "weights": {token: float}}`` from a JSON file."""
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        return cls(
+            weights={str(k): float(v) for k, v in data.get("weights", {}).items()},
+            bias=float(data.get("bias", 0.0)),
+        )
+
+    def logit(self, text: str) -> float:
+        return self.bias + sum(self.weights.get(token, 0.0) for token in tokenize(text))
+
+
+class SearchToolClassifier:
+    """
+    Scores a message and decides whether search grounding is worth its latency.
+
+    The score is ``bias`` plus the weights of all matching rules plus the logit of
+    the optional bag-of-words model; search is used when the score is positive.
+
+    Args:
+        rules (list[SearchRule]): Regex rules (default: DEFAULT_RULES)
+        model (BagOfWordsModel): Optional bag-of-words model
+        bias (float): Base score, negative so search is off without a signal (default: -1.0)
+    """
+
+    def __init__(
+        self,
+        rules: list[SearchRule] | None = None,
+        model: BagOfWordsModel | None = None,
+        bias: float = -1.0,
+    ):
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.model = model
+        self.bias = bias
+
+    @classmethod
+    def from_model_path(cls, path: str | None) -> "SearchToolClassifier":
+        """Create a classifier, loading the bag-of-words model if a path is given."""
+        model = None
+        if path:
+            try:
+                model = BagOfWordsModel.load(path)
+                print(
+                    f"📚 [SearchToolClassifier] Loaded bag-of-words model with {len(model.weights)} tokens"
+                )
+            except (OSError, ValueError) as e:
+                print(
+                    f"⚠️ [SearchToolClassifier] Could not load model {path}, using rules only: {e}"
+                )
+        return cls(model=model)
+
+    def matched_rules(self, text: str) -> list[str]:
+        return [rule.name for rule in self.rules if rule.pattern.search(text)]
+
+    def score(self, text: str) -> float:
+        score = self.bias
+        for rule in self.rules:
+            if rule.pattern.search(text):
+                score += rule.weight
+        if self.model is not None:
+            score += self.model.logit(text)
+        return score
+
+    def needs_search(self, text: str) -> bool:
+        return self.score(text) > 0
+
+    def probability(self, text: str) -> float:
+        return 1 / (1 + math.exp(-self.score(text)))
+
+
+def load_labelled_samples(path: str) -> list[tuple[str, bool]]:
+    """Read ``{"text": str, "search": bool}`` lines from a JSONL file."""
+    samples = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            item = json.loads(line)
+            samples.append((item["text"], bool(item["search"])))
+    return samples
+
+
+def evaluate_classifier(
+    classifier: SearchToolClassifier, samples: list[tuple[str, bool]]
+) -> dict:
+    """Precision, recall and confusion counts of the classifier on labelled samples."""
+    tp = fp = fn = tn = 0
+    for text, expected in samples:
+        predicted = classifier.needs_search(text)
+        if predicted and expected:
+            tp += 1
+        elif predicted:
+            fp += 1
+        elif expected:
+            fn += 1
+        else:
+            tn += 1
+    return {
+        "samples": len(samples),
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "tn": tn,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+    }
+
+
+def report_classifier_quality(
+    classifier: SearchToolClassifier, samples_path: str
+) -> dict | None:
+    """Evaluate on a labelled JSONL sample, log precision/recall and publish gauges."""
+    try:
+        samples = load_labelled_samples(samples_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ [SearchToolClassifier] Could not read samples {samples_path}: {e}")
+        return None
+    result = evaluate_classifier(classifier, samples)
+    print(
+        f"📏 [SearchToolClassifier] {result['samples']} samples: precision {result['precision']:.2f}, recall {result['recall']:.2f} (fp {result['fp']}, fn {result['fn']})"
+    )
+    metrics.set_gauge("search_classifier.precision", round(result["precision"], 4))
+    metrics.set_gauge("search_classifier.recall", round(result["recall"], 4))
+    return result
@@ -0,0 +1,138 @@
+"""
+Memoized text width measurement for image layout.
+Per-font glyph advance and kerning tables plus an LRU of measured words.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from PIL import ImageFont
+
+# Pairs that are kerned in most Latin fonts; used to detect kerning support
+_KERNING_PROBES = ("AV", "To", "Wa", "LT", "Yo", "P.", "Te", "r,")
+# Longest prefix measured as one string for shaped fonts; longer text is
+# measured in windows of this many characters so the cost stays linear
+SHAPED_PREFIX_WINDOW = 32
+
+
+class FontMetrics:
+    """
+    Width measurement for one font, exact to ``ImageDraw.textlength``.
+
+    With PIL's basic layout a string's width is the sum of its glyph advances
+    plus the kerning of each adjacent pair, so both are tabulated once per glyph
+    (or pair) and reused for every string. Fonts using complex shaping (raqm)
+    fall back to measuring whole strings. Measured strings are kept in an LRU.
+
+    Args:
+        font: PIL font
+        word_cache_size (int): Strings remembered in the LRU (default: 8192)
+    """
+
+    def __init__(self, font: Any, word_cache_size: int = 8192):
+        self.font = font
+        self.word_cache_size = word_cache_size
+        self._lock = Lock()
+        self._advances: dict[str, float] = {}
+        self._kerning: dict[str, float] = {}
+        self._words: OrderedDict[str, float] = OrderedDict()
+        self.shaped = (
+            getattr(font, "layout_engine", ImageFont.Layout.BASIC)
+            != ImageFont.Layout.BASIC
+        )
+        self.kerned = not self.shaped and any(
+            self._kern(pair[0], pair[1]) for pair in _KERNING_PROBES
+        )
+
+    def advance(self, char: str) -> float:
+        """Advance width of a single character."""
+        width = self._advances.get(char)
+        if width is None:
+            width = self._advances[char] = self.font.getlength(char)
+        return width
+
+    def _kern(self, left: str, right: str) -> float:
+        pair = left + right
+        delta = self._kerning.get(pair)
+        if delta is None:
+            delta = self._kerning[pair] = (
+                self.font.getlength(pair) - self.advance(left) - self.advance(right)
+            )
+        return delta
+
+    def kerning(self, previous: str | None, char: str) -> float:
+        """Kerning between ``previous`` and ``char`` (0 without a kerning table)."""
+        if previous is None or not self.kerned:
+            return 0.0
+        return self._kern(previous, char)
+
+    def step(self, previous: str | None, char: str) -> float:
+        """Width added by appending ``char`` to a string ending in ``previous``."""
+        return self.kerning(previous, char) + self.advance(char)
+
+    def width(self, text: str) -> float:
+        """Width of ``text`` in pixels, as ``ImageDraw.textlength`` would report."""
+        if not text:
+            return 0.0
+        with self._lock:
+            width = self._words.get(text)
+            if width is not None:
+                self._words.move_to_end(text)
+                return width
+
+        if self.shaped:
+            width = self.font.getlength(text)
+        else:
+            width = 0.0
+            previous = None
+            for char in text:
+                width += self.step(previous, char)
+                previous = char
+
+        with self._lock:
+            self._words[text] = width
+            if len(self._words) > self.word_cache_size:
+                self._words.popitem(last=False)
+        return width
+
+    def prefix_widths(self, text: str) -> list[float]:
+        """
+        Cumulative widths: element ``i`` is the width of ``text[: i + 1]``.
+
+        Shaped fonts measure each prefix as a string, restarting every
+        ``SHAPED_PREFIX_WINDOW`` characters, so shaping across a window edge
+        is approximated rather than measuring ever longer prefixes.
+        """
+        if self.shaped:
+            widths, offset = [], 0.0
+            for window in range(0, len(text), SHAPED_PREFIX_WINDOW):
+                chunk = text[window : window + SHAPED_PREFIX_WINDOW]
+                widths.extend(
+                    offset + self.font.getlength(chunk[: i + 1])
+                    for i in range(len(chunk))
+                )
+                offset = widths[-1]
+            return widths
+        widths, total, previous = [], 0.0, None
+        for char in text:
+            total += self.step(previous, char)
+            widths.append(total)
+            previous = char
+        return widths
+
+
+_metrics: "WeakKeyDictionary[Any, FontMetrics]" = WeakKeyDictionary()
+_metrics_lock = Lock()
+
+
+def font_metrics(font: Any) -> FontMetrics:
+    """Shared FontMetrics for a font object, created on first use."""
+    metrics = _metrics.get(font)
+    if metrics is None:
+        with _metrics_lock:
+            metrics = _metrics.get(font)
+            if metrics is None:
+                metrics = _metrics[font] = FontMetrics(font)
+    return metrics
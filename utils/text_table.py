@@ -0,0 +1,75 @@
+"""
+Plain-text table formatting for monospace display.
+Pads cells by terminal column width so CJK and emoji cells stay aligned.
+"""
+
+import re
+import unicodedata
+
+# Markdown markers that a code block would show literally
+_INLINE_MARKUP = re.compile(r"\*\*|__|`")
+
+
+def display_width(text: str) -> int:
+    """Columns the text occupies in a monospace font (wide East Asian characters count 2)."""
+    width = 0
+    for char in text:
+        if unicodedata.combining(char) or unicodedata.category(char) == "Cf":
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+    return width
+
+
+def _pad(text: str, width: int) -> str:
+    return text + " " * (width - display_width(text))
+
+
+def _clean_cell(cell: str) -> str:
+    return _INLINE_MARKUP.sub("", cell).strip()
+
+
+def _column_widths(headers: list[str], rows: list[list[str]]) -> list[int]:
+    return [
+        max(display_width(line[col]) for line in [headers, *rows])
+        for col in range(len(headers))
+    ]
+
+
+def text_table_width(headers: list[str], rows: list[list[str]]) -> int:
+    """Columns of the widest line ``format_text_table`` produces."""
+    headers = [_clean_cell(cell) for cell in headers]
+    rows = [[_clean_cell(cell) for cell in row] for row in rows]
+    widths = _column_widths(headers, rows)
+    # "| " + cells joined by " | " + " |"
+    return sum(widths) + 3 * len(widths) + 1
+
+
+def format_text_table(headers: list[str], rows: list[list[str]]) -> str:
+    """
+    Format a parsed table as a markdown code block with aligned columns.
+
+    Bold and code markers are dropped since they would show literally.
+
+    Args:
+        headers (list[str]): Header cells
+        rows (list[list[str]]): Body rows, each as long as ``headers``
+
+    Returns:
+        str: Table wrapped in a ``` fence
+    """
+    headers = [_clean_cell(cell) for cell in headers]
+    rows = [[_clean_cell(cell) for cell in row] for row in rows]
+    widths = _column_widths(headers, rows)
+
+    def line(cells: list[str]) -> str:
+        return (
+            "| "
+            + " | ".join(
+                _pad(cell, width) for cell, width in zip(cells, widths, strict=True)
+            )
+            + " |"
+        )
+
+    separator = "|" + "|".join("-" * (width + 2) for width in widths) + "|"
+    lines = [line(headers), separator, *(line(row) for row in rows)]
+    return "```\n" + "\n".join(lines) + "\n```"
@@ -0,0 +1,426 @@
+"""
+Token and cost accounting for LLM calls with rolling per-guild/channel/user budgets.
+Providers report usage metadata; the Discord scope comes from a context variable.
+"""
+
+import os
+import sqlite3
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from typing import Any
+
+from .metrics import metrics
+
+BUDGET_OK = "ok"
+BUDGET_DOWNGRADE = "downgrade"
+BUDGET_REFUSE = "refuse"
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when a request is refused because a usage budget is exhausted."""
+
+
+@dataclass(frozen=True)
+class UsageScope:
+    """Who a request is made for; any id may be None (e.g. DMs have no guild)."""
+
+    guild_id: int | None = None
+    channel_id: int | None = None
+    user_id: int | None = None
+
+    def keys(self) -> list[tuple[str, int]]:
+        return [
+            (kind, value)
+            for kind, value in (
+                ("guild", self.guild_id),
+                ("channel", self.channel_id),
+                ("user", self.user_id),
+            )
+            if value is not None
+        ]
+
+
+_current_scope: ContextVar[UsageScope | None] = ContextVar("usage_scope", default=None)
+
+
+@contextmanager
+def usage_scope(
+    guild_id: int | None, channel_id: int | None, user_id: int | None
+) -> Iterator[UsageScope]:
+    """Attribute every LLM call made inside the block (and its tasks) to this scope."""
+    scope = UsageScope(guild_id, channel_id, user_id)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def current_usage_scope() -> UsageScope | None:
+    return _current_scope.get()
+
+
+@dataclass
+class TokenUsage:
+    """Token counts of one or more requests."""
+
+    prompt_tokens: int = 0
+    output_tokens: int = 0  # Includes thinking tokens
+    cached_tokens: int = 0  # Part of prompt_tokens served from a context cache
+    requests: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+    def add(self, other: "TokenUsage") -> None:
+        self.prompt_tokens += other.prompt_tokens
+        self.output_tokens += other.output_tokens
+        self.cached_tokens += other.cached_tokens
+        self.requests += other.requests
+
+
+def usage_from_gemini(response: Any) -> TokenUsage | None:
+    """Token counts from a google-genai response's usage_metadata."""
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return None
+    return TokenUsage(
+        prompt_tokens=getattr(meta, "prompt_token_count", None) or 0,
+        output_tokens=(getattr(meta, "candidates_token_count", None) or 0)
+        + (getattr(meta, "thoughts_token_count", None) or 0),
+        cached_tokens=getattr(meta, "cached_content_token_count", None) or 0,
+        requests=1,
+    )
+
+
+def usage_from_openai(data: dict) -> TokenUsage | None:
+    """Token counts from an OpenAI-compatible response body's usage object."""
+    usage = data.get("usage")
+    if not usage:
+        return None
+    details = usage.get("prompt_tokens_details") or {}
+    return TokenUsage(
+        prompt_tokens=usage.get("prompt_tokens") or 0,
+        output_tokens=usage.get("completion_tokens") or 0,
+        cached_tokens=details.get("cached_tokens") or 0,
+        requests=1,
+    )
+
+
+def parse_pricing(spec: str | None) -> dict[str, tuple[float, float]]:
+    """Parse ``model=input/output;model=input/output`` prices in USD per 1M tokens."""
+    pricing = {}
+    for item in (spec or "").split(";"):
+        if "=" not in item:
+            continue
+        model, prices = item.split("=", 1)
+        input_price, _, output_price = prices.partition("/")
+        pricing[model.strip()] = (float(input_price), float(output_price or 0))
+    return pricing
+
+
+@dataclass
+class UsageBudget:
+    """Rolling token budgets; None disables a limit."""
+
+    guild_tokens: int | None = None
+    channel_tokens: int | None = None
+    user_tokens: int | None = None
+    window_seconds: float = 86400
+    action: str = BUDGET_DOWNGRADE  # "downgrade" or "refuse"
+    downgrade_model: str | None = None  # Without one, "downgrade" refuses
+
+    def limit(self, kind: str) -> int | None:
+        return getattr(self, f"{kind}_tokens")
+
+
+@dataclass
+class UsageEvent:
+    timestamp: float
+    scope: UsageScope
+    provider: str
+    model: str
+    usage: TokenUsage = field(default_factory=TokenUsage)
+
+
+class UsageTracker:
+    """
+    Aggregates token usage per guild, channel and user and enforces rolling budgets.
+
+    Totals since start and rolling-window sums are kept in memory; with ``db_path``
+    set, a background thread appends events to SQLite every ``flush_interval``
+    seconds, so recording never waits on disk. ``close`` writes what is left.
+
+    Args:
+        budget (UsageBudget): Rolling budgets, or None for accounting only
+        db_path (str): Optional SQLite file for the event log
+        flush_interval (float): Seconds between SQLite flushes (default: 60)
+        pricing (dict): model -> (input, output) USD per 1M tokens, for cost estimates
+        cached_price_ratio (float): Price of cached prompt tokens relative to input (default: 0.25)
+        clock (Callable): Wall-clock time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        budget: UsageBudget | None = None,
+        db_path: str | None = None,
+        flush_interval: float = 60,
+        pricing: dict[str, tuple[float, float]] | None = None,
+        cached_price_ratio: float = 0.25,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.budget = budget or UsageBudget()
+        self.flush_interval = flush_interval
+        self.pricing = pricing or {}
+        self.cached_price_ratio = cached_price_ratio
+        self._clock = clock
+        self._lock = Lock()
+        self._totals: dict[tuple[str, int], TokenUsage] = defaultdict(TokenUsage)
+        self._window: deque[UsageEvent] = deque()
+        self._window_tokens: dict[tuple[str, int], int] = defaultdict(int)
+        self._pending: list[UsageEvent] = []
+        self._db = None
+        self._db_lock = Lock()
+        self._stop = Event()
+        self._flusher: Thread | None = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS usage_events ("
+                "ts REAL NOT NULL, guild_id INTEGER, channel_id INTEGER, user_id INTEGER,"
+                " provider TEXT, model TEXT, prompt_tokens INTEGER, output_tokens INTEGER,"
+                " cached_tokens INTEGER)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS usage_events_guild_ts"
+                " ON usage_events (guild_id, ts)"
+            )
+            self._db.commit()
+            self._flusher = Thread(
+                target=self._flush_loop, name="usage-flush", daemon=True
+            )
+            self._flusher.start()
+
+    @classmethod
+    def from_env(cls) -> "UsageTracker":
+        """Create a tracker configured from USAGE_* environment variables."""
+
+        def optional_int(name):
+            value = os.getenv(name)
+            return int(value) if value else None
+
+        return cls(
+            budget=UsageBudget(
+                guild_tokens=optional_int("USAGE_BUDGET_GUILD_TOKENS"),
+                channel_tokens=optional_int("USAGE_BUDGET_CHANNEL_TOKENS"),
+                user_tokens=optional_int("USAGE_BUDGET_USER_TOKENS"),
+                window_seconds=float(os.getenv("USAGE_BUDGET_WINDOW_SECONDS", 86400)),
+                action=os.getenv("USAGE_BUDGET_ACTION") or BUDGET_DOWNGRADE,
+                downgrade_model=os.getenv("USAGE_BUDGET_DOWNGRADE_MODEL") or None,
+            ),
+            db_path=os.getenv("USAGE_DB_PATH") or None,
+            flush_interval=float(os.getenv("USAGE_FLUSH_INTERVAL_SECONDS", 60)),
+            pricing=parse_pricing(os.getenv("USAGE_PRICING")),
+        )
+
+    def cost(self, model: str, usage: TokenUsage) -> float:
+        """Estimated USD cost, 0 for models without pricing."""
+        input_price, output_price = self.pricing.get(model, (0.0, 0.0))
+        uncached = usage.prompt_tokens - usage.cached_tokens
+        return (
+            uncached * input_price
+            + usage.cached_tokens * input_price * self.cached_price_ratio
+            + usage.output_tokens * output_price
+        ) / 1_000_000
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        usage: TokenUsage,
+        scope: UsageScope | None = None,
+    ) -> None:
+        """Account one response's usage to the given (or current) scope."""
+        scope = scope or current_usage_scope() or UsageScope()
+        event = UsageEvent(self._clock(), scope, provider, model, usage)
+        with self._lock:
+            for key in scope.keys():
+                self._totals[key].add(usage)
+                self._window_tokens[key] += usage.total_tokens
+            self._window.append(event)
+            self._prune(event.timestamp)
+            if self._db is not None:
+                self._pending.append(event)
+        labels = {"provider": provider, "model": model}
+        metrics.incr("llm.tokens", usage.prompt_tokens, kind="prompt", **labels)
+        metrics.incr("llm.tokens", usage.output_tokens, kind="output", **labels)
+        metrics.incr("llm.tokens", usage.cached_tokens, kind="cached", **labels)
+
+    def _flush_loop(self) -> None:
+        """Runs on the flusher thread until ``close``."""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"⚠️ [UsageTracker] Failed to flush usage events: {e}")
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.budget.window_seconds
+        while self._window and self._window[0].timestamp < cutoff:
+            old = self._window.popleft()
+            for key in old.scope.keys():
+                self._window_tokens[key] -= old.usage.total_tokens
+                if self._window_tokens[key] <= 0:
+                    del self._window_tokens[key]
+
+    def window_tokens(self, kind: str, value: int) -> int:
+        """Tokens used by a guild/channel/user within the budget window."""
+        with self._lock:
+            self._prune(self._clock())
+            return self._window_tokens.get((kind, value), 0)
+
+    def totals(self, kind: str, value: int) -> TokenUsage:
+        """Usage since start for a guild/channel/user."""
+        with self._lock:
+            total = TokenUsage()
+            total.add(self._totals.get((kind, value), TokenUsage()))
+            return total
+
+    def check_budget(self, scope: UsageScope | None = None) -> tuple[str, str]:
+        """Return (decision, reason) for the next request in ``scope``."""
+        scope = scope or current_usage_scope()
+        if scope is None:
+            return BUDGET_OK, ""
+        for kind, value in scope.keys():
+            limit = self.budget.limit(kind)
+            if limit is None:
+                continue
+            used = self.window_tokens(kind, value)
+            if used >= limit:
+                reason = f"{kind} {value} used {used}/{limit} tokens"
+                if (
+                    self.budget.action == BUDGET_DOWNGRADE
+                    and self.budget.downgrade_model
+                ):
+                    return BUDGET_DOWNGRADE, reason
+                return BUDGET_REFUSE, reason
+        return BUDGET_OK, ""
+
+    def flush(self) -> int:
+        """Write pending events to SQLite, returning how many were written."""
+        with self._db_lock:
+            with self._lock:
+                if self._db is None or not self._pending:
+                    return 0
+                pending, self._pending = self._pending, []
+            self._db.executemany(
+                "INSERT INTO usage_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        e.timestamp,
+                        e.scope.guild_id,
+                        e.scope.channel_id,
+                        e.scope.user_id,
+                        e.provider,
+                        e.model,
+                        e.usage.prompt_tokens,
+                        e.usage.output_tokens,
+                        e.usage.cached_tokens,
+                    )
+                    for e in pending
+                ],
+            )
+            self._db.commit()
+        return len(pending)
+
+    def guild_report(
+        self, guild_id: int, hours: float = 24, top: int = 5
+    ) -> dict[str, Any]:
+        """
+        Usage of a guild over the last ``hours``, with top channels and users.
+
+        Reads SQLite when configured, so call it off the event loop.
+        """
+        since = self._clock() - hours * 3600
+        by_model: dict[str, TokenUsage] = defaultdict(TokenUsage)
+        by_channel: dict[int, int] = defaultdict(int)
+        by_user: dict[int, int] = defaultdict(int)
+
+        if self._db is not None:
+            self.flush()
+            with self._db_lock:
+                rows = self._db.execute(
+                    "SELECT channel_id, user_id, model, prompt_tokens, output_tokens,"
+                    " cached_tokens FROM usage_events WHERE guild_id = ? AND ts >= ?",
+                    (guild_id, since),
+                ).fetchall()
+        else:
+            with self._lock:
+                rows = [
+                    (
+                        e.scope.channel_id,
+                        e.scope.user_id,
+                        e.model,
+                        e.usage.prompt_tokens,
+                        e.usage.output_tokens,
+                        e.usage.cached_tokens,
+                    )
+                    for e in self._window
+                    if e.scope.guild_id == guild_id and e.timestamp >= since
+                ]
+
+        for channel_id, user_id, model, prompt, output, cached in rows:
+            by_model[model].add(TokenUsage(prompt, output, cached, 1))
+            by_channel[channel_id] += prompt + output
+            by_user[user_id] += prompt + output
+
+        total = TokenUsage()
+        for usage in by_model.values():
+            total.add(usage)
+        return {
+            "total": total,
+            "cost": sum(self.cost(model, usage) for model, usage in by_model.items()),
+            "by_model": dict(by_model),
+            "top_channels": sorted(by_channel.items(), key=lambda x: -x[1])[:top],
+            "top_users": sorted(by_user.items(), key=lambda x: -x[1])[:top],
+            "window_tokens": self.window_tokens("guild", guild_id),
+            "budget": self.budget.guild_tokens,
+        }
+
+    def close(self) -> None:
+        """Stop the flusher thread and write the events recorded since its last run."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Process-wide tracker, installed with configure_usage_tracker
+_tracker: UsageTracker | None = None
+
+
+def configure_usage_tracker(tracker: UsageTracker | None) -> None:
+    """Install (or remove with None) the usage tracker fed by LLM providers."""
+    global _tracker
+    _tracker = tracker
+
+
+def get_usage_tracker() -> UsageTracker | None:
+    return _tracker
+
+
+def record_usage(provider: str, model: str, usage: TokenUsage | None) -> None:
+    """Report a response's usage to the installed tracker, if any."""
+    if _tracker is not None and usage is not None:
+        _tracker.record(provider, model, usage)